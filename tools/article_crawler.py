@@ -2,8 +2,11 @@ from datetime import datetime
 
 
 import zeeguu_core
+from zeeguu_core.model import Language, Topic
 from feed_retrieval import retrieve_articles_from_all_feeds
-from recompute_recommender_cache import clean_the_cache, recompute_for_users
+from compute_related_articles import compute_for_new_articles
+from recompute_recommender_cache import age_out_the_cache, add_new_articles_to_the_cache, recompute_for_users, \
+    refresh_feeds_of_recent_users
 
 import logging
 
@@ -15,9 +18,18 @@ logging.getLogger("zeeguu_core").setLevel(logging.INFO)
 start = datetime.now()
 zeeguu_core.log(f"started at: {datetime.now()}")
 
-retrieve_articles_from_all_feeds()
-clean_the_cache()
+new_articles = retrieve_articles_from_all_feeds()
+
+# so that the new articles show up in this process too
+for each in [Language.articles_cache, Topic.articles_cache]:
+    zeeguu_core.log(f"invalidating: {each.stats()}")
+    each.invalidate_all()
+
+age_out_the_cache()
+add_new_articles_to_the_cache(new_articles)
 recompute_for_users()
+refresh_feeds_of_recent_users()
+compute_for_new_articles(new_articles)
 
 end = datetime.now()
 zeeguu_core.log(f"done at: {end}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""
+
+   Script that compares, on a synthetic corpus, the two ways of
+   excluding the articles which contain a filtered keyword:
+
+    - LIKE '%keyword%' over the title and content (the old way)
+    - an anti-join on the article_content_token index
+
+   The corpus is generated in a temporary SQLite database with
+   the article and article_content_token tables of the model,
+   so the DB pointed to by ZEEGUU_CORE_CONFIG is not touched.
+
+   Call like this for a corpus of 20000 articles:
+
+        python benchmark_keyword_exclusion.py 20000
+
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, select, not_, or_, func
+
+import zeeguu_core
+from zeeguu_core.model import Article, ArticleContentToken
+
+VOCABULARY_SIZE = 5000
+WORDS_PER_ARTICLE = 300
+RUNS = 5
+
+
+def _random_word():
+    return ''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(random.randint(3, 10)))
+
+
+def _generate_corpus(engine, article_count):
+    vocabulary = list(set(_random_word() for _ in range(VOCABULARY_SIZE)))
+    # zipfian, like the words of a natural language
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    with engine.begin() as connection:
+        for start in range(0, article_count, 1000):
+            articles = []
+            for article_id in range(start + 1, min(start + 1000, article_count) + 1):
+                words = random.choices(vocabulary, weights, k=WORDS_PER_ARTICLE)
+                articles.append(dict(id=article_id,
+                                     title=' '.join(words[:8]),
+                                     content=' '.join(words),
+                                     broken=0,
+                                     published_time=datetime.now()))
+
+            connection.execute(Article.__table__.insert(), articles)
+            connection.execute(ArticleContentToken.__table__.insert(),
+                               [dict(token=token, article_id=article['id'])
+                                for article in articles
+                                for token in ArticleContentToken.tokenize(article['title'] + ' ' + article['content'])])
+
+    # a frequent, a medium, and a rare keyword
+    return [vocabulary[0], vocabulary[len(vocabulary) // 10], vocabulary[-1]]
+
+
+def _like_query(keyword):
+    return (select([func.count(Article.id)])
+            .where(not_(or_(Article.title.contains(keyword), Article.content.contains(keyword)))))
+
+
+def _anti_join_query(keyword):
+    return (select([func.count(Article.id)])
+            .where(not_(Article.id.in_(ArticleContentToken.article_ids_containing(keyword).statement))))
+
+
+def _best_time(engine, query):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            result = connection.execute(query).scalar()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def benchmark(article_count):
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    try:
+        engine = create_engine(f"sqlite:///{db_file}")
+        zeeguu_core.db.Model.metadata.create_all(engine, tables=[Article.__table__, ArticleContentToken.__table__])
+
+        start = time.perf_counter()
+        keywords = _generate_corpus(engine, article_count)
+        print(f"generated {article_count} articles in {time.perf_counter() - start:.1f}s")
+
+        for keyword in keywords:
+            like_time, like_count = _best_time(engine, _like_query(keyword))
+            anti_join_time, anti_join_count = _best_time(engine, _anti_join_query(keyword))
+
+            # the counts can differ a bit: LIKE also matches inside of longer words
+            print(f"{keyword:>12}: LIKE {like_time * 1000:8.1f}ms ({like_count} kept)   "
+                  f"anti-join {anti_join_time * 1000:8.1f}ms ({anti_join_count} kept)")
+    finally:
+        os.remove(db_file)
+
+
+if __name__ == '__main__':
+    article_count = 20000
+    if len(sys.argv) > 1:
+        article_count = int(sys.argv[1])
+
+    benchmark(article_count)
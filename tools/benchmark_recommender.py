@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+
+"""
+
+   Script that measures the latency and the number of queries of
+   the mixed recommender, on a synthetic corpus of articles, feeds,
+   topics, localized topics and users with mixed subscriptions and
+   filters:
+
+    - article_recommendations_for_user
+    - article_search_for_user
+    - _recompute_recommender_cache
+
+   Every function is called for every user, first with cold caches
+   (before every call the in-process caches are cleared, and the
+   cached articles and the feeds are deleted from the DB), then once
+   more for every user with warm caches; the p50, p95 and p99 of the
+   latencies and the number of queries of both are reported.
+
+   The corpus is generated in a temporary SQLite database, unless a
+   DB is given in BENCHMARK_DB_URI (e.g. an empty local MySQL DB);
+   the DB pointed to by ZEEGUU_CORE_CONFIG is not touched.
+
+   Call like this for 5000 articles and 200 users:
+
+        python benchmark_recommender.py 5000 200
+
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+import zeeguu_core
+
+# before the model is imported, so that it binds to the benchmark DB
+zeeguu_core.app = Flask("Zeeguu-Core-Benchmark")
+_db_file = None
+if os.environ.get("BENCHMARK_DB_URI"):
+    zeeguu_core.app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["BENCHMARK_DB_URI"]
+else:
+    _db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    zeeguu_core.app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{_db_file}"
+zeeguu_core.app.config["MAX_SESSION"] = 99999999
+zeeguu_core.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+from sqlalchemy import event
+
+from zeeguu_core.content_recommender import mixed_recommender
+from zeeguu_core.content_recommender.reading_preferences import ReadingPreferences
+from zeeguu_core.model import (Article, ArticleWord, ArticleContentToken, ArticlesCache, DomainName, Language,
+                               LocalizedTopic, RecommendationFeed, RSSFeed, Search, SearchFilter, SearchSubscription,
+                               Topic, TopicFilter, TopicSubscription, Url, User, UserLanguage)
+
+session = zeeguu_core.db.session
+
+LANGUAGE_CODES = ['de', 'es', 'fr']
+FEEDS_PER_LANGUAGE = 5
+TOPIC_TITLES = ['Sport', 'Politics', 'Science', 'Culture', 'Health', 'Technology', 'Travel', 'Food']
+VOCABULARY_SIZE = 3000
+WORDS_PER_ARTICLE = 200
+BATCH_SIZE = 500
+
+RECOMMENDATION_COUNT = 20
+SEARCH_COUNT = 20
+
+
+def _random_word():
+    return ''.join(random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(random.randint(3, 10)))
+
+
+def _seed_topics(languages):
+    topics = [Topic(title) for title in TOPIC_TITLES]
+    session.add_all(topics)
+    for topic in topics:
+        for language in languages:
+            session.add(LocalizedTopic(topic, language, f"{topic.title} ({language.code})", topic.title.lower()))
+    session.commit()
+    return topics
+
+
+def _seed_feeds(languages):
+    feeds = []
+    for language in languages:
+        for number in range(FEEDS_PER_LANGUAGE):
+            url = f"http://feed{number}.{language.code}.example.com/rss"
+            feeds.append(RSSFeed(Url(url), f"Feed {number} ({language.code})", "", language=language))
+    session.add_all(feeds)
+    session.commit()
+    return feeds
+
+
+def _seed_articles(article_count, feeds, topics, vocabulary, weights):
+    domain_of_feed = {feed.id: DomainName.for_url_string(feed.url.as_string()) for feed in feeds}
+    article_word_for = {}
+
+    for start in range(0, article_count, BATCH_SIZE):
+        articles = []
+        for number in range(start, min(start + BATCH_SIZE, article_count)):
+            feed = random.choice(feeds)
+            words = random.choices(vocabulary, weights, k=WORDS_PER_ARTICLE)
+            title = ' '.join(words[:6])
+            url = Url(f"http://feed.example.com/article/{number}", title, domain_of_feed[feed.id])
+            published = datetime.now() - timedelta(minutes=random.randint(0, 60 * 24 * 60))
+
+            article = Article(url, title, "", ' '.join(words), "", published, feed, feed.language)
+            article.fk_difficulty = random.randint(10, 90)
+            for topic in random.sample(topics, random.randint(0, 2)):
+                article.add_topic(topic)
+            articles.append(article)
+
+        session.add_all(articles)
+        session.flush()
+
+        # the title words are what the search looks in
+        for article in articles:
+            for word in set(article.title.split()):
+                if word not in article_word_for:
+                    article_word_for[word] = ArticleWord(word)
+                article_word_for[word].add_article(article)
+        ArticleContentToken.index_articles(session, articles)
+        session.commit()
+        print(f"  {min(start + BATCH_SIZE, article_count)} articles")
+
+
+def _seed_users(user_count, languages, topics, vocabulary):
+    users = []
+    for number in range(user_count):
+        language = random.choice(languages)
+        user = User(f"user{number}@benchmark.example.com", f"User {number}", "password",
+                    learned_language=language, native_language=Language.find_or_create('en'))
+        session.add(user)
+        session.add(UserLanguage(user, language, reading_news=True))
+
+        # mixed subscriptions and filters; some users have none
+        chosen_topics = random.sample(topics, random.randint(0, 3))
+        for topic in chosen_topics[:-1]:
+            session.add(TopicSubscription(user, topic))
+        for topic in chosen_topics[-1:]:
+            session.add(TopicFilter(user, topic))
+
+        if random.random() < 0.3:
+            session.add(SearchSubscription(user, Search.find_or_create(session, random.choice(vocabulary[:300]))))
+        if random.random() < 0.3:
+            session.add(SearchFilter(user, Search.find_or_create(session, random.choice(vocabulary[:300]))))
+
+        users.append(user)
+    session.commit()
+    return users
+
+
+def seed(article_count, user_count):
+    vocabulary = list(set(_random_word() for _ in range(VOCABULARY_SIZE)))
+    # zipfian, like the words of a natural language
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    languages = [Language.find_or_create(code) for code in LANGUAGE_CODES]
+    topics = _seed_topics(languages)
+    feeds = _seed_feeds(languages)
+    _seed_articles(article_count, feeds, topics, vocabulary, weights)
+    users = _seed_users(user_count, languages, topics, vocabulary)
+
+    return users, vocabulary
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def _clear_caches(user):
+    Language.articles_cache.invalidate_all()
+    Topic.articles_cache.invalidate_all()
+
+    # only those of the user, so that the warm run can find the others
+    ArticlesCache.query.filter(ArticlesCache.content_hash == ReadingPreferences.for_user(user).hash).delete()
+    RecommendationFeed.query.filter(RecommendationFeed.user_id == user.id).delete()
+    session.commit()
+
+
+def _measure(call, users, query_counter, cold):
+    timings = []
+    query_counts = []
+    for user in users:
+        if cold:
+            _clear_caches(user)
+
+        query_counter.count = 0
+        start = time.perf_counter()
+        call(user)
+        timings.append(time.perf_counter() - start)
+        query_counts.append(query_counter.count)
+
+        # the identity map should not make the next user faster
+        session.expire_all()
+    return timings, query_counts
+
+
+def _report(name, timings, query_counts):
+    percentiles = statistics.quantiles(timings, n=100)
+    print(f"{name:>42}: p50 {percentiles[49] * 1000:8.1f}ms  p95 {percentiles[94] * 1000:8.1f}ms  "
+          f"p99 {percentiles[98] * 1000:8.1f}ms  queries: mean {statistics.mean(query_counts):6.1f} "
+          f"max {max(query_counts)}")
+
+
+def _recompute(user):
+    preferences = ReadingPreferences.for_user(user)
+    mixed_recommender._recompute_recommender_cache(preferences.hash, session, user, preferences=preferences)
+
+
+def benchmark(users, vocabulary):
+    search_terms = {user.id: random.choice(vocabulary[:300]) for user in users}
+
+    calls = [
+        ("article_recommendations_for_user",
+         lambda user: mixed_recommender.article_recommendations_for_user(user, RECOMMENDATION_COUNT)),
+        ("article_search_for_user",
+         lambda user: mixed_recommender.article_search_for_user(user, SEARCH_COUNT, search_terms[user.id])),
+        ("_recompute_recommender_cache", _recompute),
+    ]
+
+    query_counter = QueryCounter()
+    engine = zeeguu_core.db.get_engine()
+    event.listen(engine, "before_cursor_execute", query_counter)
+    try:
+        for name, call in calls:
+            _report(f"{name} (cold)", *_measure(call, users, query_counter, cold=True))
+            _report(f"{name} (warm)", *_measure(call, users, query_counter, cold=False))
+    finally:
+        event.remove(engine, "before_cursor_execute", query_counter)
+
+
+if __name__ == '__main__':
+    article_count = 5000
+    user_count = 200
+    if len(sys.argv) > 1:
+        article_count = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        user_count = int(sys.argv[2])
+
+    try:
+        start = time.perf_counter()
+        users, vocabulary = seed(article_count, user_count)
+        print(f"generated {article_count} articles and {user_count} users in {time.perf_counter() - start:.1f}s")
+
+        benchmark(users, vocabulary)
+    finally:
+        if _db_file:
+            os.remove(_db_file)
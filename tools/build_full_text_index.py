@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+"""
+
+    Builds the local full-text index (FTS_INDEX_FILE in the config)
+    of this node, for the articles which are not broken; the crawler
+    adds the new ones.
+
+    Goes through the articles in batches, in the order of their ids;
+    indexing an article again replaces it, so the script can be
+    stopped and restarted at any time. To resume from where a
+    previous run stopped, pass the last id it printed:
+
+        python build_full_text_index.py 120000
+
+"""
+
+import sys
+import time
+
+import zeeguu_core
+from zeeguu_core.full_text.index import index_articles
+from zeeguu_core.model import Article
+
+session = zeeguu_core.db.session
+
+BATCH_SIZE = 500
+
+
+def index_articles_after(article_id):
+    start = time.time()
+    indexed_count = 0
+
+    while True:
+        batch = (Article.query
+                 .filter(Article.id > article_id)
+                 .filter(Article.broken == 0)
+                 .order_by(Article.id)
+                 .limit(BATCH_SIZE)
+                 .all())
+        if not batch:
+            break
+
+        index_articles(batch)
+
+        article_id = batch[-1].id
+        indexed_count += len(batch)
+        zeeguu_core.logp(f"indexed up to article {article_id} "
+                         f"({indexed_count} articles in {time.time() - start:.0f}s)")
+
+        # the batch is not needed anymore
+        session.expunge_all()
+
+
+if __name__ == '__main__':
+    if not zeeguu_core.app.config.get("FTS_INDEX_FILE"):
+        print("Please define FTS_INDEX_FILE in the config file!")
+        exit(-1)
+
+    start_after = 0
+    if len(sys.argv) > 1:
+        start_after = int(sys.argv[1])
+
+    index_articles_after(start_after)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""
+
+    Precomputes the related articles (see RelatedArticle) of the
+    articles for which they were not computed yet, or were forgotten
+    because one of them was marked broken or deleted.
+
+    Goes through the articles which are not broken in batches, in
+    the order of their ids; every batch is one multi-search in ES.
+    To resume from where a previous run stopped, pass the last id
+    it printed:
+
+        python compute_related_articles.py 120000
+
+    The crawler (article_crawler.py) computes them for the new
+    articles right after they're retrieved.
+
+"""
+
+import sys
+import time
+
+from sqlalchemy import not_
+
+import zeeguu_core
+from zeeguu_core.content_recommender.elastic_recommender import compute_related_articles
+from zeeguu_core.model import Article, RelatedArticle
+
+session = zeeguu_core.db.session
+
+BATCH_SIZE = 50
+
+
+def compute_for_new_articles(new_articles):
+    """
+
+        called after the crawling; a failure of ES is logged
+        and left for the next run of this script
+
+    """
+    try:
+        for start in range(0, len(new_articles), BATCH_SIZE):
+            compute_related_articles(session, new_articles[start:start + BATCH_SIZE])
+            session.commit()
+    except Exception as e:
+        session.rollback()
+        zeeguu_core.logp(f"could not compute the related articles: {e}")
+
+
+def compute_for_articles_after(article_id):
+    start = time.time()
+    computed_count = 0
+
+    while True:
+        batch = (Article.query
+                 .filter(Article.id > article_id)
+                 .filter(Article.broken == 0)
+                 .filter(not_(Article.id.in_(session.query(RelatedArticle.article_id))))
+                 .order_by(Article.id)
+                 .limit(BATCH_SIZE)
+                 .all())
+        if not batch:
+            break
+
+        compute_related_articles(session, batch)
+        session.commit()
+
+        article_id = batch[-1].id
+        computed_count += len(batch)
+        zeeguu_core.logp(f"computed up to article {article_id} "
+                         f"({computed_count} articles in {time.time() - start:.0f}s)")
+
+        # the batch is not needed anymore
+        session.expunge_all()
+
+
+if __name__ == '__main__':
+    start_after = 0
+    if len(sys.argv) > 1:
+        start_after = int(sys.argv[1])
+
+    compute_for_articles_after(start_after)
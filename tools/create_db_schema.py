@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+
+"""
+
+   Script that creates the tables of the model
+   which do not exist yet in the DB.
+
+   Meant to be run once, as part of a deployment, when
+   SKIP_DB_SCHEMA_CREATION is set in the config and thus
+   importing zeeguu_core.model does not create the schema.
+
+"""
+
+import zeeguu_core
+import zeeguu_core.model
+
+if __name__ == '__main__':
+    zeeguu_core.db.create_all(app=zeeguu_core.app)
+    zeeguu_core.logp("DB schema created")
@@ -27,6 +27,12 @@ session = zeeguu_core.db.session
 
 
 def retrieve_articles_from_all_feeds():
+    """
+
+        :return: the articles that were newly added to the DB
+
+    """
+    new_articles = []
     counter = 0
     all_feeds = RSSFeed.query.all()
     all_feeds_count = len(all_feeds)
@@ -37,11 +43,13 @@ def retrieve_articles_from_all_feeds():
             log("")
             log(f"{msg}")
 
-            download_from_feed(feed, zeeguu_core.db.session)
+            new_articles.extend(download_from_feed(feed, zeeguu_core.db.session))
 
         except Exception as e:
             traceback.print_exc()
 
+    return new_articles
+
 
 if __name__ == '__main__':
     retrieve_articles_from_all_feeds()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""
+
+    Backfills the article_content_token index for the articles
+    which were crawled before the index was built at ingestion.
+
+    Goes through the articles in batches, in the order of their
+    ids; already indexed articles are skipped by the insert, so
+    the script can be stopped and restarted at any time. To resume
+    from where a previous run stopped, pass the last id it printed:
+
+        python index_article_content_tokens.py 120000
+
+"""
+
+import sys
+import time
+
+import zeeguu_core
+from zeeguu_core.model import Article, ArticleContentToken
+
+session = zeeguu_core.db.session
+
+BATCH_SIZE = 500
+
+
+def index_articles_after(article_id):
+    start = time.time()
+    indexed_count = 0
+
+    while True:
+        batch = (Article.query
+                 .filter(Article.id > article_id)
+                 .order_by(Article.id)
+                 .limit(BATCH_SIZE)
+                 .all())
+        if not batch:
+            break
+
+        ArticleContentToken.index_articles(session, batch)
+        session.commit()
+
+        article_id = batch[-1].id
+        indexed_count += len(batch)
+        zeeguu_core.logp(f"indexed up to article {article_id} "
+                         f"({indexed_count} articles in {time.time() - start:.0f}s)")
+
+        # the batch is not needed anymore
+        session.expunge_all()
+
+
+if __name__ == '__main__':
+    start_after = 0
+    if len(sys.argv) > 1:
+        start_after = int(sys.argv[1])
+
+    index_articles_after(start_after)
@@ -8,110 +8,136 @@
     finally puts these words in a separate table with a map
     from words to articles.
 
+    The articles are streamed in batches, in the order of their
+    ids (only the id, title, url and language; never the content).
+    Their words are extracted by a pool of processes, and written
+    with a few bulk statements per batch; the earlier mappings of
+    the articles in the batch are replaced, so a batch can be
+    processed again without duplicating them.
+
+    Resumable, and can be split in shards (see zeeguu_core.util.checkpoint).
+
+    Call like this to process the second of four shards with 8
+    worker processes:
+
+        python map_article_words.py 1 4 8
+
+    or without arguments, for everything with 4 worker processes.
+
 
 """
 
-import zeeguu_core
-from zeeguu_core.model.article import Article
-from zeeguu_core.model.article_word import ArticleWord
-from nltk.corpus import stopwords
-from urllib.parse import urlparse
-import time
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import zeeguu_core
+from zeeguu_core.model import Article, ArticleWord, DomainName, Language, Url
+from zeeguu_core.model.article_word import article_word_map
+from zeeguu_core.util.checkpoint import Checkpoint, batches_after
 
 session = zeeguu_core.db.session
-word_count = 0
-article_count = 0
-filtered_general = 0
-filtered_length = 0
-filtered_digits = 0
-articles = Article.query.all()
-
-filter_general = ['www', '', ' ']
-starting_time = time.time()
-
-result = zeeguu_core.db.engine.execute("SELECT min(article_id) FROM article_word_map").fetchone()
-min_id = result[0] or 10000000
-restart_loop = True
-print(f'#### ID TO START AT: {min_id} ####')
-
-# Reverse the articles to start at the most recent ones
-articles.reverse()
-
-print(f'#### STARTING MAIN LOOP ####')
-
-while restart_loop is True:
-    restart_loop = False
-    for article in articles:
-        if article.id > min_id:
-            print(f'#### SKIPPED article with id: {article.id} ####')
+
+BATCH_SIZE = 1000
+DEFAULT_WORKER_COUNT = 4
+
+FILTER_GENERAL = ['www', '', ' ']
+
+# loaded once per language, in every worker process
+_stopwords_of_language = {}
+
+
+def _stopwords(language):
+    if language not in _stopwords_of_language:
+        try:
+            from nltk.corpus import stopwords
+            _stopwords_of_language[language] = set(stopwords.words(language))
+        except (OSError, LookupError, AttributeError) as e:
+            print(f'Stopwords failed somehow for {language}: {e}')
+            _stopwords_of_language[language] = set()
+
+    return _stopwords_of_language[language]
+
+
+def words_of_article(article):
+    """
+
+        runs in the worker processes
+
+    :param article: (id, title, url, language name)
+    :return: (id, the set of words to map to the article)
+
+    """
+    article_id, title, address, language = article
+
+    url = urlparse(address)
+    all_words = [url.netloc.split('.')[0]]
+    all_words.extend(re.split('; |, |\*|-|%20|/', url.path))
+    all_words.extend(title.split())
+
+    stopwords = _stopwords(language.lower())
+
+    words = set()
+    for word in filter(None, all_words):
+        word = word.strip()
+        word = word.strip(":,\,,\",?,!,<,>")
+        word = word.lower()
+        if word in FILTER_GENERAL or len(word) < 3 or len(word) > 29 or word.isdigit() or word in stopwords:
             continue
-        print(f'#### PROCESSING ARTICLE WITH ID: {article.id} ####')
-        title = article.title
-        address = article.url.as_string()
-        language = article.language.name.lower()
-        all_words = []
-
-        url = urlparse(address)
-        print(url)
-        subdomain = url.netloc.split('.')[0]
-        title_words = title.split()
-
-        all_words.append(subdomain)
-        all_words.extend(re.split('; |, |\*|-|%20|/', url.path))
-        all_words.extend(title_words)
-
-        all_words = list(filter(None, all_words))
-        for word in all_words:
-            # Fix utf-8 characters
-            word = bytes(word, 'utf-8').decode('utf-8', 'ignore')
-            try:
-                stopwords = set(stopwords.words(language))
-            except OSError as e:
-                stopwords = []
-                print(f'Stopwords failed somehow: {e}')
-            except AttributeError:
-                stopwords = []
-
-            article_word_obj = None
-            word = word.strip()
-            word = word.strip(":,\,,\",?,!,<,>")
-            word = word.lower()
-            if word in filter_general:
-                filtered_general += 1
-            elif len(word) < 3 or len(word) > 29:
-                filtered_length += 1
-            elif word.isdigit():
-                filtered_digits += 1
-            elif word in stopwords:
-                filtered_general += 1
-            else:
-                article_word_obj = ArticleWord.find_or_create(session, word)
-                article_word_obj.add_article(article)
-                word_count += 1
-                print (" - " + word)
-            if word_count % 1000 == 0:
-                print("another 1000 words added")
-                print(f'That took {time.time() - starting_time} seconds...')
-
-        article_count += 1
-        if article_count % 100 == 0:
-            print(f'That took {time.time() - starting_time} seconds...')
-            try:
-                session.commit()
-                print("another 100 articles done and committed")
-            except Exception as e:
-                print(f'Exception during commit: {e}')
-                session.rollback()
-                result = zeeguu_core.db.engine.execute("SELECT min(article_id) FROM article_word_map").fetchone()
-                min_id = result[0] - 1
-                restart_loop = True
-                break
-
-ending_time = time.time()
-print(f'In a total of {ending_time - starting_time} seconds :')
-print(f'A total of {article_count} articles handled')
-print(f'A total of {word_count} words handled')
-print(f'A total of {filtered_general} words filtered general')
-print(f'A total of {filtered_length} words filtered length')
-print(f'A total of {filtered_digits} words filtered digit')
+        words.add(word)
+
+    return article_id, words
+
+
+def _batches_after(article_id, shard, shard_count):
+    query = (session.query(Article.id, Article.title, DomainName.domain_name, Url.path, Language.name)
+             .join(Url, Article.url_id == Url.id)
+             .join(DomainName, Url.domain_name_id == DomainName.id)
+             .join(Language, Article.language_id == Language.id))
+
+    for batch in batches_after(query, Article.id, article_id, shard, shard_count, BATCH_SIZE):
+        yield [(each_id, title or '', domain_name + path, language)
+               for each_id, title, domain_name, path, language in batch]
+
+
+def map_article_words(shard=0, shard_count=1, worker_count=DEFAULT_WORKER_COUNT):
+    checkpoint = Checkpoint("map_article_words", shard, shard_count)
+    article_id = checkpoint.last_article_id()
+    print(f'#### STARTING AFTER ARTICLE: {article_id} (shard {shard} of {shard_count}) ####')
+
+    start = time.time()
+    article_count = 0
+    word_count = 0
+
+    with ProcessPoolExecutor(worker_count) as pool:
+        for batch in _batches_after(article_id, shard, shard_count):
+            words_of = dict(pool.map(words_of_article, batch, chunksize=50))
+
+            session.execute(article_word_map.delete().where(article_word_map.c.article_id.in_(list(words_of))))
+            ArticleWord.add_words_to_articles(session, words_of)
+            session.commit()
+
+            article_id = batch[-1][0]
+            checkpoint.save(article_id)
+
+            article_count += len(batch)
+            word_count += sum(len(each) for each in words_of.values())
+            print(f'up to article {article_id}: {article_count} articles and '
+                  f'{word_count} words in {time.time() - start:.0f} seconds')
+
+    print(f'#### DONE: {article_count} articles and {word_count} words in {time.time() - start:.0f} seconds ####')
+
+
+if __name__ == '__main__':
+    shard = 0
+    shard_count = 1
+    worker_count = DEFAULT_WORKER_COUNT
+    if len(sys.argv) > 2:
+        shard = int(sys.argv[1])
+        shard_count = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        worker_count = int(sys.argv[3])
+
+    map_article_words(shard, shard_count, worker_count)
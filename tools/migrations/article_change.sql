@@ -0,0 +1,11 @@
+/** The outbox of the articles whose ES documents need updating;
+ ** filled when ELASTIC_SYNC_OUTBOX is set in the config and
+ ** emptied by tools/sync_elastic.py.
+ */
+
+CREATE TABLE article_change (
+    id INT NOT NULL AUTO_INCREMENT,
+    article_id INT,
+    time DATETIME,
+    PRIMARY KEY (id)
+) COLLATE utf8_bin;
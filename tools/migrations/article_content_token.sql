@@ -0,0 +1,14 @@
+/** The inverted index over the content of the articles which
+ ** is used by the keyword filters of the recommender.
+ **
+ ** After creating the table, run tools/index_article_content_tokens.py
+ ** to index the existing articles; the new ones are indexed by the crawler.
+ */
+
+CREATE TABLE article_content_token (
+    token VARCHAR(30) NOT NULL,
+    article_id INT NOT NULL,
+    PRIMARY KEY (token, article_id),
+    INDEX ix_article_content_token_article_id (article_id),
+    FOREIGN KEY (article_id) REFERENCES article (id) ON DELETE CASCADE
+) COLLATE utf8_bin;
@@ -0,0 +1,13 @@
+/** Removes the duplicated (content_hash, article_id) pairs in the
+ ** articles_cache and adds the unique constraint which prevents
+ ** concurrent recomputes of the cache from creating them again.
+ */
+
+DELETE duplicate FROM articles_cache duplicate
+    JOIN articles_cache original
+        ON duplicate.content_hash = original.content_hash
+        AND duplicate.article_id = original.article_id
+        AND duplicate.id > original.id;
+
+ALTER TABLE articles_cache
+    ADD CONSTRAINT _content_hash_article_unique_constraint UNIQUE (content_hash, article_id);
@@ -0,0 +1,17 @@
+/** The materialized recommendation feeds of the users;
+ ** filled by the crawler (tools/article_crawler.py) and on demand.
+ */
+
+CREATE TABLE recommendation_feed (
+    user_id INT NOT NULL,
+    content_hash VARCHAR(256),
+    levels VARCHAR(256),
+    computed_at DATETIME,
+    article_infos MEDIUMTEXT,
+    PRIMARY KEY (user_id),
+    FOREIGN KEY (user_id) REFERENCES user (id)
+) COLLATE utf8_bin;
+
+/** for a table created without the levels:
+ ** ALTER TABLE recommendation_feed ADD COLUMN levels VARCHAR(256) AFTER content_hash;
+ */
@@ -0,0 +1,14 @@
+/** The precomputed related articles of every article (and the article
+ ** itself, without a rank, once they are computed);
+ ** filled by tools/compute_related_articles.py and by the crawler.
+ */
+
+CREATE TABLE related_article (
+    article_id INT NOT NULL,
+    related_article_id INT NOT NULL,
+    similarity_rank INT,
+    PRIMARY KEY (article_id, related_article_id),
+    INDEX ix_related_article_related_article_id (related_article_id),
+    FOREIGN KEY (article_id) REFERENCES article (id) ON DELETE CASCADE,
+    FOREIGN KEY (related_article_id) REFERENCES article (id) ON DELETE CASCADE
+) COLLATE utf8_bin;
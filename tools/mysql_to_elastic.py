@@ -1,56 +1,176 @@
 # coding=utf-8
-import sqlalchemy as database
-from zeeguu_core.elastic.converting_from_mysql import document_from_article
-from sqlalchemy import func
-from elasticsearch import Elasticsearch
-import zeeguu_core
-from sqlalchemy.orm import sessionmaker
-from zeeguu_core.model import Article
+
+"""
+
+    Loads the articles from MySQL into the ES index.
+
+    The articles are read in batches, in the order of their ids, with
+    their topics, language, url and feed loaded eagerly, so a batch
+    takes a constant number of queries. Each batch is sent to ES with
+    parallel_bulk, so several bulk requests are in flight at once.
+    The broken articles are skipped, like sync_elastic.py does.
+
+    The ids are split over several worker processes, one shard each,
+    with a checkpoint per shard (see zeeguu_core.util.checkpoint).
+
+    The ids of the articles which ES failed to index are saved in the
+    mysql_to_elastic.*.failed file of the worker, before the checkpoint
+    moves past them; the next run with the same number of workers
+    tries them again first.
+
+    Call like this for 8 worker processes, with 2000 articles a batch:
+
+        python mysql_to_elastic.py 8 2000
+
+"""
+
+import multiprocessing
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-from zeeguu_core.elastic.settings import ES_ZINDEX, ES_CONN_STRING
+from sqlalchemy.orm import joinedload, selectinload
+
+import zeeguu_core
+from zeeguu_core.elastic.client import es_client
+from zeeguu_core.elastic.converting_from_mysql import document_from_article
+from zeeguu_core.elastic.settings import ES_ZINDEX
+from zeeguu_core.model import Article, RSSFeed, Url
+from zeeguu_core.util.checkpoint import Checkpoint, batches_after, shard_file_name, write_atomically
+
+session = zeeguu_core.db.session
+
+DEFAULT_WORKER_COUNT = 4
+DEFAULT_BATCH_SIZE = 2000
+
+# the threads of parallel_bulk in every worker, and the documents per bulk request
+BULK_THREAD_COUNT = 4
+BULK_CHUNK_SIZE = 500
+
+
+def _articles_query():
+    return (Article.query
+            .options(selectinload(Article.topics),
+                     joinedload(Article.language),
+                     joinedload(Article.url).joinedload(Url.domain),
+                     joinedload(Article.rss_feed).joinedload(RSSFeed.image_url).joinedload(Url.domain))
+            .filter(Article.broken == 0))
+
+
+def _read_failed(file_name):
+    if not os.path.exists(file_name):
+        return []
+    with open(file_name) as f:
+        return [int(each) for each in f.read().split()]
+
+
+def _write_failed(file_name, article_ids):
+    write_atomically(file_name, "\n".join(str(each) for each in article_ids))
+
+
+def _index(articles, shard):
+    """
+
+    :return: (the number of indexed documents, the ids of the failed ones)
+
+    """
+    from elasticsearch.helpers import parallel_bulk
+
+    actions = ({"_index": ES_ZINDEX, "_id": each.id, "_source": document_from_article(each, session)}
+               for each in articles)
+
+    indexed_count = 0
+    failed_ids = []
+    for ok, info in parallel_bulk(es_client(), actions, thread_count=BULK_THREAD_COUNT,
+                                  chunk_size=BULK_CHUNK_SIZE, raise_on_error=False):
+        if ok:
+            indexed_count += 1
+        else:
+            _, item = info.popitem()
+            failed_ids.append(int(item['_id']))
+            print(f"shard {shard}: could not index {item}")
+
+    return indexed_count, failed_ids
+
+
+def load_shard(shard, shard_count, batch_size=DEFAULT_BATCH_SIZE):
+    """
+
+        runs in a worker process
+
+    :return: (the number of indexed documents, the number of failures)
+
+    """
+    checkpoint = Checkpoint("mysql_to_elastic", shard, shard_count)
+    article_id = checkpoint.last_article_id()
+
+    start = time.time()
+    indexed_count = 0
+
+    # the ones which failed in the previous runs first
+    failed_file = shard_file_name("mysql_to_elastic", shard, shard_count, "failed")
+    retried_ids = _read_failed(failed_file)
+    failed_ids = []
+    for i in range(0, len(retried_ids), batch_size):
+        articles = _articles_query().filter(Article.id.in_(retried_ids[i:i + batch_size])).all()
+        count, failed = _index(articles, shard)
+        indexed_count += count
+        failed_ids.extend(failed)
+        session.expunge_all()
+    if retried_ids:
+        _write_failed(failed_file, failed_ids)
+        print(f"shard {shard}: retried {len(retried_ids)} documents, {len(failed_ids)} failed again")
+
+    for batch in batches_after(_articles_query(), Article.id, article_id, shard, shard_count, batch_size):
+        count, failed = _index(batch, shard)
+        indexed_count += count
+
+        # saved before the checkpoint moves past them
+        if failed:
+            failed_ids.extend(failed)
+            _write_failed(failed_file, failed_ids)
+
+        article_id = batch[-1].id
+        checkpoint.save(article_id)
+
+        # the batch is not needed anymore
+        session.expunge_all()
 
-es = Elasticsearch([ES_CONN_STRING])
-DB_URI = zeeguu_core.app.config["SQLALCHEMY_DATABASE_URI"]
-engine = database.create_engine(DB_URI)
-Session = sessionmaker(bind=engine)
-session = Session()
+        elapsed = time.time() - start
+        print(f"shard {shard}: up to article {article_id}, {indexed_count} documents "
+              f"({indexed_count / elapsed:.0f}/s), {len(failed_ids)} failed")
 
+    return indexed_count, len(failed_ids)
 
-def main(starting_index, article_batch_size):
-    # fetch article_batch_size articles at a time, to avoid to much loaded into memory
 
-    max_id = session.query(func.max(Article.id)).first()[0]
-    print(f"max id in db: {max_id}")
-    print(f"starting import at: {max_id - starting_index}")
+def main(worker_count=DEFAULT_WORKER_COUNT, batch_size=DEFAULT_BATCH_SIZE):
+    start = time.time()
 
-    for i in range(starting_index, max_id, article_batch_size):
+    # spawned, so that the workers don't share the connections of this process
+    with ProcessPoolExecutor(worker_count, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = list(pool.map(load_shard, range(worker_count), [worker_count] * worker_count,
+                                [batch_size] * worker_count))
 
-        print(i)
-        for article in session.query(Article).order_by(Article.published_time.desc()).limit(article_batch_size).offset(
-                i):
-            try:
-                doc = document_from_article(article, session)
-                res = es.index(index=ES_ZINDEX, id=article.id, body=doc)
-                if article.id % 1000 == 0:
-                    print(res['result'] + ' ' + str(article.id))
-            except Exception as e:
-                print(f"something went wrong with article id {article.id}")
-                print(str(e))
+    indexed_count = sum(each[0] for each in results)
+    failed_count = sum(each[1] for each in results)
+    elapsed = time.time() - start
+    print(f"indexed {indexed_count} documents in {elapsed:.0f}s ({indexed_count / max(elapsed, 1):.0f}/s), "
+          f"{failed_count} failed")
 
 
 if __name__ == '__main__':
 
     print(f"started at: {datetime.now()}")
-    starting_index = 0
-    article_batch_size = 5000
+    worker_count = DEFAULT_WORKER_COUNT
+    batch_size = DEFAULT_BATCH_SIZE
 
     if len(sys.argv) > 1:
-        starting_index = int(sys.argv[1])
+        worker_count = int(sys.argv[1])
 
     if len(sys.argv) > 2:
-        article_batch_size = int(sys.argv[2])
+        batch_size = int(sys.argv[2])
 
-    main(starting_index, article_batch_size)
+    main(worker_count, batch_size)
     print(f"ended at: {datetime.now()}")
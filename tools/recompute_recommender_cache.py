@@ -6,15 +6,33 @@
 
    To be called from a cron job.
 
+   Call like this to rebuild the cache with 8 worker threads:
+
+        python recompute_recommender_cache.py 8
+
 """
 
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 import zeeguu_core
-from zeeguu_core.content_recommender.mixed_recommender import _reading_preferences_hash, \
-    _recompute_recommender_cache_if_needed
+from zeeguu_core.content_recommender.mixed_recommender import _recompute_recommender_cache, \
+    _article_fits_reading_preferences, refresh_feed
+from zeeguu_core.content_recommender.reading_preferences import ReadingPreferences
 from zeeguu_core.model import User, ArticlesCache
 
 session = zeeguu_core.db.session
 
+DEFAULT_WORKER_COUNT = 4
+
+# cached articles published longer ago than this are aged out
+CACHE_TTL_IN_DAYS = 90
+
+# only the most recent articles are kept for every hash
+MAX_CACHED_ARTICLES_PER_HASH = 200
+
 
 def hashes_of_existing_cached_preferences():
     """
@@ -34,19 +52,21 @@ def clean_the_cache():
     session.commit()
 
 
-def recompute_for_users():
+def recompute_for_users(worker_count=DEFAULT_WORKER_COUNT):
     """
 
-        recomputes only those caches that are already in the table
-        and belong to a user. if multiple users have the same preferences
-        the computation is done only for the first because this is how
-        _recompute_recommender_cache_if_needed does.
+        recomputes only those caches that belong to a recent
+        user and are not already in the table.
 
-        To think about:
-        - what happens when this script is triggered simultaneously
-        with triggering _recompute_recommender_cache_if_needed from
-        the UI? will there end up be duplicated recommendations?
-        should we add a uninque constraint on (hash x article)?
+        the reading preferences of all the recent users are loaded with
+        a few set-based queries (ReadingPreferences.for_users) and the
+        users are grouped by hash; every distinct hash is then computed
+        once, for the first of its users, in a pool of worker_count
+        threads. every thread uses its own (scoped) DB session.
+
+        since (content_hash, article_id) is unique in the ArticlesCache
+        a recompute which overlaps with one triggered from the UI
+        does not result in duplicated recommendations.
 
         Note:
 
@@ -61,34 +81,139 @@ def recompute_for_users():
         because the recommendations might be different for each user
         since every user has different language levels!!!
 
-    :param existing_hashes:
+    :param worker_count:
     :return:
     """
-    already_done = []
-    for user_id in User.all_recent_user_ids():
+    start = time.time()
+
+    preferences_by_hash = _recent_preferences_by_hash()
+    existing_hashes = set(hashes_of_existing_cached_preferences())
+    to_recompute = [(each, preferences) for each, preferences in preferences_by_hash.items()
+                    if each not in existing_hashes]
+
+    zeeguu_core.logp(f"{len(preferences_by_hash)} distinct hashes for the recent users; "
+                     f"{len(to_recompute)} to recompute with {worker_count} workers")
+
+    with ThreadPoolExecutor(max_workers=worker_count) as pool:
+        timings = list(pool.map(_recompute_for_hash, to_recompute))
+
+    for reading_pref_hash, user_count, duration in sorted(timings, key=lambda each: -each[2]):
+        zeeguu_core.logp(f"{duration:8.2f}s {reading_pref_hash} ({user_count} users)")
+    zeeguu_core.logp(f"recomputed {len(to_recompute)} hashes in {time.time() - start:.2f}s")
+
+
+def _recent_preferences_by_hash():
+    preferences_by_hash = defaultdict(list)
+    for preferences in ReadingPreferences.for_users(User.all_recent_user_ids()).values():
+        preferences_by_hash[preferences.hash].append(preferences)
+    return preferences_by_hash
+
+
+def _recompute_for_hash(hash_and_preferences):
+    reading_pref_hash, all_preferences = hash_and_preferences
+
+    # the scoped session is thread local
+    thread_session = zeeguu_core.db.session
+
+    start = time.time()
+    try:
+        preferences = all_preferences[0]
+        user = User.find_by_id(preferences.user_id)
+        _recompute_recommender_cache(reading_pref_hash, thread_session, user, preferences=preferences)
+    except Exception as e:
+        thread_session.rollback()
+        zeeguu_core.logp(f"Failed for {reading_pref_hash}: {e}")
+    finally:
+        thread_session.remove()
+
+    return reading_pref_hash, len(all_preferences), time.time() - start
+
+
+def add_new_articles_to_the_cache(new_articles):
+    """
+
+        matches the freshly crawled :param new_articles against the
+        reading preferences of the recent users whose hash is already
+        in the cache and appends the matching ones to that hash.
+
+        hashes which are not in the cache yet are left for
+        recompute_for_users
+
+    """
+    if not new_articles:
+        return
+
+    existing_hashes = set(hashes_of_existing_cached_preferences())
+    for reading_pref_hash, all_preferences in _recent_preferences_by_hash().items():
+        if reading_pref_hash not in existing_hashes:
+            continue
+
         try:
-            user = User.find_by_id(user_id)
-            reading_pref_hash = _reading_preferences_hash(user)
-            if reading_pref_hash not in already_done:
-                _recompute_recommender_cache_if_needed(user, session)
-                zeeguu_core.logp(f"Success for {reading_pref_hash} and {user}")
-                already_done.append(reading_pref_hash)
-            else:
-                zeeguu_core.logp(f"nno need to do for {user}. hash {reading_pref_hash} already done")
+            # the users with the same hash have the same preferences
+            matching = [each for each in new_articles
+                        if _article_fits_reading_preferences(each, all_preferences[0])]
+            ArticlesCache.add_articles_for_hash(session, reading_pref_hash, matching)
+            session.commit()
+
+            zeeguu_core.logp(f"Added {len(matching)} new articles to {reading_pref_hash}")
         except Exception as e:
-            zeeguu_core.logp(f"Failed for user {user}")
+            session.rollback()
+            zeeguu_core.logp(f"Failed to add new articles to {reading_pref_hash}: {e}")
+
+
+def refresh_feeds_of_recent_users():
+    """
+
+        recomputes the materialized feeds of the recent users, so
+        that their next request is a lookup; to be called after
+        the ArticlesCache is up to date (e.g. after a crawl)
+
+        the feeds of the other users are computed on demand
+
+    """
+    start = time.time()
+
+    all_preferences = ReadingPreferences.for_users(User.all_recent_user_ids())
+    for user in User.query.filter(User.id.in_(all_preferences.keys())):
+        try:
+            refresh_feed(user, all_preferences[user.id], session)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            zeeguu_core.logp(f"Failed to refresh the feed of user {user.id}: {e}")
+
+    zeeguu_core.logp(f"refreshed {len(all_preferences)} feeds in {time.time() - start:.2f}s")
+
+
+def age_out_the_cache():
+    """
+
+        instead of wiping the whole cache, which makes every
+        request until the next recompute fall back on a slow
+        recompute, we remove only the expired articles
+        and bound the number of articles per hash
+
+    """
+    ArticlesCache.remove_articles_older_than(session, CACHE_TTL_IN_DAYS)
+    for each in hashes_of_existing_cached_preferences():
+        ArticlesCache.trim_hash(session, each, MAX_CACHED_ARTICLES_PER_HASH)
+    session.commit()
 
 
 def recompute_for_topics_and_languages():
     from zeeguu_core.model import Topic, Language
 
     for each in Topic.get_all_topics():
-        each.all_articles()
+        each.article_ids()
 
     for each in Language.available_languages():
-        each.get_articles()
+        each.article_ids()
 
 
 if __name__ == '__main__':
+    worker_count = DEFAULT_WORKER_COUNT
+    if len(sys.argv) > 1:
+        worker_count = int(sys.argv[1])
+
     clean_the_cache()
-    recompute_for_users()
+    recompute_for_users(worker_count)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+"""
+
+   Script that reports the start-up latency of a worker
+   (importing zeeguu_core.model) and the latency of the
+   first request it serves, with and without the
+   creation of the DB schema at start-up.
+
+   Uses the config pointed to by ZEEGUU_CORE_CONFIG.
+
+   Call like this to average over five runs:
+
+        python report_startup_latency.py 5
+
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+MEASURING_SCRIPT = """
+import json, time
+
+start = time.time()
+import zeeguu_core.model
+from zeeguu_core.model import User
+imported = time.time()
+
+User.query.first()
+first_request = time.time()
+
+print(json.dumps(dict(startup=imported - start, first_request=first_request - imported)))
+"""
+
+
+def _measure(config_file):
+    env = dict(os.environ, ZEEGUU_CORE_CONFIG=config_file)
+    output = subprocess.check_output([sys.executable, "-c", MEASURING_SCRIPT], env=env, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode("utf8").strip().split("\n")[-1])
+
+
+def _config_with(skip_schema_creation):
+    with open(os.environ["ZEEGUU_CORE_CONFIG"]) as f:
+        config = f.read()
+
+    tmp = tempfile.NamedTemporaryFile("w", suffix=".cfg", delete=False)
+    tmp.write(config + f"\nSKIP_DB_SCHEMA_CREATION = {skip_schema_creation}\n")
+    tmp.close()
+    return tmp.name
+
+
+def report(runs):
+    for skip in [False, True]:
+        config_file = _config_with(skip)
+        try:
+            measurements = [_measure(config_file) for _ in range(runs)]
+        finally:
+            os.remove(config_file)
+
+        startup = sum(each['startup'] for each in measurements) / runs * 1000
+        first_request = sum(each['first_request'] for each in measurements) / runs * 1000
+
+        print(f"SKIP_DB_SCHEMA_CREATION = {skip}")
+        print(f"  start-up: {startup:.2f}ms")
+        print(f"  first request: {first_request:.2f}ms")
+
+
+if __name__ == '__main__':
+    runs = 3
+    if len(sys.argv) > 1:
+        runs = int(sys.argv[1])
+
+    report(runs)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""
+
+    Applies to ES the changes of the articles recorded in the
+    article_change outbox (see ArticleChange), which is filled
+    when ELASTIC_SYNC_OUTBOX is set in the config.
+
+    Without arguments, syncs all the changes and exits. With a number
+    of seconds, keeps running, and syncs the new changes every time
+    that many seconds have passed:
+
+        python sync_elastic.py 10
+
+    If ES is down, the changes stay in the outbox, and the sync is
+    tried again after the same interval (or in the next run).
+
+"""
+
+import sys
+import time
+
+import zeeguu_core
+from zeeguu_core.elastic.sync import sync_article_changes
+
+session = zeeguu_core.db.session
+
+
+def sync_all():
+    synced_count = 0
+    while True:
+        count = sync_article_changes(session)
+        if not count:
+            return synced_count
+
+        synced_count += count
+        # the articles of the batch are not needed anymore
+        session.expunge_all()
+
+
+def sync_every(seconds):
+    while True:
+        try:
+            count = sync_all()
+            if count:
+                zeeguu_core.logp(f"synced {count} article changes")
+        except Exception as e:
+            session.rollback()
+            zeeguu_core.logp(f"could not sync the article changes: {e}")
+
+        time.sleep(seconds)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sync_every(int(sys.argv[1]))
+    else:
+        print(f"synced {sync_all()} article changes")
@@ -2,36 +2,147 @@
 
 """
 
-    goes through all the articles in the DB 
-    by language and associates them with the
+    goes through all the articles in the DB
+    and associates them with the
     corresponding topics
-    
+
+    The articles are streamed in batches, in the order of their ids
+    (only the id, title, url and language), and matched against the
+    keywords of the topics of their language in one pass each (see
+    LocalizedTopic.topic_ids_matching_text). Only the (article, topic)
+    pairs which are not in article_topic_map already are inserted,
+    with one statement per batch; the topics of an article are
+    never removed.
+
+    The rows are inserted without the ORM, so the retagged articles
+    are recorded in the article_change outbox explicitly, if it is
+    enabled, and synced by sync_elastic.py. Otherwise the topics field
+    of their ES documents is updated in bulk; if ES is down, the script
+    goes on, and the documents can be fixed with mysql_to_elastic.py.
+
+    The new topics are also added to the full-text index of
+    this node, if it has one.
+
+    Resumable, and can be split in shards (see zeeguu_core.util.checkpoint).
+
+    Call like this to process the second of four shards:
+
+        python tag_existing_articles.py 1 4
+
+    or without arguments, for all the articles.
 
 """
 
+import sys
+import time
+
 import zeeguu_core
-from zeeguu_core.model import Article, Language, LocalizedTopic
+from zeeguu_core.full_text.index import add_article_topics, full_text_index_enabled
+from zeeguu_core.model import Article, ArticleChange, DomainName, LocalizedTopic, Topic, Url
+from zeeguu_core.model.article import article_topic_map
+from zeeguu_core.util.checkpoint import Checkpoint, batches_after
 
 session = zeeguu_core.db.session
 
-counter = 0
+BATCH_SIZE = 1000
+
+
+def _batches_after(article_id, shard, shard_count):
+    query = (session.query(Article.id, Article.title, DomainName.domain_name, Url.path, Article.language_id)
+             .join(Url, Article.url_id == Url.id)
+             .join(DomainName, Url.domain_name_id == DomainName.id))
+
+    return batches_after(query, Article.id, article_id, shard, shard_count, BATCH_SIZE)
+
+
+def _existing_topic_ids(article_ids):
+    topic_ids_of_article = {each: set() for each in article_ids}
+    query = (session.query(article_topic_map.c.article_id, article_topic_map.c.topic_id)
+             .filter(article_topic_map.c.article_id.in_(article_ids)))
+    for article_id, topic_id in query:
+        topic_ids_of_article[article_id].add(topic_id)
+    return topic_ids_of_article
+
+
+def _update_elastic_documents(topic_ids_of_article, topic_title_of_id):
+    """
+
+        sets the topics of the ES documents, in the format
+        of document_from_article, with a single bulk request
+
+    """
+    from zeeguu_core.elastic.client import es_client
+    from zeeguu_core.elastic.settings import ES_ZINDEX
+
+    body = []
+    for article_id, topic_ids in topic_ids_of_article.items():
+        body.append({"update": {"_index": ES_ZINDEX, "_id": article_id}})
+        body.append({"doc": {"topics": " ".join(topic_title_of_id[each] for each in sorted(topic_ids))}})
+
+    try:
+        response = es_client().bulk(body=body)
+        if response.get('errors'):
+            print("some ES documents could not be updated (not indexed yet?)")
+    except Exception as e:
+        print(f"could not update the ES documents: {e}")
+
+
+def tag_existing_articles(shard=0, shard_count=1, update_elastic=True):
+    checkpoint = Checkpoint("tag_existing_articles", shard, shard_count)
+    article_id = checkpoint.last_article_id()
+    print(f"starting after article {article_id} (shard {shard} of {shard_count})")
+
+    topic_title_of_id = dict(session.query(Topic.id, Topic.title))
+
+    start = time.time()
+    article_count = 0
+    new_pair_count = 0
+    retagged_topic_ids = set()
+
+    for batch in _batches_after(article_id, shard, shard_count):
+        topic_ids_of_article = _existing_topic_ids([each[0] for each in batch])
+
+        new_pairs = []
+        for each_id, title, domain_name, path, language_id in batch:
+            matching = LocalizedTopic.topic_ids_matching_text(language_id, title, domain_name + path)
+            for topic_id in matching - topic_ids_of_article[each_id]:
+                new_pairs.append(dict(article_id=each_id, topic_id=topic_id))
+                topic_ids_of_article[each_id].add(topic_id)
+
+        retagged = {each['article_id'] for each in new_pairs}
+        if new_pairs:
+            session.execute(article_topic_map.insert(), new_pairs)
+            ArticleChange.record(session, retagged)
+        session.commit()
+
+        if new_pairs and full_text_index_enabled():
+            add_article_topics([(topic_title_of_id[each['topic_id']], each['article_id']) for each in new_pairs])
+
+        if new_pairs and update_elastic and not ArticleChange.enabled():
+            _update_elastic_documents({each: topic_ids_of_article[each] for each in retagged}, topic_title_of_id)
+
+        article_id = batch[-1][0]
+        checkpoint.save(article_id)
+
+        article_count += len(batch)
+        new_pair_count += len(new_pairs)
+        retagged_topic_ids.update(each['topic_id'] for each in new_pairs)
+        print(f"up to article {article_id}: {article_count} articles, "
+              f"{new_pair_count} new topics in {time.time() - start:.0f}s")
+
+    # the cache of this process; the others expire with its TTL
+    if retagged_topic_ids:
+        for topic in Topic.query.filter(Topic.id.in_(retagged_topic_ids)):
+            topic.clear_all_articles_cache()
 
-languages = Language.available_languages()
+    return new_pair_count
 
-for language in languages:
-    articles = Article.query.filter(Article.language == language).order_by(Article.id.desc()).all()
 
-    loc_topics = LocalizedTopic.all_for_language(language)
+if __name__ == '__main__':
+    shard = 0
+    shard_count = 1
+    if len(sys.argv) > 2:
+        shard = int(sys.argv[1])
+        shard_count = int(sys.argv[2])
 
-    total_articles = len(articles)
-    for article in articles:
-        counter += 1
-        for loc_topic in loc_topics:
-            if loc_topic.matches_article(article):
-                article.add_topic(loc_topic.topic)
-                #print(f" #{loc_topic.topic_translated}: {article.url.as_string()}")
-        session.add(article)
-        if counter % 1000 == 0:
-            percentage = (100 * counter / total_articles) / 100
-            print(f"{counter} dorticles done ({percentage}%). last article id: {article.id}. comitting... ")
-            session.commit()
+    tag_existing_articles(shard, shard_count)
@@ -1,10 +1,10 @@
 import zeeguu_core
-from wordstats import Word
 from zeeguu_core.bookmark_quality import quality_top_bookmark
 
 
 def top_bookmarks(self, count=50):
     from zeeguu_core.model import Bookmark, UserWord
+    from wordstats import Word
 
     def rank(b):
         return Word.stats(b.origin.word, b.origin.language.code).rank
@@ -0,0 +1,39 @@
+"""
+
+ Opaque cursors for paginating recommendations and searches.
+
+ A cursor is the position right after the last item of a page,
+ together with the backend which served the page (positions of
+ one backend mean nothing to the other), encoded as url safe
+ base64 json, so the clients don't depend on what's inside.
+
+"""
+
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(backend, position):
+    data = json.dumps(dict(backend=backend, position=position), separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode("utf8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+
+    :return: the (backend, position) in :param cursor
+
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf8"))
+        return data['backend'], data['position']
+    except Exception as e:
+        raise InvalidCursor(cursor) from e
+
+
+MYSQL_BACKEND = "mysql"
+ELASTIC_BACKEND = "elastic"
@@ -2,39 +2,125 @@
     Recommender that tries elastic first
     If it fails, falls back on the mixed recommender
 
+    Every request is served by exactly one of the two. A circuit
+    breaker remembers when ES is down, so that while it is, the
+    requests go straight to MySQL instead of each of them waiting
+    for ES to time out first; every now and then one request
+    probes whether ES is back.
+
+    The paged variants keep a scroll on the backend it started on:
+    a MySQL cursor goes straight to MySQL. An ES cursor means nothing
+    to MySQL, so when ES fails mid-scroll, MySQL starts from the top.
+
+    When the node has a local full-text index (FTS_INDEX_FILE in the
+    config), the searches fall back on it instead of on MySQL, since
+    it also finds the search terms in the content of the articles.
+
 """
+from collections import Counter
+
 from zeeguu_core import logp as log
+from zeeguu_core.util.circuit_breaker import CircuitBreaker
+
+from zeeguu_core.full_text.index import full_text_index_enabled
+
+from .cursor import decode_cursor, MYSQL_BACKEND
 
 from .elastic_recommender import (
     article_recommendations_for_user as elastic_article_recommendations_for_user,
-    article_search_for_user as elastic_article_search_for_user)
+    article_recommendations_page as elastic_article_recommendations_page,
+    article_search_for_user as elastic_article_search_for_user,
+    article_search_page as elastic_article_search_page)
+
+from .fts_recommender import article_search_for_user as full_text_article_search_for_user
 
 from .mixed_recommender import (
     article_search_for_user as mixed_article_search_for_user,
-    article_recommendations_for_user as mixed_article_recommendations_for_user)
+    article_search_page as mixed_article_search_page,
+    article_recommendations_for_user as mixed_article_recommendations_for_user,
+    article_recommendations_page as mixed_article_recommendations_page)
 
 ES_DOWN_MESSAGE = ">>>>>>>>>>>>>> ElasticSearch seems to be down. Falling back on MySQL recommendations"
 
+ELASTIC = "elastic"
+MYSQL = "mysql"
+MYSQL_AFTER_ELASTIC_FAILED = "mysql_after_elastic_failed"
+FULL_TEXT = "full_text"
+FULL_TEXT_AFTER_ELASTIC_FAILED = "full_text_after_elastic_failed"
+
+elastic_breaker = CircuitBreaker("elastic", failure_threshold=3, reset_timeout_in_seconds=30)
+
+# how many requests were served by which backend
+served_by = Counter()
+
 
 def article_recommendations_for_user(user, count):
-    try:
+    return _serve(lambda: elastic_article_recommendations_for_user(user, count),
+                  lambda: mixed_article_recommendations_for_user(user, count))
 
-        return elastic_article_recommendations_for_user(user, count)
 
-    except Exception as e:
-        log(ES_DOWN_MESSAGE)
+def article_search_for_user(user, count, search_terms):
+    if full_text_index_enabled():
+        return _serve(lambda: elastic_article_search_for_user(user, count, search_terms),
+                      lambda: full_text_article_search_for_user(user, count, search_terms),
+                      FULL_TEXT, FULL_TEXT_AFTER_ELASTIC_FAILED)
 
-    finally:
+    return _serve(lambda: elastic_article_search_for_user(user, count, search_terms),
+                  lambda: mixed_article_search_for_user(user, count, search_terms))
 
-        return mixed_article_recommendations_for_user(user, count)
 
+def article_recommendations_page(user, count, cursor=None):
+    """
 
-def article_search_for_user(user, count, search_terms):
-    try:
+    :return: the article infos, and the cursor of the next page (or None)
+
+    """
+    return _serve_page(cursor,
+                       lambda c: elastic_article_recommendations_page(user, count, c),
+                       lambda c: mixed_article_recommendations_page(user, count, c))
+
+
+def article_search_page(user, count, search_terms, cursor=None):
+    return _serve_page(cursor,
+                       lambda c: elastic_article_search_page(user, count, search_terms, c),
+                       lambda c: mixed_article_search_page(user, count, search_terms, c))
+
+
+def backend_metrics():
+    """
+
+        for monitoring: the state of the breaker and the number
+        of requests served by every backend since start-up
 
-        return elastic_article_search_for_user(user, count, search_terms)
+    """
+    return dict(elastic_breaker=elastic_breaker.state, served_by=dict(served_by))
 
+
+def _serve(from_elastic, from_mysql, fallback=MYSQL, fallback_after_elastic_failed=MYSQL_AFTER_ELASTIC_FAILED):
+    if not elastic_breaker.allow_request():
+        served_by[fallback] += 1
+        return from_mysql()
+
+    try:
+        result = from_elastic()
     except Exception as e:
+        elastic_breaker.record_failure()
         log(ES_DOWN_MESSAGE)
+        log(f"{e} (elastic breaker: {elastic_breaker.state})")
+
+        served_by[fallback_after_elastic_failed] += 1
+        return from_mysql()
+
+    elastic_breaker.record_success()
+    served_by[ELASTIC] += 1
+    return result
+
+
+def _serve_page(cursor, from_elastic, from_mysql):
+    # raises InvalidCursor before any backend is tried
+    if cursor and decode_cursor(cursor)[0] == MYSQL_BACKEND:
+        served_by[MYSQL] += 1
+        return from_mysql(cursor)
 
-        return mixed_article_search_for_user(user, count, search_terms)
+    return _serve(lambda: from_elastic(cursor),
+                  lambda: from_mysql(None))
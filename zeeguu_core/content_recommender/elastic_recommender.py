@@ -7,20 +7,29 @@
 
 """
 
-from elasticsearch import Elasticsearch
-
+from zeeguu_core.content_recommender.cursor import encode_cursor, decode_cursor, InvalidCursor, ELASTIC_BACKEND
+from zeeguu_core.content_recommender.reading_preferences import ReadingPreferences
 from zeeguu_core.model import (
     Article,
-    TopicFilter,
-    TopicSubscription,
-    SearchFilter,
-    SearchSubscription,
-    UserArticle,
-    UserLanguage, Language)
+    RelatedArticle,
+    UserArticle)
 
 from zeeguu_core.elastic.elastic_query_builder import build_elastic_query, build_more_like_this_query
 from zeeguu_core.util.timer_logging_decorator import time_this
-from zeeguu_core.elastic.settings import ES_CONN_STRING, ES_ZINDEX
+from zeeguu_core.elastic.client import es_client
+from zeeguu_core.elastic.converting_from_mysql import article_info_from_document, has_article_info
+from zeeguu_core.elastic.settings import ES_ZINDEX
+
+# the content is not needed for the cards, and is by far the largest field
+CARD_SOURCE_FIELDS = {"excludes": ["content"]}
+
+# how many related articles are precomputed for every article
+RELATED_ARTICLES_COUNT = 20
+
+# a total order, as needed by search_after; ending with _id, which
+# every document has, unlike the id field, which the documents
+# indexed before it was added to document_from_article lack
+SORT = [{"_score": "desc"}, {"published_time": "desc"}, {"_id": "desc"}]
 
 
 def article_recommendations_for_user(user, count):
@@ -40,7 +49,16 @@ def article_recommendations_for_user(user, count):
     return articles
 
 
-@time_this
+def article_recommendations_page(user, count, cursor=None):
+    """
+
+            Like article_recommendations_for_user, a page at a time;
+            see article_search_page
+
+    """
+    return article_search_page(user, count, "", cursor)
+
+
 def article_search_for_user(user, count, search_terms):
     """
     Handles searching.
@@ -53,47 +71,55 @@ def article_search_for_user(user, count, search_terms):
 
     """
 
-    user_languages = Language.all_reading_for_user(user)
+    return article_search_page(user, count, search_terms)[0]
+
+
+@time_this
+def article_search_page(user, count, search_terms, cursor=None):
+    """
+
+            Like article_search_for_user, a page at a time. Every language
+            is paginated with search_after; the cursor holds the sort values
+            of the last hit of every language, or None for the languages
+            which have no more hits.
+
+    :param cursor: returned with the previous page; None for the first page
+
+    :return: the article infos, and the cursor of the next page
+    (None when there are no more articles)
+
+    """
+
+    preferences = ReadingPreferences.for_user(user)
+
+    search_after_for_language = _positions_in(cursor)
 
-    per_language_article_count = count / len(user_languages)
+    # the same for all the languages
+    unwanted_user_topics = [each.keywords for each in preferences.filtered_searches]
+    topics_to_exclude = [each.title for each in preferences.filtered_topics]
+    topics_to_include = [each.title for each in preferences.subscribed_topics]
+    wanted_user_topics = [each.keywords for each in preferences.subscribed_searches]
+    print(f"keywords to exclude: {unwanted_user_topics}")
+    print(f"topics to exclude: {topics_to_exclude}")
+    print(f"topics to include: {topics_to_include}")
+    print(f"keywords to include: {wanted_user_topics}")
 
-    final_article_mix = []
-    for language in user_languages:
-        print(f"language: {language}")
+    per_language_article_count = count // len(preferences.languages)
+
+    languages = preferences.languages
+    if search_after_for_language is not None:
+        languages = [each for each in languages if search_after_for_language.get(each.code)]
+    if not languages:
+        return [], None
+
+    # one query per language, sent together in a single multi-search
+    queries = []
+    for language in languages:
+        print(f"language: {language.code}")
 
         # 0. Ensure appropriate difficulty
-        declared_level_min, declared_level_max = user.levels_for(language)
-        lower_bounds = declared_level_min * 10
-        upper_bounds = declared_level_max * 10
-
-        # 1. Unwanted user topics
-        # ==============================
-        user_search_filters = SearchFilter.all_for_user(user)
-        unwanted_user_topics = []
-        for user_search_filter in user_search_filters:
-            unwanted_user_topics.append(user_search_filter.search.keywords)
-        print(f"keywords to exclude: {unwanted_user_topics}")
-
-        # 2. Topics to exclude / filter out
-        # =================================
-        excluded_topics = TopicFilter.all_for_user(user)
-        topics_to_exclude = [each.topic.title for each in excluded_topics]
-        print(f"topics to exclude: {topics_to_exclude}")
-
-        # 3. Topics subscribed, and thus to include
-        # =========================================
-        topic_subscriptions = TopicSubscription.all_for_user(user)
-        topics_to_include = [subscription.topic.title for subscription in TopicSubscription.all_for_user(user)]
-        print(f"topics to include: {topic_subscriptions}")
-
-        # 4. Wanted user topics
-        # =========================================
-        user_subscriptions = SearchSubscription.all_for_user(user)
-
-        wanted_user_topics = []
-        for sub in user_subscriptions:
-            wanted_user_topics.append(sub.search.keywords)
-        print(f"keywords to include: {wanted_user_topics}")
+        lower_bounds = language.level_min * 10
+        upper_bounds = language.level_max * 10
 
         # build the query using elastic_query_builder
         query_body = build_elastic_query(per_language_article_count,
@@ -105,44 +131,157 @@ def article_search_for_user(user, count, search_terms):
                                          language,
                                          upper_bounds,
                                          lower_bounds)
+        query_body["_source"] = CARD_SOURCE_FIELDS
+
+        query_body["sort"] = SORT
+        if search_after_for_language:
+            query_body["search_after"] = search_after_for_language[language.code]
+
+        queries.append(query_body)
 
-        es = Elasticsearch(ES_CONN_STRING)
-        res = es.search(index=ES_ZINDEX, body=query_body)
+    hit_list = []
+    next_search_after_for_language = {}
+    for language, response in zip(languages, _multi_search(queries)):
+        hits = response['hits'].get('hits')
+        hit_list.extend(hits)
 
-        hit_list = res['hits'].get('hits')
-        final_article_mix.extend(_to_articles_from_ES_hits(hit_list))
+        # a partial page is the last one
+        if hits and len(hits) == per_language_article_count:
+            next_search_after_for_language[language.code] = hits[-1]['sort']
 
-    # convert to article_info and return
-    return [UserArticle.user_article_info(user, article) for article in final_article_mix]
+    next_cursor = None
+    if next_search_after_for_language:
+        next_cursor = encode_cursor(ELASTIC_BACKEND, next_search_after_for_language)
+
+    return _to_article_infos_from_ES_hits(user, hit_list), next_cursor
 
 
 def more_like_this_article(user, count, article_id):
     """
         Given a article ID find more articles like that one via Elasticsearchs "more_like_this" method
 
+        The related articles are precomputed (see compute_related_articles);
+        only the ones of an article for which they were not are computed here.
+        At most RELATED_ARTICLES_COUNT are ever returned.
+
+    """
+    import zeeguu_core
+
+    if not RelatedArticle.has_been_computed(article_id):
+        compute_related_articles(zeeguu_core.db.session, [Article.find_by_id(article_id)])
+        zeeguu_core.db.session.commit()
+
+    # the searched on article is never part of the list
+    return UserArticle.user_article_infos(user, RelatedArticle.related_articles(article_id, count))
+
+
+def compute_related_articles(session, articles):
+    """
+
+        stores the RELATED_ARTICLES_COUNT articles most like each
+        of the :param articles, sending all the more_like_this
+        queries in a single multi-search; does not commit
+
     """
-    article = Article.find_by_id(article_id)
+    if not articles:
+        return
+
+    queries = []
+    for article in articles:
+        # one more, since the article itself is usually among the hits
+        query_body = build_more_like_this_query(RELATED_ARTICLES_COUNT + 1, article.content, article.language)
+        query_body["_source"] = False
+        queries.append(query_body)
+
+    for article, response in zip(articles, _multi_search(queries)):
+        related_article_ids = [int(hit['_id']) for hit in response['hits'].get('hits')
+                               if int(hit['_id']) != article.id]
+        RelatedArticle.store(session, article.id, related_article_ids[:RELATED_ARTICLES_COUNT])
+
 
-    query_body = build_more_like_this_query(count, article.content, article.language)
+def _positions_in(cursor):
+    """
+
+    :return: the search_after values for every language, in
+    a cursor of this backend; None for the first page
+
+    """
+    if not cursor:
+        return None
+
+    backend, position = decode_cursor(cursor)
+    # also the cursors of an older sort, with fewer values
+    if backend != ELASTIC_BACKEND or any(len(each) != len(SORT) for each in position.values()):
+        raise InvalidCursor(cursor)
+    return position
+
+
+def _multi_search(query_bodies):
+    """
+
+        sends all the :param query_bodies in a single request
+
+    :return: the responses, in the order of the queries
+
+    """
+    request = []
+    for each in query_bodies:
+        request.append({"index": ES_ZINDEX})
+        request.append(each)
 
-    es = Elasticsearch(ES_CONN_STRING)
-    res = es.search(index=ES_ZINDEX, body=query_body)  # execute search
-    hit_list = res['hits'].get('hits')
+    responses = es_client().msearch(body=request)['responses']
 
-    # TODO need to make sure either that the searched on article is always a part of the list \
-    #  or that it is never there.
-    #  it could be used to show on website; you searched on X, here is what we found related to X
+    # a failed query is an error, as it would be for es.search
+    for each in responses:
+        if 'error' in each:
+            raise Exception(f"elastic search failed: {each['error']}")
 
-    final_article_mix = _to_articles_from_ES_hits(hit_list)
-    return [UserArticle.user_article_info(user, article) for article in final_article_mix]
+    return responses
 
 
 def _list_to_string(input_list):
     return ' '.join([each for each in input_list]) or ''
 
 
-def _to_articles_from_ES_hits(hits):
-    articles = []
+def _to_article_infos_from_ES_hits(user, hits):
+    """
+
+        the article infos of the :param hits, in ES ranking order,
+        built from the _source of the hits; only the documents
+        indexed before they had all the article info fields are
+        loaded from the DB. the flags of the :param user are then
+        added with a constant number of queries
+
+    """
+    info_for_id = {}
+    hits_without_info = []
     for hit in hits:
-        articles.append(Article.find_by_id(hit.get("_id")))
-    return articles
+        source = hit.get('_source', {})
+        if has_article_info(source):
+            info_for_id[int(hit['_id'])] = article_info_from_document(source)
+        else:
+            hits_without_info.append(hit)
+
+    UserArticle.add_user_info(user, list(info_for_id.values()))
+
+    for each in UserArticle.user_article_infos(user, _to_articles_from_ES_hits(hits_without_info)):
+        info_for_id[each['id']] = each
+
+    article_ids = [int(hit['_id']) for hit in hits]
+    return [info_for_id[each] for each in article_ids if each in info_for_id]
+
+
+def _to_articles_from_ES_hits(hits):
+    """
+
+        the articles of the :param hits, loaded with a single query,
+        in the order in which ES ranked them; hits for articles which
+        are not in the DB anymore are skipped
+
+    """
+    article_ids = [int(hit.get("_id")) for hit in hits]
+    if not article_ids:
+        return []
+
+    article_for_id = {each.id: each for each in Article.query.filter(Article.id.in_(article_ids))}
+    return [article_for_id[each] for each in article_ids if each in article_for_id]
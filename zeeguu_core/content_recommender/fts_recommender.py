@@ -0,0 +1,72 @@
+"""
+
+ Recommender that searches the local full-text index (see
+ zeeguu_core.full_text.index) instead of ElasticSearch.
+
+ Has the same filters as the elastic recommender, but, unlike
+ the mixed recommender, it also finds the search terms in the
+ content of the articles.
+
+"""
+
+from zeeguu_core.content_recommender.reading_preferences import ReadingPreferences
+from zeeguu_core.full_text.index import search
+from zeeguu_core.model import Article, UserArticle
+from zeeguu_core.util.timer_logging_decorator import time_this
+
+
+def article_recommendations_for_user(user, count):
+    return article_search_for_user(user, count, "")
+
+
+@time_this
+def article_search_for_user(user, count, search_terms):
+    """
+
+    :param count: max amount of articles to return
+    :param search_terms: the inputed search string by the user
+    :return: article infos
+
+    """
+    preferences = ReadingPreferences.for_user(user)
+    if not preferences.languages:
+        return []
+
+    per_language_article_count = count // len(preferences.languages)
+
+    # like in the mixed recommender, the subscribed topics
+    # restrict the recommendations, but not the searches
+    topics_to_include = []
+    if not search_terms:
+        topics_to_include = [each.title for each in preferences.subscribed_topics]
+
+    article_ids = []
+    for language in preferences.languages:
+        article_ids.extend(search(per_language_article_count,
+                                  search_terms,
+                                  language.code,
+                                  language.level_min * 10,
+                                  language.level_max * 10,
+                                  topics_to_include,
+                                  [each.title for each in preferences.filtered_topics],
+                                  [each.keywords for each in preferences.filtered_searches]))
+
+    return UserArticle.user_article_infos(user, _articles_in_order(article_ids))
+
+
+def _articles_in_order(article_ids):
+    """
+
+        the articles with the :param article_ids, loaded with a single
+        query, in the same order; the ones which were deleted from the
+        DB, or marked broken since they were indexed, are skipped
+
+    """
+    if not article_ids:
+        return []
+
+    article_for_id = {each.id: each for each in Article.query
+                      .filter(Article.id.in_(article_ids))
+                      .filter(Article.broken == 0)}
+
+    return [article_for_id[each] for each in article_ids if each in article_for_id]
@@ -6,21 +6,35 @@
 
 """
 
-from sqlalchemy import not_, or_
-from zeeguu_core import info, logger
+from datetime import datetime
+
+from sqlalchemy import and_, not_, or_
+
+from zeeguu_core import logger
+from zeeguu_core.constants import JSON_TIME_FORMAT
+from zeeguu_core.content_recommender.cursor import encode_cursor, decode_cursor, InvalidCursor, MYSQL_BACKEND
+from zeeguu_core.content_recommender.reading_preferences import ReadingPreferences
+from zeeguu_core.content_recommender.word_prefix_index import word_prefix_index
 from zeeguu_core.model import (
     Article,
     UserArticle,
-    UserLanguage,
-    TopicFilter,
-    TopicSubscription,
-    SearchFilter,
-    SearchSubscription,
     ArticleWord,
+    ArticleContentToken,
     ArticlesCache,
-    CohortArticleMap, Language)
+    CohortArticleMap,
+    RecommendationFeed)
+
+# the number of recommendations kept in the materialized feed of
+# a user; requests for more than these are computed on the fly
+FEED_SIZE = 42
 
-from sortedcontainers import SortedList
+# the feeds are normally refreshed by the crawler; this is a bound
+# for the users for which that doesn't happen
+FEED_MAX_AGE_IN_HOURS = 24
+
+# above this, the ids found by the in-process word index would make
+# an IN list too long for a statement; the subqueries are used instead
+MAX_ARTICLE_IDS_FROM_INDEX = 1000
 
 
 def article_recommendations_for_user(user, count):
@@ -35,25 +49,125 @@ def article_recommendations_for_user(user, count):
 
     """
 
+    return article_recommendations_page(user, count)[0]
+
+
+def article_recommendations_page(user, count, cursor=None):
+    """
+
+            Like article_recommendations_for_user, a page at a time.
+
+    :param cursor: returned with the previous page; None for the first page
+
+    :return: the article infos, and the cursor of the next page
+    (None when there are no more articles)
+
+    """
+
     # Temporary fix for the experiment of Gabriel
     AIKI_USERS_COHORT_ID = 109
     if user.cohort_id == AIKI_USERS_COHORT_ID:
-        return CohortArticleMap.get_articles_info_for_cohort(user.cohort)
+        return CohortArticleMap.get_articles_info_for_cohort(user.cohort), None
+
+    preferences = ReadingPreferences.for_user(user)
+    if not preferences.languages:
+        return [user.learned_language], None
+
+    after = _position_in(cursor)
+
+    article_infos = None
+    if count <= FEED_SIZE:
+        feed_article_infos = _feed_for_user(user, preferences)
+        article_infos = [each for each in _without_broken_or_deleted(feed_article_infos)
+                         if not after or _position_of(each) < after][:count]
+
+        # the page goes beyond the end of the feed
+        if len(article_infos) < count and len(feed_article_infos) == FEED_SIZE:
+            article_infos = None
+
+    if article_infos is None:
+        article_infos = Article.article_infos(_ranked_articles_for_user(user, preferences, count, after))
+
+    return UserArticle.add_user_info(user, article_infos), _next_cursor(article_infos, count)
+
+
+def refresh_feed(user, preferences, session):
+    """
+
+            Recomputes and stores the materialized feed of the :param user;
+            called by the crawler for the recent users, and on demand, when
+            the feed of a user is stale. Does not commit.
 
+    :return: the article infos in the feed
+
+    """
+    article_infos = Article.article_infos(_ranked_articles_for_user(user, preferences, FEED_SIZE))
+    RecommendationFeed.store(session, user.id, preferences.hash, preferences.levels, article_infos)
+    return article_infos
+
+
+def _feed_for_user(user, preferences):
     import zeeguu_core
 
-    user_languages = Language.all_reading_for_user(user)
-    if not user_languages:
-        return [user.learned_language]
+    feed = RecommendationFeed.find_fresh(user.id, preferences.hash, preferences.levels, FEED_MAX_AGE_IN_HOURS)
+    if feed:
+        return feed.all_article_infos()
+
+    # the reading preferences or the levels changed, or the feed is old
+    logger.info(f"Refreshing the feed of user {user.id}")
+    article_infos = refresh_feed(user, preferences, zeeguu_core.db.session)
+    zeeguu_core.db.session.commit()
+    return article_infos
+
+
+def _without_broken_or_deleted(article_infos):
+    """
+
+        the articles of a feed can be marked broken, or deleted,
+        after it was computed; checked with a single query
+
+    """
+    if not article_infos:
+        return []
+
+    available_ids = {each for (each,) in Article.query
+                     .with_entities(Article.id)
+                     .filter(Article.id.in_([info['id'] for info in article_infos]))
+                     .filter(Article.broken == 0)}
+
+    return [each for each in article_infos if each['id'] in available_ids]
+
+
+def _ranked_articles_for_user(user, preferences, count, after=None):
+    """
+
+            The most recent :param count articles cached for the reading
+            preferences of the user which fit the difficulty levels of
+            the user; the cached articles of a hash are shared with all
+            the users with the same preferences, but not the same levels
+
+    :param after: (published_time, id) of the last article of the previous page
+
+    """
+    import zeeguu_core
+
+    _recompute_recommender_cache_if_needed(user, zeeguu_core.db.session, preferences)
+
+    # in batches of more than needed, since some won't fit the levels of the user
+    batch_size = count * 3
 
-    reading_pref_hash = _reading_preferences_hash(user)
-    _recompute_recommender_cache_if_needed(user, zeeguu_core.db.session)
-    all_articles = ArticlesCache.get_articles_for_hash(reading_pref_hash, count)
-    all_articles = [each for each in all_articles if (not each.broken
-                                                      and each.published_time)]
-    all_articles = SortedList(all_articles, lambda x: x.published_time)
+    ranked = []
+    while len(ranked) < count:
+        candidates = ArticlesCache.get_articles_for_hash(preferences.hash, batch_size, after) or []
+        ranked.extend([each for each in candidates if (not each.broken
+                                                        and each.published_time
+                                                        and _fits_difficulty_levels(each, preferences))])
 
-    return [UserArticle.user_article_info(user, article) for article in reversed(all_articles)]
+        if len(candidates) < batch_size or not candidates[-1].published_time:
+            break
+        after = (candidates[-1].published_time, candidates[-1].id)
+
+    return ranked[:count]
 
 
 def article_search_for_user(user, count, search):
@@ -67,27 +181,114 @@ def article_search_for_user(user, count, search):
 
     """
 
-    all_articles = _get_user_articles_sources_languages(user, 2500)
-    # We are just using the first and second word of the user's search now
-    search_articles = _get_articles_for_search_term(search)
+    return article_search_page(user, count, search)[0]
+
+
+def article_search_page(user, count, search, cursor=None):
+    """
+
+            Like article_search_for_user, a page at a time.
+
+    :param cursor: returned with the previous page; None for the first page
+
+    :return: the article infos, and the cursor of the next page
+    (None when there are no more articles)
+
+    """
+
+    preferences = ReadingPreferences.for_user(user)
+
+    query = _article_search_query(preferences, search.lower().split())
+    if query is None:
+        return [], None
+
+    after = _position_in(cursor)
+    if after:
+        query = query.filter(Article.after_in_recency_order(*after))
+
+    # the first 'count' articles will be the most recent ones
+    query = query.order_by(Article.published_time.desc(), Article.id.desc()).limit(count)
+
+    article_infos = UserArticle.user_article_infos(user, query.all())
+    return article_infos, _next_cursor(article_infos, count)
+
+
+def _position_in(cursor):
+    """
+
+    :return: the (published_time, id) in a cursor of this backend
+
+    """
+    if not cursor:
+        return None
+
+    backend, position = decode_cursor(cursor)
+    if backend != MYSQL_BACKEND:
+        raise InvalidCursor(cursor)
+
+    try:
+        published, article_id = position
+        return datetime.strptime(published, JSON_TIME_FORMAT), int(article_id)
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def _position_of(article_info):
+    return datetime.strptime(article_info['published'], JSON_TIME_FORMAT), article_info['id']
+
+
+def _next_cursor(article_infos, count):
+    # a partial page is the last one
+    if not article_infos or len(article_infos) < count:
+        return None
+
+    last = article_infos[-1]
+    return encode_cursor(MYSQL_BACKEND, [last['published'], last['id']])
+
+
+def _article_search_query(preferences, search_terms):
+    """
+
+        Articles in the reading languages of the user, at the right
+        difficulty, that contain words starting with every one of
+        the :param search_terms
+
+        The term postings are subqueries; the whole search runs
+        in the database and touches only the returned rows. With the
+        in-process word index, the ids of the articles containing all
+        the terms come from the index instead
 
-    if search_articles is None:
-        final = []
-    else:
-        s = set(all_articles)
-        final = [article for article in search_articles if article in s]
-        if len(final) < 5:
-            all_articles = _get_user_articles_sources_languages(user)
-            s = set(all_articles)
-            final = [article for article in search_articles if article in s]
+    :return: a query, or None when there's nothing to search for
+    (or, with the in-process index, when nothing is found)
 
-    # Sort them, so the first 'count' articles will be the most recent ones
-    final.sort(key=lambda each: each.published_time, reverse=True)
+    """
+
+    if not search_terms or not preferences.languages:
+        return None
+
+    query = Article.query
+    query = query.filter(Article.broken == 0)
+    query = query.filter(Article.word_count > Article.MINIMUM_WORD_COUNT)
+    query = query.filter(or_(*[and_(Article.language_id == language.id,
+                                    language.level_min * 10 < Article.fk_difficulty,
+                                    Article.fk_difficulty < language.level_max * 10)
+                               for language in preferences.languages]))
+
+    index = word_prefix_index()
+    if index is not None:
+        article_ids = index.article_ids_for_all_prefixes(search_terms)
+        if not article_ids:
+            return None
+        if len(article_ids) <= MAX_ARTICLE_IDS_FROM_INDEX:
+            return query.filter(Article.id.in_(article_ids.tolist()))
 
-    return [UserArticle.user_article_info(user, article) for article in final[:count]]
+    for each in search_terms:
+        query = query.filter(Article.id.in_(ArticleWord.article_ids_for_word_prefix(each)))
 
+    return query
 
-def _recompute_recommender_cache_if_needed(user, session):
+
+def _recompute_recommender_cache_if_needed(user, session, preferences=None):
     """
 
             This method first checks if there is an existing hash for the
@@ -97,67 +298,65 @@ def _recompute_recommender_cache_if_needed(user, session):
 
     :param user: To retrieve the subscriptions of the user
     :param session: Needed to store in the db
+    :param preferences: the ReadingPreferences of the user, if already loaded
 
     """
 
-    reading_pref_hash = _reading_preferences_hash(user)
+    preferences = preferences or ReadingPreferences.for_user(user)
+    reading_pref_hash = preferences.hash
     logger.info(f"Pref hash: {reading_pref_hash}")
 
     articles_hash_obj = ArticlesCache.check_if_hash_exists(reading_pref_hash)
 
     if articles_hash_obj is False:
         logger.info("Recomputing recommender cache...")
-        _recompute_recommender_cache(reading_pref_hash, session, user)
+        _recompute_recommender_cache(reading_pref_hash, session, user, preferences=preferences)
 
     logger.info("No need to recomputed recommender cache.")
 
 
-def _recompute_recommender_cache(reading_preferences_hash_code, session, user, article_limit=42):
+def _recompute_recommender_cache(reading_preferences_hash_code, session, user, article_limit=42, preferences=None):
     """
 
     :param reading_preferences_hash_code:
     :param session:
     :param user:
+    :param preferences: the ReadingPreferences of the user, if already loaded
 
     :param article_limit: set to something low ... say 42 when working in real time... ti's
     a bit slow otherwise. however, when caching offline you can save
 
     :return:
     """
-    all_articles = _find_articles_for_user(user)
+    all_articles = _find_articles_for_user(user, article_limit, preferences)
 
-    for art in all_articles:
-        cache_obj = ArticlesCache(art, reading_preferences_hash_code)
-        session.add(cache_obj)
-        session.commit()
+    # one multi-row insert and one commit, instead of a commit per article
+    ArticlesCache.add_articles_for_hash(session, reading_preferences_hash_code, all_articles)
+    session.commit()
 
 
-def _find_articles_for_user(user):
+def _find_articles_for_user(user, article_limit=42, preferences=None):
     """
     This method gets all the topic and search subscriptions for a user.
     It then returns all the articles that are associated with these.
 
     :param user:
+    :param article_limit: total number of articles, over all the user languages
+    :param preferences: the ReadingPreferences of the user, if already loaded
     :return:
     """
 
-    user_languages = Language.all_reading_for_user(user)
-
-    topic_subscriptions = TopicSubscription.all_for_user(user)
-
-    search_subscriptions = SearchSubscription.all_for_user(user)
+    preferences = preferences or ReadingPreferences.for_user(user)
 
-    subscribed_articles = _filter_subscribed_articles(search_subscriptions, topic_subscriptions, user_languages, user)
+    subscribed_articles = _filter_subscribed_articles(preferences, article_limit)
 
     return subscribed_articles
 
 
-def _filter_subscribed_articles(search_subscriptions, topic_subscriptions, user_languages, user):
+def _filter_subscribed_articles(preferences, total_article_count=42):
     """
-    :param subscribed_articles:
-    :param user_filters:
-    :param user_languages:
-    :param user_search_filters:
+    :param preferences: the ReadingPreferences of the user
+    :param total_article_count: split equally between the user languages
     :return:
 
             a generator which retrieves articles as needed
@@ -165,56 +364,46 @@ def _filter_subscribed_articles(search_subscriptions, topic_subscriptions, user_
     """
 
     from zeeguu_core.model import Topic
-    user_search_filters = SearchFilter.all_for_user(user)
 
-    # TODO: shouldn't this be passed down from upstream?
-    total_article_count = 30
-    per_language_article_count = total_article_count / len(user_languages)
+    per_language_article_count = total_article_count // len(preferences.languages)
 
     final_article_mix = set()
-    for language in user_languages:
-        print(f"language: {language}")
+    for language in preferences.languages:
+        print(f"language: {language.code}")
 
         query = Article.query
         query = query.order_by(Article.id.desc())
-        query = query.filter(Article.language == language)
+        query = query.filter(Article.language_id == language.id)
         query = query.filter(Article.broken == False)
 
         # speed up a bit the stuff
         # query = query.filter(Article.id > 500000)
 
         # 0. Ensure appropriate difficulty
-        declared_level_min, declared_level_max = user.levels_for(language)
-        lower_bounds = declared_level_min * 10
-        upper_bounds = declared_level_max * 10
+        lower_bounds = language.level_min * 10
+        upper_bounds = language.level_max * 10
 
         query = query.filter(lower_bounds < Article.fk_difficulty)
         query = query.filter(upper_bounds > Article.fk_difficulty)
 
         # 1. Keywords to exclude
         # ==============================
-        keywords_to_avoid = []
-        for user_search_filter in user_search_filters:
-            keywords_to_avoid.append(user_search_filter.search.keywords)
+        keywords_to_avoid = [each.keywords for each in preferences.filtered_searches]
         print(f"keywords to exclude: {keywords_to_avoid}")
 
+        # an anti-join on the token index, instead of a LIKE over the content
         for keyword_to_avoid in keywords_to_avoid:
-            query = query.filter(not_(or_(Article.title.contains(keyword_to_avoid),
-                                          Article.content.contains(
-                                              keyword_to_avoid))))  # title does not contain keywords
+            query = query.filter(not_(Article.id.in_(ArticleContentToken.article_ids_containing(keyword_to_avoid))))
 
         # 2. Topics to exclude / filter out
         # =================================
-        user_filters = TopicFilter.all_for_user(user)
-        to_exclude_topic_ids = [each.topic.id for each in user_filters]
+        to_exclude_topic_ids = [each.id for each in preferences.filtered_topics]
         print(f"to exlcude topic ids: {to_exclude_topic_ids}")
-        print(f"topics to exclude: {user_filters}")
         query = query.filter(not_(Article.topics.any(Topic.id.in_(to_exclude_topic_ids))))
 
         # 3. Topics subscribed, and thus to include
         # =========================================
-        ids_of_topics_to_include = [subscription.topic.id for subscription in topic_subscriptions]
-        # print(f"topics to include: {topic_subscriptions}")
+        ids_of_topics_to_include = [each.id for each in preferences.subscribed_topics]
         print(f"topics ids to include: {ids_of_topics_to_include}")
         # we comment out this line, because we want to do an or_between it and the
         # one corresponding to searches later below!
@@ -222,10 +411,10 @@ def _filter_subscribed_articles(search_subscriptions, topic_subscriptions, user_
 
         # 4. Searches to include
         # ======================
-        print(f"Search subscriptions: {search_subscriptions}")
+        print(f"Search subscriptions: {preferences.subscribed_searches}")
         ids_for_articles_containing_search_terms = set()
-        for user_search in search_subscriptions:
-            search_string = user_search.search.keywords.lower()
+        for user_search in preferences.subscribed_searches:
+            search_string = user_search.keywords.lower()
 
             articles_for_word = ArticleWord.get_articles_for_word(search_string)
 
@@ -246,40 +435,60 @@ def _filter_subscribed_articles(search_subscriptions, topic_subscriptions, user_
     return final_article_mix
 
 
-def _get_user_articles_sources_languages(user, limit=1000):
+def _article_fits_reading_preferences(article, preferences):
     """
 
-    This method is used to get all the user articles for the sources if there are any
-    selected sources for the user, and it otherwise gets all the articles for the
-    current learning languages for the user.
+        The in-memory counterpart of _filter_subscribed_articles: decides
+        for a single, freshly crawled, article whether it would have been
+        selected for the reading :param preferences of a user.
 
-    :param user: the user for which the articles should be fetched
-    :param limit: the amount of articles for each source or language
-    :return: a list of articles based on the parameters
+        Used to append new articles to existing ArticlesCache hashes
+        without recomputing them from scratch.
 
     """
 
-    user_languages = Language.all_reading_for_user(user)
-    all_articles = []
+    if article.broken or not article.published_time:
+        return False
 
-    for language in user_languages:
-        info(f'Getting articles for {language}')
-        new_articles = language.get_articles(most_recent_first=True)
-        all_articles.extend(new_articles)
-        info(f'Added {len(new_articles)} articles for {language}')
+    # 0. In the right language, with appropriate difficulty
+    if not _fits_difficulty_levels(article, preferences):
+        return False
 
-    return all_articles
+    # 1. Keywords to exclude
+    article_tokens = ArticleContentToken.tokens_of_article(article)
+    for each in preferences.filtered_searches:
+        if ArticleContentToken.keywords_in(each.keywords, article_tokens):
+            return False
 
+    # 2. Topics to exclude
+    article_topic_ids = set([topic.id for topic in article.topics])
+    to_exclude_topic_ids = set([each.id for each in preferences.filtered_topics])
+    if article_topic_ids & to_exclude_topic_ids:
+        return False
 
-def _get_articles_for_search_term(search_term):
-    search_terms = search_term.lower().split()
+    # 3. and 4. Topics or searches to include; without any subscriptions
+    # all the remaining articles in the user's languages are a match
+    ids_of_topics_to_include = set([each.id for each in preferences.subscribed_topics])
+    search_strings = [each.keywords.lower() for each in preferences.subscribed_searches]
 
-    individual_term_results = []
+    if not (ids_of_topics_to_include or search_strings):
+        return True
+
+    if article_topic_ids & ids_of_topics_to_include:
+        return True
+
+    article_words = [each.word for each in article.words]
+    return any(word.startswith(search_string)
+               for search_string in search_strings
+               for word in article_words)
 
-    for each in search_terms:
-        individual_term_results.append(set(ArticleWord.get_articles_for_word(each)))
 
-    return individual_term_results[0].intersection(*individual_term_results[1:])
+def _fits_difficulty_levels(article, preferences):
+    language = preferences.language_with_id(article.language_id)
+    if not language:
+        return False
+
+    return language.level_min * 10 < article.fk_difficulty < language.level_max * 10
 
 
 def _reading_preferences_hash(user):
@@ -291,21 +500,19 @@ def _reading_preferences_hash(user):
     :return: articles_hash: ArticlesHash
 
     """
-    user_filter_subscriptions = TopicFilter.all_for_user(user)
-    filters = [topic_id.topic for topic_id in user_filter_subscriptions]
-
-    user_topic_subscriptions = TopicSubscription.all_for_user(user)
-    topics = [topic_id.topic for topic_id in user_topic_subscriptions]
-
-    user_languages = Language.all_reading_for_user(user)
+    return ReadingPreferences.for_user(user).hash
 
-    user_search_filters = SearchFilter.all_for_user(user)
 
-    search_filters = [search_id.search for search_id in user_search_filters]
-    user_searches = SearchSubscription.all_for_user(user)
+def _reading_preferences_hashes(user_ids):
+    """
 
-    searches = [search_id.search for search_id in user_searches]
+            Set-based version of _reading_preferences_hash: computes the
+            hashes of all the :param user_ids with one query for every kind
+            of preference, instead of five queries for every user.
 
-    articles_hash = ArticlesCache.calculate_hash(topics, filters, searches, search_filters, user_languages)
+    :param user_ids:
+    :return: dict from user id to hash
 
-    return articles_hash
+    """
+    return {user_id: preferences.hash
+            for user_id, preferences in ReadingPreferences.for_users(user_ids).items()}
@@ -0,0 +1,162 @@
+"""
+
+ An immutable snapshot of the reading preferences of a user:
+ the reading languages together with the difficulty levels,
+ the subscribed and filtered topics, and the subscribed and
+ filtered searches.
+
+ The snapshot is loaded with a fixed number of queries, once
+ per request, by the entry points of the recommenders, and is
+ then passed down, instead of every step of the recommenders
+ querying the subscriptions again. It is not kept across
+ requests, so a change of the preferences is seen by the very
+ next request, of any process.
+
+"""
+
+from collections import defaultdict
+from typing import NamedTuple, Tuple
+
+from sqlalchemy.orm import joinedload
+
+import zeeguu_core
+
+
+class LanguagePreference(NamedTuple):
+    id: int
+    code: str
+    name: str
+    level_min: int
+    level_max: int
+
+
+class TopicPreference(NamedTuple):
+    id: int
+    title: str
+
+
+class SearchPreference(NamedTuple):
+    id: int
+    keywords: str
+
+
+class ReadingPreferences(NamedTuple):
+    user_id: int
+    languages: Tuple[LanguagePreference, ...]
+    subscribed_topics: Tuple[TopicPreference, ...]
+    filtered_topics: Tuple[TopicPreference, ...]
+    subscribed_searches: Tuple[SearchPreference, ...]
+    filtered_searches: Tuple[SearchPreference, ...]
+
+    @property
+    def hash(self):
+        """
+
+            the key of these preferences in the ArticlesCache
+
+        """
+        from zeeguu_core.model import ArticlesCache
+
+        return ArticlesCache.calculate_hash(self.subscribed_topics,
+                                            self.filtered_topics,
+                                            self.subscribed_searches,
+                                            self.filtered_searches,
+                                            self.languages)
+
+    @property
+    def levels(self):
+        """
+
+            the difficulty levels of every language, which the hash leaves out
+
+        """
+        return " ".join(f"{each.code}:{each.level_min}-{each.level_max}" for each in self.languages)
+
+    def language_with_id(self, language_id):
+        """
+
+        :return: the LanguagePreference for :param language_id, or
+        None if it's not one of the reading languages of the user
+
+        """
+        for each in self.languages:
+            if each.id == language_id:
+                return each
+        return None
+
+    @classmethod
+    def for_user(cls, user):
+        """
+
+            loads the reading preferences of :param user
+
+        """
+        return cls.for_users([user.id])[user.id]
+
+    @classmethod
+    def for_users(cls, user_ids):
+        """
+
+            loads the reading preferences of all the :param user_ids
+            with one query for every kind of preference, regardless
+            of the number of users
+
+        :return: dict from user id to ReadingPreferences
+
+        """
+        from zeeguu_core.model import (User, Cohort, UserLanguage, Topic, Search,
+                                       TopicFilter, TopicSubscription, SearchFilter, SearchSubscription)
+
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+
+        session = zeeguu_core.db.session
+
+        def _by_user(subscription_class, subscribed_class, foreign_key, to_preference):
+            # ordered by subscription, so the hashes are stable
+            query = (session.query(subscription_class.user_id, subscribed_class)
+                     .join(subscribed_class, foreign_key == subscribed_class.id)
+                     .filter(subscription_class.user_id.in_(user_ids))
+                     .order_by(subscription_class.id))
+
+            result = defaultdict(list)
+            for user_id, each in query:
+                result[user_id].append(to_preference(each))
+            return result
+
+        def _topic(topic):
+            return TopicPreference(topic.id, topic.title)
+
+        def _search(search):
+            return SearchPreference(search.id, search.keywords)
+
+        filtered_topics = _by_user(TopicFilter, Topic, TopicFilter.topic_id, _topic)
+        subscribed_topics = _by_user(TopicSubscription, Topic, TopicSubscription.topic_id, _topic)
+        filtered_searches = _by_user(SearchFilter, Search, SearchFilter.search_id, _search)
+        subscribed_searches = _by_user(SearchSubscription, Search, SearchSubscription.search_id, _search)
+
+        user_languages = {(each.user_id, each.language_id): each
+                          for each in UserLanguage.query.filter(UserLanguage.user_id.in_(user_ids))}
+
+        users = (User.query
+                 .options(joinedload(User.learned_language),
+                          joinedload(User.cohort).joinedload(Cohort.language))
+                 .filter(User.id.in_(user_ids)))
+
+        result = {}
+        for user in users:
+            # currently a user reads only in the learned language
+            languages = []
+            for language in [user.learned_language]:
+                level_min, level_max = user.levels_given(user_languages.get((user.id, language.id)), language)
+                languages.append(LanguagePreference(language.id, language.code, language.name, level_min, level_max))
+
+            result[user.id] = cls(user.id,
+                                  tuple(languages),
+                                  tuple(subscribed_topics[user.id]),
+                                  tuple(filtered_topics[user.id]),
+                                  tuple(subscribed_searches[user.id]),
+                                  tuple(filtered_searches[user.id]))
+        return result
+
@@ -0,0 +1,274 @@
+"""
+
+ In-process index of the words of the articles (see ArticleWord),
+ for answering the prefix searches without a LIKE over article_word
+ and a join with the whole article_word_map for every term.
+
+   - the distinct words are kept in a sorted list, so the words with a
+     given prefix are a contiguous range, found with two bisections
+   - the posting list of a word is a sorted array('I') of article ids,
+     four bytes per id instead of a python int
+   - a multi-term query intersects the postings of the terms, starting
+     from the shortest, galloping through the longer ones
+
+ The index only knows about ids; the article ids it returns are still
+ to be filtered (language, difficulty, broken) by the caller.
+
+ Article ids only grow, so the index is kept up to date by loading the
+ words of the articles with an id greater than the largest it has seen,
+ at most every REFRESH_INTERVAL_IN_SECONDS; the crawler adds the words
+ of the articles it downloads to the index of its own process, if loaded.
+
+ Enabled by setting IN_PROCESS_WORD_INDEX = True in the config.
+
+"""
+
+import bisect
+import threading
+import time
+from array import array
+
+import zeeguu_core
+from zeeguu_core.model.article_word import ArticleWord, article_word_map
+
+REFRESH_INTERVAL_IN_SECONDS = 60
+
+# rows loaded from article_word_map at a time
+LOAD_BATCH_SIZE = 50000
+
+
+class WordPrefixIndex:
+    def __init__(self):
+        self._words = []
+        self._postings = []
+        self._largest_article_id = 0
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._words)
+
+    def add(self, word, article_ids):
+        """
+
+            adds the :param article_ids to the postings of :param word
+
+        """
+        with self._lock:
+            self._add(word, article_ids)
+
+    def add_article(self, article_id, words):
+        with self._lock:
+            for each in set(words):
+                self._add(each, [article_id])
+
+    def article_ids_for_prefix(self, prefix):
+        """
+
+        :return: the sorted ids of the articles with
+        a word which starts with :param prefix
+
+        """
+        with self._lock:
+            return self._article_ids_for_prefix(prefix)
+
+    def article_ids_for_all_prefixes(self, prefixes):
+        """
+
+        :return: the sorted ids of the articles which have, for every
+        one of the :param prefixes, a word starting with it
+
+        """
+        with self._lock:
+            postings = sorted((self._article_ids_for_prefix(each) for each in prefixes), key=len)
+
+        if not postings:
+            return array('I')
+
+        result = postings[0]
+        for each in postings[1:]:
+            result = _intersect(result, each)
+            if not result:
+                break
+        return result
+
+    def _article_ids_for_prefix(self, prefix):
+        first, last = self._range_of(prefix)
+        if last - first == 1:
+            # a copy, since the postings grow while the caller uses them
+            return array('I', self._postings[first])
+
+        merged = set()
+        for postings in self._postings[first:last]:
+            merged.update(postings)
+        return array('I', sorted(merged))
+
+    def refresh(self, force=False):
+        """
+
+            loads the words of the articles added since the last
+            refresh; a no-op if it was refreshed recently
+
+        """
+        if not force and self._refreshed_at and time.time() - self._refreshed_at < REFRESH_INTERVAL_IN_SECONDS:
+            return
+
+        with self._lock:
+            self._refreshed_at = time.time()
+
+            # collected for all the batches, and added at once
+            article_ids_of_word = {}
+            after = self._largest_article_id
+            while True:
+                rows = (zeeguu_core.db.session.query(ArticleWord.word, article_word_map.c.article_id)
+                        .join(article_word_map, ArticleWord.id == article_word_map.c.word_id)
+                        .filter(article_word_map.c.article_id > after)
+                        .order_by(article_word_map.c.article_id)
+                        .limit(LOAD_BATCH_SIZE)
+                        .all())
+
+                for word, article_id in rows:
+                    article_ids_of_word.setdefault(word, array('I')).append(article_id)
+
+                # a batch can end in the middle of the words of an article;
+                # the rest of them are loaded again with the next batch
+                if len(rows) < LOAD_BATCH_SIZE:
+                    break
+                after = rows[-1][1] - 1
+
+            self._add_all(article_ids_of_word)
+
+    def _add(self, word, article_ids):
+        position = bisect.bisect_left(self._words, word)
+        if position == len(self._words) or self._words[position] != word:
+            self._words.insert(position, word)
+            self._postings.insert(position, array('I'))
+
+        self._add_to_postings(self._postings[position], article_ids)
+
+    def _add_all(self, article_ids_of_word):
+        """
+
+            like _add for every word, but the new words are sorted and
+            merged with the known ones in a single pass, instead of being
+            inserted in the lists one at a time, which for a whole index
+            would take a time quadratic in the number of words
+
+        """
+        new_words = []
+        for word, article_ids in article_ids_of_word.items():
+            position = bisect.bisect_left(self._words, word)
+            if position < len(self._words) and self._words[position] == word:
+                self._add_to_postings(self._postings[position], article_ids)
+            else:
+                new_words.append(word)
+
+        if not new_words:
+            return
+
+        words = []
+        postings = []
+        copied = 0
+        for word in sorted(new_words):
+            position = bisect.bisect_left(self._words, word, copied)
+            words.extend(self._words[copied:position])
+            postings.extend(self._postings[copied:position])
+            copied = position
+
+            words.append(word)
+            postings.append(self._add_to_postings(array('I'), article_ids_of_word[word]))
+
+        words.extend(self._words[copied:])
+        postings.extend(self._postings[copied:])
+        self._words = words
+        self._postings = postings
+
+    def _add_to_postings(self, postings, article_ids):
+        for article_id in sorted(article_ids):
+            if not postings or article_id > postings[-1]:
+                # the usual case, since the ids only grow
+                postings.append(article_id)
+            else:
+                insertion_point = bisect.bisect_left(postings, article_id)
+                if insertion_point == len(postings) or postings[insertion_point] != article_id:
+                    postings.insert(insertion_point, article_id)
+
+            self._largest_article_id = max(self._largest_article_id, article_id)
+
+        return postings
+
+    def _range_of(self, prefix):
+        first = bisect.bisect_left(self._words, prefix)
+        # no word with the prefix sorts after prefix + the largest character
+        last = bisect.bisect_left(self._words, prefix + chr(0x10FFFF), first)
+        return first, last
+
+
+def _intersect(shorter, longer):
+    """
+
+        the ids in both of the sorted arrays; galloping through
+        the :param longer one, so that it takes a number of steps
+        logarithmic in the gaps between its matches
+
+    """
+    result = array('I')
+    position = 0
+    for article_id in shorter:
+        position = _gallop(longer, article_id, position)
+        if position == len(longer):
+            break
+        if longer[position] == article_id:
+            result.append(article_id)
+    return result
+
+
+def _gallop(postings, article_id, start):
+    """
+
+    :return: the first position at or after :param start of a
+    value not smaller than :param article_id in :param postings
+
+    """
+    step = 1
+    end = start
+    while end < len(postings) and postings[end] < article_id:
+        start = end + 1
+        end += step
+        step *= 2
+    return bisect.bisect_left(postings, article_id, start, min(end + 1, len(postings)))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def word_prefix_index():
+    """
+
+    :return: the index of this process, loaded when first
+    needed and refreshed when used; None if it is disabled
+
+    """
+    global _index
+
+    if not zeeguu_core.app.config.get("IN_PROCESS_WORD_INDEX", False):
+        return None
+
+    with _index_lock:
+        if _index is None:
+            _index = WordPrefixIndex()
+
+    _index.refresh()
+    return _index
+
+
+def add_article_to_loaded_index(article_id, words):
+    """
+
+        called by the crawler for the articles it adds; the index
+        is not loaded just for this, only updated if it is
+
+    """
+    if _index is not None:
+        _index.add_article(article_id, words)
@@ -7,21 +7,22 @@
 """
 from datetime import datetime
 
-import newspaper
 import re
 
 import zeeguu_core
 from zeeguu_core import log, debug
 
 from zeeguu_core import model
+from zeeguu_core.content_recommender.word_prefix_index import add_article_to_loaded_index
 from zeeguu_core.content_retriever.content_cleaner import cleanup_non_content_bits
 from zeeguu_core.content_retriever.quality_filter import sufficient_quality
-from zeeguu_core.model import Url, RSSFeed, LocalizedTopic, ArticleWord
+from zeeguu_core.model import Url, RSSFeed, LocalizedTopic, Topic, ArticleWord, ArticleContentToken
 from zeeguu_core.constants import SIMPLE_TIME_FORMAT
 import requests
 
-from elasticsearch import Elasticsearch
-from zeeguu_core.elastic.settings import ES_CONN_STRING, ES_ZINDEX
+from zeeguu_core.elastic.client import es_client
+from zeeguu_core.full_text.index import full_text_index_enabled, index_articles
+from zeeguu_core.elastic.settings import ES_ZINDEX
 from zeeguu_core.elastic.converting_from_mysql import document_from_article
 
 LOG_CONTEXT = "FEED RETRIEVAL"
@@ -61,9 +62,11 @@ def download_from_feed(feed: RSSFeed, session, limit=1000, save_in_elastic=True)
         wasted trying to retrieve the same articles, especially the ones which
         can't be retrieved, so they won't be cached.
 
+        Returns the articles that were newly saved in the DB.
 
     """
 
+    new_articles = []
     downloaded = 0
     skipped_due_to_low_quality = 0
     skipped_already_in_db = 0
@@ -79,7 +82,7 @@ def download_from_feed(feed: RSSFeed, session, limit=1000, save_in_elastic=True)
         items = feed.feed_items(last_retrieval_time_from_DB)
     except Exception as e:
         log(f"Failed to download feed ({e})")
-        return
+        return new_articles
 
     for feed_item in items:
 
@@ -109,6 +112,8 @@ def download_from_feed(feed: RSSFeed, session, limit=1000, save_in_elastic=True)
                                              feed,
                                              feed_item)
             downloaded += 1
+            if new_article and new_article.id:
+                new_articles.append(new_article)
         except SkippedForTooOld:
             log("- Article too old")
             continue
@@ -128,15 +133,21 @@ def download_from_feed(feed: RSSFeed, session, limit=1000, save_in_elastic=True)
                 log(e)
             continue
 
+        # Saves the news article in the full-text index of this node, if it has one
+        try:
+            if new_article and full_text_index_enabled():
+                index_articles([new_article])
+        except Exception as e:
+            log(f"***OOPS***: could not add to the full-text index: {e}")
+
         # Saves the news article at ElasticSearch.
         # We recommend that everything is stored both in SQL and Elasticsearch
         # as ElasticSearch isn't persistent data
         try:
             if save_in_elastic:
                 if new_article:
-                    es = Elasticsearch(ES_CONN_STRING)
                     doc = document_from_article(new_article, session)
-                    res = es.index(index=ES_ZINDEX, id=new_article.id, body=doc)
+                    res = es_client().index(index=ES_ZINDEX, id=new_article.id, body=doc)
                     print("elastic res: " + res['result'])
         except Exception as e:
             log("***OOPS***: ElasticSearch seems down?")
@@ -151,6 +162,8 @@ def download_from_feed(feed: RSSFeed, session, limit=1000, save_in_elastic=True)
     log(f'*** Already in DB: {skipped_already_in_db}')
     log(f'*** ')
 
+    return new_articles
+
 
 def download_feed_item(session,
                        feed,
@@ -182,6 +195,7 @@ def download_feed_item(session,
         raise SkippedAlreadyInDB()
 
     try:
+        import newspaper
 
         art = newspaper.Article(url)
         art.download()
@@ -212,10 +226,17 @@ def download_feed_item(session,
         topics = add_topics(new_article, session)
         log(f" Topics ({topics})")
 
-        add_searches(title, url, new_article, session)
+        # the word and token indexes need the id of the article
+        session.flush()
+
+        words = add_searches(title, url, new_article, session)
         debug(" Added keywords")
 
+        ArticleContentToken.index_articles(session, [new_article])
+        debug(" Indexed the content tokens")
+
         session.commit()
+        add_article_to_loaded_index(new_article.id, words)
         log(f"SUCCESS for: {new_article.title}")
 
     except SkippedForLowQuality as e:
@@ -229,12 +250,15 @@ def download_feed_item(session,
 
 
 def add_topics(new_article, session):
+    topic_ids = LocalizedTopic.topic_ids_matching(new_article)
+    if not topic_ids:
+        return []
+
     topics = []
-    for loc_topic in LocalizedTopic.query.all():
-        if loc_topic.language == new_article.language and loc_topic.matches_article(new_article):
-            topics.append(loc_topic.topic.title)
-            new_article.add_topic(loc_topic.topic)
-            session.add(new_article)
+    for topic in Topic.query.filter(Topic.id.in_(topic_ids)).order_by(Topic.id):
+        topics.append(topic.title)
+        new_article.add_topic(topic)
+    session.add(new_article)
     return topics
 
 
@@ -242,11 +266,12 @@ def add_searches(title, url, new_article, session):
     """
     This method takes the relevant keywords from the title
     and URL, and tries to properly clean them.
-    It finally adds the ArticleWord to the session, to be committed as a whole.
+    It finally maps the ArticleWords to the article in bulk, to be committed as a whole.
     :param title: The title of the article
     :param url: The url of the article
-    :param new_article: The actual new article
+    :param new_article: The actual new article; must have been flushed
     :param session: The session to which it should be added.
+    :return: the words which were added
     """
 
     # Split the title, path and url netloc (sub domain)
@@ -256,8 +281,9 @@ def add_searches(title, url, new_article, session):
     # Parse the URL so we can call netloc and path without a lot of regex
     parsed_url = urlparse(url)
     all_words += re.split('; |, |\*|-|%20|/', parsed_url.path)
-    all_words += parsed_url.netloc.split('.')[0]
+    all_words.append(parsed_url.netloc.split('.')[0])
 
+    added_words = set()
     for word in all_words:
         # Strip the unwanted characters
         word = strip_article_title_word(word)
@@ -265,12 +291,13 @@ def add_searches(title, url, new_article, session):
         if word in ['www', '', ' '] or word.isdigit() or len(word) < 3 or len(word) > 25:
             continue
         else:
-            # Find or create the ArticleWord and add it to the session
-            article_word_obj = ArticleWord.find_by_word(word)
-            if article_word_obj is None:
-                article_word_obj = ArticleWord(word)
-            article_word_obj.add_article(new_article)
-            session.add(article_word_obj)
+            added_words.add(word)
+
+    # one query for the existing words, one insert for the missing
+    # ones, and one for the mappings; no posting list is loaded
+    ArticleWord.add_words_to_article(session, new_article.id, added_words)
+
+    return added_words
 
 
 def strip_article_title_word(word: str):
@@ -1,5 +1,4 @@
 import zeeguu_core
-import newspaper
 from zeeguu_core.model import Article
 
 html_read_more_patterns = [
@@ -24,7 +23,7 @@ incomplete_suggesting_terminations = (
 )
 
 
-def sufficient_quality(art: newspaper.Article) -> (bool, str):
+def sufficient_quality(art: 'newspaper.Article') -> (bool, str):
     """
 
         :param art:
@@ -0,0 +1,30 @@
+"""
+
+ The Elasticsearch client of the process.
+
+ A client keeps a pool of connections to the cluster, so it is
+ meant to be created once and shared, rather than created for
+ every request.
+
+"""
+
+import threading
+
+from zeeguu_core.elastic.settings import ES_CONN_STRING
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def es_client():
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # imported here, since it's slow to import and
+                # not needed by the processes which don't search
+                from elasticsearch import Elasticsearch
+                _client = Elasticsearch([ES_CONN_STRING])
+
+    return _client
@@ -1,3 +1,4 @@
+from zeeguu_core.constants import JSON_TIME_FORMAT
 from zeeguu_core.model import Topic
 from zeeguu_core.model.article import article_topic_map
 
@@ -13,7 +14,9 @@ def find_topics(article_id, session):
 
 
 def document_from_article(article, session):
-    topics = find_topics(article.id, session)
+    # from the relationship, so that loading it eagerly
+    # for many articles saves a query per article
+    topics = article.topics_as_string().rstrip()
     doc = {
         'title': article.title,
         'author': article.authors,
@@ -23,6 +26,61 @@ def document_from_article(article, session):
         'published_time': article.published_time,
         'topics': topics,
         'language': article.language.name,
-        'fk_difficulty': article.fk_difficulty
+        'fk_difficulty': article.fk_difficulty,
+
+        # the rest of what article_info needs, so the
+        # recommendation cards can be built from the index
+        'id': article.id,
+        'url': article.url.as_string(),
+        'language_code': article.language.code,
+        'published': article.published_time.strftime(JSON_TIME_FORMAT) if article.published_time else None,
+        'feed_id': article.rss_feed.id if article.rss_feed else None,
+        'icon_name': article.rss_feed.icon_name if article.rss_feed else None,
+        'feed_image_url': (article.rss_feed.image_url.as_string()
+                           if article.rss_feed and article.rss_feed.image_url else None)
     }
     return doc
+
+
+def has_article_info(doc):
+    """
+
+        documents indexed before the article_info fields were
+        added to them can't be turned into article infos
+
+    """
+    return 'url' in doc
+
+
+def article_info_from_document(doc):
+    """
+
+        The counterpart of Article.article_info (without content)
+        for a document built by document_from_article
+
+    """
+    result_dict = dict(
+        id=doc['id'],
+        title=doc['title'],
+        url=doc['url'],
+        summary=doc['summary'],
+        language=doc['language_code'],
+        authors=doc['author'],
+        topics="".join(each + " " for each in doc['topics'].split()),
+        metrics=dict(
+            difficulty=doc['fk_difficulty'] / 100,
+            word_count=doc['word_count']
+        ))
+
+    if doc['published']:
+        result_dict['published'] = doc['published']
+
+    if doc['feed_id']:
+        # a tuple, like in Article.article_info
+        result_dict['feed_id'] = doc['feed_id'],
+        result_dict['icon_name'] = doc['icon_name']
+
+        if doc['feed_image_url']:
+            result_dict['feed_image_url'] = doc['feed_image_url']
+
+    return result_dict
@@ -0,0 +1,102 @@
+"""
+
+ Brings the ES documents up to date with the changes recorded
+ in the ArticleChange outbox, a batch at a time, so that the
+ index follows the DB without reloading it all.
+
+ For every changed article, the document is indexed again from
+ the current article, or removed if the article was deleted or
+ marked broken; the changes are removed from the outbox once ES
+ has them. Both operations can be repeated safely, so a batch
+ which fails (e.g. ES is down) is simply done again later.
+
+"""
+
+from sqlalchemy.orm import joinedload, selectinload
+
+import zeeguu_core
+from zeeguu_core.elastic.client import es_client
+from zeeguu_core.elastic.converting_from_mysql import document_from_article
+from zeeguu_core.elastic.settings import ES_ZINDEX
+from zeeguu_core.model import Article, ArticleChange, RSSFeed, Url
+
+BATCH_SIZE = 500
+
+# for the documents which ES rejects because it's too busy (429)
+MAX_RETRIES = 3
+INITIAL_BACKOFF_IN_SECONDS = 2
+
+
+def _is_transient(status):
+    return status == 429 or status >= 500
+
+
+def _articles_with_ids(article_ids):
+    return {each.id: each for each in Article.query
+            .options(selectinload(Article.topics),
+                     joinedload(Article.language),
+                     joinedload(Article.url).joinedload(Url.domain),
+                     joinedload(Article.rss_feed).joinedload(RSSFeed.image_url).joinedload(Url.domain))
+            .filter(Article.id.in_(article_ids))}
+
+
+def _actions(article_ids, session):
+    article_for_id = _articles_with_ids(article_ids)
+
+    for each in article_ids:
+        article = article_for_id.get(each)
+        if article and not article.broken:
+            yield {"_op_type": "index", "_index": ES_ZINDEX, "_id": each,
+                   "_source": document_from_article(article, session)}
+        else:
+            yield {"_op_type": "delete", "_index": ES_ZINDEX, "_id": each}
+
+
+def sync_article_changes(session, batch_size=BATCH_SIZE):
+    """
+
+        syncs the oldest :param batch_size changes in the outbox,
+        with a single bulk request, and commits
+
+        if ES can't be reached, the exception is raised and
+        the changes stay in the outbox; so do the changes of the
+        documents which ES still rejects after MAX_RETRIES
+
+    :return: the number of changes which were synced (and removed)
+
+    """
+    from elasticsearch.helpers import streaming_bulk
+
+    changes = ArticleChange.oldest(batch_size)
+    if not changes:
+        return 0
+
+    # an article which changed several times is synced once
+    article_ids = sorted({each.article_id for each in changes})
+
+    retried_article_ids = set()
+    for ok, item in streaming_bulk(es_client(), _actions(article_ids, session),
+                                   chunk_size=batch_size, raise_on_error=False,
+                                   max_retries=MAX_RETRIES, initial_backoff=INITIAL_BACKOFF_IN_SECONDS):
+        op_type, info = item.popitem()
+        status = info.get("status", 500)
+
+        # the document of a deleted article might have never been indexed
+        if ok or (op_type == "delete" and status == 404):
+            continue
+
+        if _is_transient(status):
+            retried_article_ids.add(int(info.get("_id")))
+        else:
+            # a document which ES refuses; retrying won't help,
+            # and it can be fixed by indexing it with mysql_to_elastic.py
+            zeeguu_core.logp(f"could not sync article {info.get('_id')}: {info.get('error')}")
+
+    if retried_article_ids:
+        zeeguu_core.logp(f"{len(retried_article_ids)} article changes left in the outbox, to be retried")
+
+    synced = [each for each in changes if each.article_id not in retried_article_ids]
+    ArticleChange.remove(session, [each.id for each in synced])
+    session.commit()
+
+    return len(synced)
@@ -0,0 +1,218 @@
+"""
+
+ A full-text index of the articles in a local SQLite file, using
+ FTS5, for searching when ElasticSearch is not available: unlike
+ the ArticleWord index, which only has the words of the titles and
+ urls, it indexes the title, summary and content of the articles.
+
+ Every node has its own file (FTS_INDEX_FILE in the config); the
+ crawler adds the articles it downloads to the index of its node,
+ and tools/build_full_text_index.py builds it for the older ones.
+
+ The index has what the filters of build_elastic_query need, next
+ to the text: the language, the difficulty, the publishing time and
+ the topics of every article. It returns article ids only.
+
+ The changes of the articles made by the processes of a node are
+ applied to its index when they are flushed: the deleted and broken
+ articles are removed, and the changed ones indexed again. The topics
+ which are added without the ORM are added with add_article_topics.
+
+"""
+
+import re
+import sqlite3
+import threading
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+import zeeguu_core
+
+# what is indexed of an article (see index_articles)
+INDEXED_ATTRIBUTES = ['title', 'summary', 'content', 'fk_difficulty', 'published_time', 'language_id', 'topics']
+
+SCHEMA = [
+    # the rowid of an indexed text is the id of its article
+    """CREATE VIRTUAL TABLE IF NOT EXISTS article_text
+       USING fts5(title, summary, content, tokenize = 'unicode61 remove_diacritics 2')""",
+
+    """CREATE TABLE IF NOT EXISTS article_facet (
+           id INTEGER PRIMARY KEY,
+           language TEXT,
+           fk_difficulty INTEGER,
+           published_time TEXT)""",
+
+    """CREATE INDEX IF NOT EXISTS article_facet_language_published
+       ON article_facet (language, published_time)""",
+
+    """CREATE TABLE IF NOT EXISTS article_topic (
+           topic TEXT,
+           article_id INTEGER,
+           PRIMARY KEY (topic, article_id)) WITHOUT ROWID""",
+]
+
+WORD = re.compile(r"\w")
+
+_local = threading.local()
+
+
+def full_text_index_enabled():
+    return bool(zeeguu_core.app.config.get("FTS_INDEX_FILE"))
+
+
+def _connection():
+    """
+
+        one connection per thread, since sqlite connections
+        can't be shared between threads
+
+    """
+    if getattr(_local, "connection", None) is None:
+        connection = sqlite3.connect(zeeguu_core.app.config["FTS_INDEX_FILE"])
+        # the crawler writes while the web workers read
+        connection.execute("PRAGMA journal_mode=WAL")
+        for each in SCHEMA:
+            connection.execute(each)
+        _local.connection = connection
+
+    return _local.connection
+
+
+def index_articles(articles):
+    """
+
+        adds the :param articles to the index, replacing
+        them if they were already there
+
+    """
+    connection = _connection()
+    with connection:
+        _remove(connection, [each.id for each in articles])
+
+        connection.executemany(
+            "INSERT INTO article_text (rowid, title, summary, content) VALUES (?, ?, ?, ?)",
+            [(each.id, each.title or "", each.summary or "", each.content or "") for each in articles])
+
+        connection.executemany(
+            "INSERT INTO article_facet (id, language, fk_difficulty, published_time) VALUES (?, ?, ?, ?)",
+            [(each.id, each.language.code, each.fk_difficulty,
+              each.published_time.isoformat() if each.published_time else None)
+             for each in articles])
+
+        connection.executemany(
+            "INSERT INTO article_topic (topic, article_id) VALUES (?, ?)",
+            [(topic.title, each.id) for each in articles for topic in each.topics])
+
+
+def add_article_topics(topic_and_article_ids):
+    """
+
+    :param topic_and_article_ids: (topic title, article id) pairs
+
+    """
+    connection = _connection()
+    with connection:
+        connection.executemany("INSERT OR IGNORE INTO article_topic (topic, article_id) VALUES (?, ?)",
+                               topic_and_article_ids)
+
+
+def remove_articles(article_ids):
+    connection = _connection()
+    with connection:
+        _remove(connection, article_ids)
+
+
+def _remove(connection, article_ids):
+    rows = [(each,) for each in article_ids]
+    connection.executemany("DELETE FROM article_text WHERE rowid = ?", rows)
+    connection.executemany("DELETE FROM article_facet WHERE id = ?", rows)
+    connection.executemany("DELETE FROM article_topic WHERE article_id = ?", rows)
+
+
+def search(count, search_terms, language_code, lower_bounds, upper_bounds,
+           topics_to_include=(), topics_to_exclude=(), unwanted_keywords=()):
+    """
+
+        The same filters as build_elastic_query: the articles in the
+        language, with a difficulty strictly between the bounds,
+        with one of the :param topics_to_include (if any), none of
+        the :param topics_to_exclude, and none of the (phrases) in
+        :param unwanted_keywords in their text.
+
+        Every one of the :param search_terms must be the prefix of a
+        word in the text; the results are ranked by relevance (bm25).
+        Without search terms, the most recent articles come first.
+
+    :return: the ids of at most :param count articles
+
+    """
+    conditions = ["f.language = ?", "f.fk_difficulty > ?", "f.fk_difficulty < ?", "f.published_time IS NOT NULL"]
+    parameters = [language_code, lower_bounds, upper_bounds]
+
+    if topics_to_include:
+        conditions.append(f"f.id IN (SELECT article_id FROM article_topic "
+                          f"WHERE topic IN ({_placeholders(topics_to_include)}))")
+        parameters.extend(topics_to_include)
+
+    if topics_to_exclude:
+        conditions.append(f"f.id NOT IN (SELECT article_id FROM article_topic "
+                          f"WHERE topic IN ({_placeholders(topics_to_exclude)}))")
+        parameters.extend(topics_to_exclude)
+
+    unwanted = " OR ".join(_phrase(each) for each in unwanted_keywords if each.strip())
+    if unwanted:
+        conditions.append("f.id NOT IN (SELECT rowid FROM article_text WHERE article_text MATCH ?)")
+        parameters.append(unwanted)
+
+    # the terms without any word character would match everything
+    wanted = " ".join(_phrase(each) + "*" for each in (search_terms or "").split() if WORD.search(each))
+    if wanted:
+        query = (f"SELECT f.id FROM article_text JOIN article_facet f ON f.id = article_text.rowid "
+                 f"WHERE article_text MATCH ? AND {' AND '.join(conditions)} "
+                 f"ORDER BY bm25(article_text), f.published_time DESC LIMIT ?")
+        parameters.insert(0, wanted)
+    else:
+        query = (f"SELECT f.id FROM article_facet f WHERE {' AND '.join(conditions)} "
+                 f"ORDER BY f.published_time DESC LIMIT ?")
+    parameters.append(count)
+
+    return [each[0] for each in _connection().execute(query, parameters)]
+
+
+@event.listens_for(Session, "after_flush")
+def _update_changed_articles(session, flush_context):
+    from zeeguu_core.model import Article
+
+    if not full_text_index_enabled():
+        return
+
+    # the new articles are indexed by the crawler
+    removed = [each.id for each in session.deleted if isinstance(each, Article)]
+    changed = []
+    for each in session.dirty:
+        if not isinstance(each, Article):
+            continue
+        if each.broken:
+            removed.append(each.id)
+        elif any(inspect(each).attrs[name].history.has_changes() for name in INDEXED_ATTRIBUTES):
+            changed.append(each)
+
+    # the index is only a copy, which can be rebuilt; it
+    # must never be the reason for which a flush fails
+    try:
+        if removed:
+            remove_articles(removed)
+        if changed:
+            index_articles(changed)
+    except Exception as e:
+        zeeguu_core.logp(f"could not update the full-text index: {e}")
+
+
+def _placeholders(values):
+    return ", ".join("?" for _ in values)
+
+
+def _phrase(text):
+    # quoted, so that no user input is taken for FTS5 query syntax
+    return '"' + text.replace('"', '""') + '"'
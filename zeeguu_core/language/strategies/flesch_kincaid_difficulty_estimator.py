@@ -1,6 +1,4 @@
-import nltk
-import pyphen
-from numpy import math
+import math
 
 from zeeguu_core.language.difficulty_estimator_strategy import DifficultyEstimatorStrategy
 from zeeguu_core.util.text import split_words_from_text
@@ -49,6 +47,7 @@ class FleschKincaidDifficultyEstimator(DifficultyEstimatorStrategy):
             syllables_in_word = cls.estimate_number_of_syllables_in_word_pyphen(word, language)
             number_of_syllables += syllables_in_word*freq
 
+        import nltk
         number_of_sentences = len(nltk.sent_tokenize(text))
 
         constants = cls.get_constants_for_language(language);
@@ -82,6 +81,7 @@ class FleschKincaidDifficultyEstimator(DifficultyEstimatorStrategy):
                 syllables = len(word) / cls.AVERAGE_SYLLABLE_LENGTH
             return int(math.floor(syllables))  # Truncate the number of syllables
         else:
+            import pyphen
             dic = pyphen.Pyphen(lang=language.code)
             syllables = len(dic.positions(word)) + 1
             return syllables
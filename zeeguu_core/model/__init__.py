@@ -1,4 +1,6 @@
 import re
+import time
+
 import flask_sqlalchemy
 
 import zeeguu_core
@@ -41,7 +43,11 @@ from .user_language import UserLanguage
 from .topic import Topic
 from .user_article import UserArticle
 from .article_word import ArticleWord
+from .article_content_token import ArticleContentToken
 from .articles_cache import ArticlesCache
+from .recommendation_feed import RecommendationFeed
+from .related_article import RelatedArticle
+from .article_change import ArticleChange
 
 from .feed import RSSFeed
 from .feed_registrations import RSSFeedRegistration
@@ -77,10 +83,21 @@ from .user_exercise_session import UserExerciseSession
 # bookmark scheduling
 from zeeguu_core.model.bookmark_priority_arts import BookmarkPriorityARTS
 
+# keeps the full-text index of this node, if any, up to date with the changes of the articles
+import zeeguu_core.full_text.index
+
 # Creating the DB tables if needed
 # Note that this must be called after all the model classes are loaded
 zeeguu_core.db.init_app(zeeguu_core.app)
-zeeguu_core.db.create_all(app=zeeguu_core.app)
+
+# Checking the schema means reflecting every table in the DB, which
+# every worker and every tool would otherwise pay for at start-up.
+# In production set SKIP_DB_SCHEMA_CREATION = True in the config and
+# create the schema explicitly with tools/create_db_schema.py
+if not zeeguu_core.app.config.get("SKIP_DB_SCHEMA_CREATION", False):
+    _schema_creation_start = time.time()
+    zeeguu_core.db.create_all(app=zeeguu_core.app)
+    zeeguu_core.info(f"DB schema creation took {(time.time() - _schema_creation_start) * 1000:.2f}ms")
 
 # Log the DB connection string; after masking the password
 db_connection_string = zeeguu_core.app.config["SQLALCHEMY_DATABASE_URI"]
@@ -10,7 +10,6 @@ from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UnicodeTex
 
 from zeeguu_core.constants import JSON_TIME_FORMAT
 from zeeguu_core.language.difficulty_estimator_factory import DifficultyEstimatorFactory
-from langdetect import detect
 
 db = zeeguu_core.db
 
@@ -142,6 +141,34 @@ class Article(db.Model):
 
         return result_dict
 
+    @classmethod
+    def article_infos(cls, articles: list, with_content=False):
+        """
+
+            article_info for all the :param articles, in their order,
+            with a constant number of queries instead of several
+            queries for every article
+
+        """
+        from sqlalchemy.orm import joinedload, selectinload
+        from zeeguu_core.model import Url, RSSFeed
+
+        if not articles:
+            return []
+
+        # everything that article_info needs, for all the articles at once;
+        # the articles are already in the session so this only fills in
+        # their relationships
+        (cls.query
+         .options(joinedload(cls.url).joinedload(Url.domain),
+                  joinedload(cls.language),
+                  joinedload(cls.rss_feed).joinedload(RSSFeed.image_url).joinedload(Url.domain),
+                  selectinload(cls.topics))
+         .filter(cls.id.in_([article.id for article in articles]))
+         .all())
+
+        return [article.article_info(with_content=with_content) for article in articles]
+
     def add_topic(self, topic):
         self.topics.append(topic)
 
@@ -195,6 +222,7 @@ class Article(db.Model):
 
             if not language:
                 if art.meta_lang == '':
+                    from langdetect import detect
                     art.meta_lang = detect(art.text)
                     zeeguu_core.log(f"langdetect: {art.meta_lang} for {url}")
                 language = Language.find_or_create(art.meta_lang)
@@ -230,6 +258,21 @@ class Article(db.Model):
                     continue
                 break
 
+    @classmethod
+    def after_in_recency_order(cls, published_time, article_id):
+        """
+
+            condition for keyset pagination over the articles ordered
+            by (published_time, id), most recent first: the articles
+            which come after the one with :param published_time
+            and :param article_id
+
+        """
+        from sqlalchemy import and_, or_
+
+        return or_(cls.published_time < published_time,
+                   and_(cls.published_time == published_time, cls.id < article_id))
+
     @classmethod
     def find_by_id(cls, id: int):
         return Article.query.filter(Article.id == id).first()
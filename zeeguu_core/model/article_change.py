@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, DateTime, event, inspect
+from sqlalchemy.orm import Session
+
+import zeeguu_core
+from zeeguu_core.model.article import Article
+
+db = zeeguu_core.db
+
+# what document_from_article puts in the ES documents, and broken,
+# since the documents of the broken articles are removed from ES
+INDEXED_ATTRIBUTES = ['title', 'authors', 'content', 'summary', 'word_count', 'published_time',
+                      'fk_difficulty', 'broken', 'language_id', 'url_id', 'rss_feed_id', 'topics']
+
+
+class ArticleChange(db.Model):
+    """
+
+        The outbox of the articles whose ES documents are out of date:
+        a row for every article which was added, changed or deleted,
+        recorded in the same transaction as the change itself, and
+        removed by the sync (see zeeguu_core.elastic.sync) once the
+        document is updated in ES.
+
+        A row only says which article changed; the sync looks the
+        article up to know what to do with its document, so
+        processing a row twice does no harm.
+
+        Recorded only if ELASTIC_SYNC_OUTBOX is set in the config,
+        since nothing else would empty the table.
+
+    """
+    __tablename__ = 'article_change'
+    __table_args__ = {'mysql_collate': 'utf8_bin'}
+
+    # the order in which the changes are synced
+    id = Column(Integer, primary_key=True)
+
+    # not a foreign key: the deleted articles must stay in the outbox
+    article_id = Column(Integer)
+
+    time = Column(DateTime)
+
+    def __init__(self, article_id, time=None):
+        self.article_id = article_id
+        self.time = time or datetime.now()
+
+    def __repr__(self):
+        return f'<ArticleChange {self.id}: {self.article_id}>'
+
+    @classmethod
+    def enabled(cls):
+        return bool(zeeguu_core.app.config.get("ELASTIC_SYNC_OUTBOX"))
+
+    @classmethod
+    def record(cls, session, article_ids):
+        """
+
+            for the changes which don't go through the ORM, e.g. the
+            rows inserted directly in article_topic_map; does not commit
+
+        """
+        if article_ids and cls.enabled():
+            now = datetime.now()
+            session.execute(cls.__table__.insert(),
+                            [dict(article_id=each, time=now) for each in sorted(set(article_ids))])
+
+    @classmethod
+    def oldest(cls, count):
+        return cls.query.order_by(cls.id).limit(count).all()
+
+    @classmethod
+    def remove(cls, session, change_ids):
+        """
+
+            does not commit
+
+        """
+        session.execute(cls.__table__.delete().where(cls.id.in_(change_ids)))
+
+
+def _indexed_attributes_changed(article):
+    state = inspect(article)
+    return any(state.attrs[each].history.has_changes() for each in INDEXED_ATTRIBUTES)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_article_changes(session, flush_context):
+    if not ArticleChange.enabled():
+        return
+
+    article_ids = [each.id for each in session.new if isinstance(each, Article)]
+    article_ids += [each.id for each in session.deleted if isinstance(each, Article)]
+    article_ids += [each.id for each in session.dirty
+                    if isinstance(each, Article) and _indexed_attributes_changed(each)]
+
+    ArticleChange.record(session, article_ids)
@@ -0,0 +1,96 @@
+import re
+
+from sqlalchemy import Column, Integer, String, ForeignKey, func
+
+import zeeguu_core
+from zeeguu_core.model.article import Article
+
+db = zeeguu_core.db
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class ArticleContentToken(db.Model):
+    """
+
+        Inverted index over the title and content of the articles:
+        one row for every distinct (lowercased) token of an article.
+
+        Allows the keyword filters to be an anti-join on this table
+        instead of a LIKE '%keyword%' over the content of every
+        candidate article.
+
+        Unlike ArticleWord, which indexes the title and url words
+        for searching, this is meant for exact token lookups.
+
+    """
+    __tablename__ = 'article_content_token'
+    __table_args__ = {'mysql_collate': 'utf8_bin'}
+
+    # longer tokens are truncated, both when indexing and when looking up
+    MAX_TOKEN_LENGTH = 30
+
+    token = Column(String(MAX_TOKEN_LENGTH), primary_key=True)
+
+    # cascades at the DB level when an article is deleted
+    article_id = Column(Integer, ForeignKey(Article.id, ondelete="CASCADE"), primary_key=True, index=True)
+
+    @classmethod
+    def tokenize(cls, text):
+        """
+
+        :return: the set of distinct lowercased tokens in :param text
+
+        """
+        return set(each[:cls.MAX_TOKEN_LENGTH] for each in TOKEN_PATTERN.findall(text.lower()))
+
+    @classmethod
+    def tokens_of_article(cls, article):
+        return cls.tokenize(article.title or "") | cls.tokenize(article.content or "")
+
+    @classmethod
+    def index_articles(cls, session, articles):
+        """
+
+            adds the tokens of the :param articles to the index with a single
+            multi-row insert; articles which are already indexed are left as
+            they are. does not commit.
+
+            the articles must have been flushed, so they have ids
+
+        """
+        rows = [dict(token=token, article_id=article.id)
+                for article in articles
+                for token in cls.tokens_of_article(article)]
+        if not rows:
+            return
+
+        insert = cls.__table__.insert().prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE",
+                                                                                            dialect="sqlite")
+        session.execute(insert, rows)
+
+    @classmethod
+    def article_ids_containing(cls, keywords):
+        """
+
+            the ids of the articles which contain all the tokens of
+            the :param keywords; as a query, to be used as a subquery
+
+        """
+        tokens = cls.tokenize(keywords)
+
+        query = zeeguu_core.db.session.query(cls.article_id).filter(cls.token.in_(tokens))
+        if len(tokens) > 1:
+            query = query.group_by(cls.article_id).having(func.count(cls.token) == len(tokens))
+        return query
+
+    @classmethod
+    def keywords_in(cls, keywords, article_tokens):
+        """
+
+            the in-memory counterpart of article_ids_containing, for
+            an article whose tokens are :param article_tokens
+
+        """
+        tokens = cls.tokenize(keywords)
+        return bool(tokens) and tokens <= article_tokens
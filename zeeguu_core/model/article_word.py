@@ -56,6 +56,58 @@ class ArticleWord(db.Model):
                 session.rollback()
                 return cls.query.filter(cls.word == word).one()
 
+    @classmethod
+    def add_words_to_article(cls, session, article_id, words):
+        """
+
+            maps the :param words to the article with :param article_id:
+            the existing words are found with a single IN query, the
+            missing ones are inserted with a single statement, and so
+            are the mappings, without loading the postings of any word.
+            does not commit
+
+        """
+        cls.add_words_to_articles(session, {article_id: words})
+
+    @classmethod
+    def add_words_to_articles(cls, session, words_of_article):
+        """
+
+            like add_words_to_article, for all the articles
+            in :param words_of_article (article id -> words)
+
+        """
+        words_of_article = {article_id: set(words) for article_id, words in words_of_article.items()}
+        all_words = set().union(*words_of_article.values())
+        if not all_words:
+            return
+
+        word_ids = cls._ids_of_words(session, all_words)
+
+        missing = all_words - set(word_ids)
+        if missing:
+            session.execute(cls.__table__.insert(), [dict(word=each) for each in missing])
+            word_ids.update(cls._ids_of_words(session, missing))
+
+        session.execute(article_word_map.insert(),
+                        [dict(word_id=word_ids[word], article_id=article_id)
+                         for article_id, words in words_of_article.items()
+                         for word in words])
+
+    @classmethod
+    def _ids_of_words(cls, session, words):
+        word_ids = {}
+        words = list(words)
+        # in chunks, since the DBs limit the number of parameters of a query
+        for start in range(0, len(words), 500):
+            query = (session.query(cls.id, cls.word)
+                     .filter(cls.word.in_(words[start:start + 500]))
+                     .order_by(cls.id))
+            for word_id, word in query:
+                # the first one, if a word was added twice by a race
+                word_ids.setdefault(word, word_id)
+        return word_ids
+
     @classmethod
     def find_by_word(cls, word):
         try:
@@ -64,6 +116,19 @@ class ArticleWord(db.Model):
             print(e)
             return None
 
+    @classmethod
+    def article_ids_for_word_prefix(cls, word):
+        """
+
+            the ids of the articles containing a word that starts with
+            :param word; as a query, to be used as a subquery, so the
+            postings never leave the database
+
+        """
+        return (zeeguu_core.db.session.query(article_word_map.c.article_id)
+                .join(cls, cls.id == article_word_map.c.word_id)
+                .filter(cls.word.like(word + "%")))
+
     @classmethod
     def get_articles_for_word(cls, word):
         try:
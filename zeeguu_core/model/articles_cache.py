@@ -1,8 +1,10 @@
+from datetime import datetime, timedelta
+
 from sqlalchemy.orm import relationship
 
 import zeeguu_core
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint, not_, or_
 
 db = zeeguu_core.db
 
@@ -17,7 +19,6 @@ class ArticlesCache(db.Model):
         can be retrieved with a dramatic increase of speed.
 
     """
-    __table_args__ = {'mysql_collate': 'utf8_bin'}
 
     id = Column(Integer, primary_key=True)
 
@@ -28,6 +29,14 @@ class ArticlesCache(db.Model):
 
     content_hash = Column(String(256))
 
+    # an article is cached at most once for a given hash, even
+    # when the same hash is recomputed concurrently (e.g. by the
+    # cron job and by a user request at the same time)
+    __table_args__ = (
+        UniqueConstraint(content_hash, article_id, name='_content_hash_article_unique_constraint'),
+        {'mysql_collate': 'utf8_bin'}
+    )
+
     def __init__(self, article, hash):
         self.article = article
         self.content_hash = hash
@@ -62,9 +71,45 @@ class ArticlesCache(db.Model):
                 " sear-filt: " + _join_ids(search_filters))
 
     @classmethod
-    def get_articles_for_hash(cls, hash, limit):
+    def add_articles_for_hash(cls, session, hash, articles):
+        """
+
+            Caches all the :param articles for the :param hash with
+            a single multi-row insert. Pairs that are already cached
+            are silently skipped, so recomputing a hash concurrently
+            does not result in duplicates.
+
+            Does not commit; that's up to the caller.
+
+        """
+        rows = [dict(content_hash=hash, article_id=article.id) for article in articles]
+        if not rows:
+            return
+
+        insert_ignoring_duplicates = (cls.__table__.insert()
+                                      .prefix_with("IGNORE", dialect="mysql")
+                                      .prefix_with("OR IGNORE", dialect="sqlite"))
+        session.execute(insert_ignoring_duplicates, rows)
+
+    @classmethod
+    def get_articles_for_hash(cls, hash, limit, after=None):
+        """
+
+        :param after: (published_time, article_id) of the last article
+        of the previous page, if any
+
+        """
+        from zeeguu_core.model.article import Article
         try:
-            result = cls.query.filter(cls.content_hash == hash).limit(limit)
+            # most recent first; articles are appended to an existing
+            # hash as they are crawled, so insertion order is meaningless
+            result = (cls.query.filter(cls.content_hash == hash)
+                      .join(Article, cls.article_id == Article.id))
+            if after:
+                result = result.filter(Article.after_in_recency_order(*after))
+            result = (result
+                      .order_by(Article.published_time.desc(), Article.id.desc())
+                      .limit(limit))
             if result is None:
                 return None
             return [article_id.article for article_id in result]
@@ -79,3 +124,43 @@ class ArticlesCache(db.Model):
             return False
         else:
             return True
+
+    @classmethod
+    def trim_hash(cls, session, hash, max_article_count):
+        """
+
+            Keeps only the :param max_article_count most recent articles
+            that are cached for :param hash. Does not commit.
+
+        """
+        from zeeguu_core.model.article import Article
+
+        ids_to_keep = [each[0] for each in
+                       session.query(cls.id)
+                           .join(Article, cls.article_id == Article.id)
+                           .filter(cls.content_hash == hash)
+                           .order_by(Article.published_time.desc())
+                           .limit(max_article_count)]
+
+        (cls.query.filter(cls.content_hash == hash)
+         .filter(not_(cls.id.in_(ids_to_keep)))
+         .delete(synchronize_session=False))
+
+    @classmethod
+    def remove_articles_older_than(cls, session, days):
+        """
+
+            Removes from all the hashes the articles which were
+            published more than :param days ago, or which have
+            in the meanwhile been marked as broken. Does not commit.
+
+        """
+        from zeeguu_core.model.article import Article
+
+        long_ago = datetime.now() - timedelta(days=days)
+        expired_article_ids = (session.query(Article.id)
+                               .filter(or_(Article.published_time < long_ago,
+                                           Article.broken > 0)))
+
+        (cls.query.filter(cls.article_id.in_(expired_article_ids))
+         .delete(synchronize_session=False))
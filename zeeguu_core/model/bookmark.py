@@ -3,14 +3,12 @@ from datetime import datetime
 
 import sqlalchemy
 from sqlalchemy import Column, ForeignKey, Integer, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, joinedload, contains_eager
 from sqlalchemy.orm.exc import NoResultFound
 from zeeguu_core.constants import JSON_TIME_FORMAT
 from zeeguu_core.definition_of_learned import is_learned_based_on_exercise_outcomes
 from zeeguu_core.model import Article
 
-from wordstats import Word
-
 import zeeguu_core
 from zeeguu_core.model.SortedExerciseLog import SortedExerciseLog
 from zeeguu_core.model.exercise import Exercise
@@ -175,6 +173,7 @@ class Bookmark(db.Model):
             zeeguu_core.log(f"Exception caught: for some reason there was no translation for {self.id}")
             print(str(e))
 
+        from wordstats import Word
         word_info = Word.stats(self.origin.word,
                                self.origin.language.code)
 
@@ -277,6 +276,26 @@ class Bookmark(db.Model):
     def find_all_for_user_and_url(cls, user, url):
         return cls.query.join(Text).filter(Text.url == url).filter(Bookmark.user == user).all()
 
+    @classmethod
+    def find_all_for_user_and_url_ids(cls, user, url_ids):
+        """
+
+            Batch version of find_all_for_user_and_url; the origin, translation
+            and text, which are needed for the serializable_dictionary, are
+            loaded together with the bookmarks.
+
+        """
+        if not url_ids:
+            return []
+
+        return (cls.query.join(Text)
+                .options(joinedload(Bookmark.origin),
+                         joinedload(Bookmark.translation),
+                         contains_eager(Bookmark.text))
+                .filter(Text.url_id.in_(url_ids))
+                .filter(Bookmark.user == user)
+                .all())
+
     @classmethod
     def find(cls, b_id):
         return cls.query.filter_by(
@@ -2,6 +2,7 @@ from sqlalchemy.orm.exc import NoResultFound
 from datetime import datetime
 
 import zeeguu_core
+from zeeguu_core.util.bounded_cache import BoundedCache
 
 db = zeeguu_core.db
 
@@ -99,23 +100,37 @@ class Language(db.Model):
     def find_by_id(cls, i):
         return cls.query.filter(Language.id == i).one()
 
+    # the ids of the most recent articles; the crawler invalidates it
+    # after every run, the TTL bounds the staleness in the other processes
+    articles_cache = BoundedCache("language articles", ttl_in_seconds=15 * 60, max_entries=64)
+
     def get_articles(self, after_date=None, most_recent_first=False, easiest_first=False):
         from zeeguu_core.model import Article
 
-        if hasattr(Language, 'cached_articles') and (self.cached_articles.get(self.id, None)):
-            zeeguu_core.logp(f"found {len(Language.cached_articles[self.id])} cached articles for {self.name}")
-            all_ids = Language.cached_articles[self.id]
-            return Article.query.filter(Article.id.in_(all_ids)).all()
+        all_ids = self.article_ids(after_date, most_recent_first, easiest_first)
+        return Article.query.filter(Article.id.in_(all_ids)).all()
 
-        if not hasattr(Language, 'cached_articles'):
-            Language.cached_articles = {}
+    def article_ids(self, after_date=None, most_recent_first=False, easiest_first=False):
+        """
 
-        zeeguu_core.logp("computing and caching the articles for language: " + self.name)
-        Language.cached_articles[self.id] = [each.id for each in
-                                             self._get_articles(after_date, most_recent_first, easiest_first)]
+            The (cached) ids of the articles returned by _get_articles;
+            cheaper than get_articles when the articles themselves are
+            not needed
 
-        all_ids = Language.cached_articles[self.id]
-        return Article.query.filter(Article.id.in_(all_ids)).all()
+        :return: tuple of article ids
+
+        """
+        from zeeguu_core.model import Article
+
+        def _compute():
+            zeeguu_core.logp("computing and caching the articles for language: " + self.name)
+            query = self._get_articles(after_date, most_recent_first, easiest_first)
+            return tuple(each for (each,) in query.with_entities(Article.id))
+
+        return Language.articles_cache.get((self.id, after_date, most_recent_first, easiest_first), _compute)
+
+    def clear_articles_cache(self):
+        Language.articles_cache.invalidate_if(lambda key: key[0] == self.id)
 
     def _get_articles(self, after_date=None, most_recent_first=False, easiest_first=False):
         """
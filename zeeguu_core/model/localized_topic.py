@@ -1,8 +1,11 @@
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, Session
 
 import zeeguu_core
 
-from sqlalchemy import Column, Integer, String, ForeignKey, and_
+from sqlalchemy import Column, Integer, String, ForeignKey, and_, event
+
+from zeeguu_core.util.bounded_cache import BoundedCache
+from zeeguu_core.util.keyword_matcher import KeywordMatcher
 
 db = zeeguu_core.db
 
@@ -33,6 +36,11 @@ class LocalizedTopic(db.Model):
 
     keywords = Column(String(1024))
 
+    # language id -> KeywordMatcher of the keywords of its topics; the TTL
+    # is for the changes made by other processes, the changes made by this
+    # one invalidate it right away
+    matchers = BoundedCache("topic keyword matchers", ttl_in_seconds=10 * 60, max_entries=64)
+
     def __init__(self, topic: Topic, language: Language, topic_translated: str, keywords: str = ""):
         self.topic = topic
         self.language = language
@@ -51,6 +59,41 @@ class LocalizedTopic(db.Model):
 
         return False
 
+    @classmethod
+    def topic_ids_matching(cls, article):
+        """
+
+            Like calling matches_article for every localized topic in
+            the language of the :param article, in a single pass over
+            its title and url
+
+        :return: the set of ids of the topics which match
+
+        """
+        return cls.topic_ids_matching_text(article.language.id, article.title, article.url.as_string())
+
+    @classmethod
+    def topic_ids_matching_text(cls, language_id, title, url_string):
+        """
+
+            topic_ids_matching, for when only the title and url
+            of the article are loaded
+
+        """
+
+        def _compute():
+            return KeywordMatcher((keyword, topic_id)
+                                  for topic_id, keywords in (zeeguu_core.db.session
+                                                             .query(cls.topic_id, cls.keywords)
+                                                             .filter(cls.language_id == language_id))
+                                  for keyword in (keywords or "").strip().split(" "))
+
+        matcher = cls.matchers.get(language_id, _compute)
+
+        # the separator can't be part of a keyword, so
+        # no match spans over the end of the title
+        return matcher.matches((title or "") + "\0" + url_string)
+
     def all_articles(self):
         from zeeguu_core.model import Article
 
@@ -58,4 +101,10 @@ class LocalizedTopic(db.Model):
 
     @classmethod
     def all_for_language(cls, language):
-        return (cls.query.filter(cls.language == language)).all()
\ No newline at end of file
+        return (cls.query.filter(cls.language == language)).all()
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_changed_matchers(session, flush_context):
+    if any(isinstance(each, LocalizedTopic) for each in session.new | session.dirty | session.deleted):
+        LocalizedTopic.matchers.invalidate_all()
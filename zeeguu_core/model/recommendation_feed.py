@@ -0,0 +1,90 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UnicodeText
+from sqlalchemy.dialects.mysql import MEDIUMTEXT, insert as mysql_insert
+
+import zeeguu_core
+from zeeguu_core.model.user import User
+
+db = zeeguu_core.db
+
+
+class RecommendationFeed(db.Model):
+    """
+
+        The recommendations for a user, ranked and serialized ahead of
+        time by a background job, so that serving them is a lookup.
+
+        The article infos are stored without the per-user flags
+        (starred, opened, etc.), which change while the user reads.
+
+        A feed is only valid for the reading preferences it was computed
+        for (content_hash) and the difficulty levels of the user (which
+        are not part of the hash), so changing either makes it stale.
+
+    """
+    __table_args__ = {'mysql_collate': 'utf8_bin'}
+
+    user_id = Column(Integer, ForeignKey(User.id), primary_key=True)
+
+    content_hash = Column(String(256))
+
+    # the levels of every language, which the article infos were filtered by
+    levels = Column(String(256))
+
+    computed_at = Column(DateTime)
+
+    # json list of article infos
+    article_infos = Column(UnicodeText().with_variant(MEDIUMTEXT(), 'mysql'))
+
+    def __init__(self, user_id, content_hash, levels, article_infos):
+        self.user_id = user_id
+        self.content_hash = content_hash
+        self.levels = levels
+        self.article_infos = json.dumps(article_infos)
+        self.computed_at = datetime.now()
+
+    def __repr__(self):
+        return f'<RecommendationFeed {self.user_id} {self.content_hash}>'
+
+    def all_article_infos(self):
+        return json.loads(self.article_infos)
+
+    @classmethod
+    def find_fresh(cls, user_id, content_hash, levels, max_age_in_hours):
+        """
+
+        :return: the feed of the user, if it was computed for :param content_hash
+        and :param levels, in the last :param max_age_in_hours; None otherwise
+
+        """
+        return (cls.query
+                .filter(cls.user_id == user_id)
+                .filter(cls.content_hash == content_hash)
+                .filter(cls.levels == levels)
+                .filter(cls.computed_at > datetime.now() - timedelta(hours=max_age_in_hours))
+                .one_or_none())
+
+    @classmethod
+    def store(cls, session, user_id, content_hash, levels, article_infos):
+        """
+
+            replaces the feed of the user, with a single upsert, so that
+            two requests computing the feed of a new user at the same
+            time don't both try to insert it; does not commit
+
+        """
+        values = dict(user_id=user_id,
+                      content_hash=content_hash,
+                      levels=levels,
+                      computed_at=datetime.now(),
+                      article_infos=json.dumps(article_infos))
+
+        if session.get_bind().dialect.name == 'mysql':
+            upsert = (mysql_insert(cls.__table__).values(values)
+                      .on_duplicate_key_update({key: value for key, value in values.items() if key != 'user_id'}))
+        else:
+            upsert = cls.__table__.insert().prefix_with("OR REPLACE", dialect="sqlite").values(values)
+
+        session.execute(upsert)
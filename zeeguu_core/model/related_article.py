@@ -0,0 +1,107 @@
+from sqlalchemy import Column, Integer, ForeignKey, event, inspect, or_, select
+from sqlalchemy.orm import Session
+
+import zeeguu_core
+from zeeguu_core.model.article import Article
+
+db = zeeguu_core.db
+
+
+class RelatedArticle(db.Model):
+    """
+
+        The articles most similar to an article, as ranked by the
+        more_like_this query of ES, computed once per article in
+        the background, so that showing them is an indexed lookup
+        instead of sending the whole content of the article to ES.
+
+        Every computed article is also related to itself, without a
+        rank, so that an article for which ES found nothing similar is
+        known to be computed, and not computed again on every request.
+
+        When an article is marked broken or deleted, the rows which
+        mention it are removed, both its own and those of the articles
+        to which it was related, so that those get recomputed.
+
+    """
+    __tablename__ = 'related_article'
+    __table_args__ = {'mysql_collate': 'utf8_bin'}
+
+    article_id = Column(Integer, ForeignKey(Article.id, ondelete="CASCADE"), primary_key=True)
+
+    related_article_id = Column(Integer, ForeignKey(Article.id, ondelete="CASCADE"), primary_key=True, index=True)
+
+    # 0 for the most similar; None for the article itself
+    similarity_rank = Column(Integer)
+
+    def __init__(self, article_id, related_article_id, similarity_rank):
+        self.article_id = article_id
+        self.related_article_id = related_article_id
+        self.similarity_rank = similarity_rank
+
+    def __repr__(self):
+        return f'<RelatedArticle {self.article_id} -> {self.related_article_id} ({self.similarity_rank})>'
+
+    @classmethod
+    def has_been_computed(cls, article_id):
+        return cls.query.filter(cls.article_id == article_id).first() is not None
+
+    @classmethod
+    def related_articles(cls, article_id, count):
+        """
+
+        :return: the (at most :param count) articles related to
+        the article with :param article_id, most similar first
+
+        """
+        return (Article.query
+                .join(cls, cls.related_article_id == Article.id)
+                .filter(cls.article_id == article_id)
+                .filter(cls.related_article_id != article_id)
+                .filter(Article.broken == 0)
+                .order_by(cls.similarity_rank)
+                .limit(count)
+                .all())
+
+    @classmethod
+    def store(cls, session, article_id, related_article_ids):
+        """
+
+            replaces the related articles of the article with :param article_id
+            by :param related_article_ids, most similar first; does not commit
+
+        """
+        session.execute(cls.__table__.delete().where(cls.article_id == article_id))
+        session.execute(cls.__table__.insert(),
+                        [dict(article_id=article_id, related_article_id=article_id, similarity_rank=None)] +
+                        [dict(article_id=article_id, related_article_id=each, similarity_rank=rank)
+                         for rank, each in enumerate(related_article_ids) if each != article_id])
+
+    @classmethod
+    def forget(cls, session, article_ids):
+        """
+
+            removes the related articles of the :param article_ids, and
+            of the articles to which any of them is related; does not commit
+
+        """
+        table = cls.__table__
+
+        # selected first: mysql can't delete from a table it selects from
+        related_to_forgotten = [each[0] for each in session.execute(
+            select([table.c.article_id]).where(table.c.related_article_id.in_(article_ids)))]
+
+        session.execute(table.delete().where(or_(table.c.article_id.in_(article_ids),
+                                                 table.c.article_id.in_(related_to_forgotten))))
+
+
+@event.listens_for(Session, "after_flush")
+def _forget_broken_and_deleted_articles(session, flush_context):
+    article_ids = [each.id for each in session.deleted if isinstance(each, Article)]
+
+    for each in session.dirty:
+        if isinstance(each, Article) and each.broken and inspect(each).attrs.broken.history.has_changes():
+            article_ids.append(each.id)
+
+    if article_ids:
+        RelatedArticle.forget(session, article_ids)
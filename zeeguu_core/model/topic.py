@@ -2,6 +2,8 @@ import zeeguu_core
 
 from sqlalchemy import Column, Integer, String
 
+from zeeguu_core.util.bounded_cache import BoundedCache
+
 db = zeeguu_core.db
 
 
@@ -32,27 +34,41 @@ class Topic(db.Model):
             title=self.title,
         )
 
+    # the ids of the most recent articles; the crawler invalidates it
+    # after every run, the TTL bounds the staleness in the other processes
+    articles_cache = BoundedCache("topic articles", ttl_in_seconds=15 * 60, max_entries=256)
+
     def all_articles(self, limit=2000):
 
         from zeeguu_core.model import Article
 
-        if hasattr(Topic, 'cached_articles') and (self.cached_articles.get(self.id, None)):
-            zeeguu_core.logp (f"Topic: getting the cached articles for topic: {self.title}")
-            all_ids = Topic.cached_articles[self.id]
-            return Article.query.filter(Article.id.in_(all_ids)).all()
+        all_ids = self.article_ids(limit)
+        return Article.query.filter(Article.id.in_(all_ids)).all()
 
-        if not hasattr(Topic, 'cached_articles'):
-            Topic.cached_articles = {}
+    def article_ids(self, limit=2000):
+        """
 
-        zeeguu_core.logp("computing and caching the articles for topic: " + self.title)
-        Topic.cached_articles[self.id] = [each.id for each in
-                                          Article.query.order_by(Article.published_time.desc()).filter(Article.topics.any(id=self.id)).limit(limit)]
+            The (cached) ids of the :param limit most recent
+            articles with this topic
 
-        all_ids = Topic.cached_articles[self.id]
-        return Article.query.filter(Article.id.in_(all_ids)).all()
+        :return: tuple of article ids
+
+        """
+
+        from zeeguu_core.model import Article
+
+        def _compute():
+            zeeguu_core.logp("computing and caching the articles for topic: " + self.title)
+            query = (zeeguu_core.db.session.query(Article.id)
+                     .filter(Article.topics.any(id=self.id))
+                     .order_by(Article.published_time.desc())
+                     .limit(limit))
+            return tuple(each for (each,) in query)
+
+        return Topic.articles_cache.get((self.id, limit), _compute)
 
     def clear_all_articles_cache(self):
-        Topic.cached_articles[self.id] = None
+        Topic.articles_cache.invalidate_if(lambda key: key[0] == self.id)
 
     @classmethod
     def find(cls, name: str):
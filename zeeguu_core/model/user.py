@@ -490,16 +490,30 @@ class User(db.Model):
 
         lang_info = UserLanguage.with_language_id(language.id, self)
 
+        return self.levels_given(lang_info, language)
+
+    def levels_given(self, lang_info, language: Language):
+        """
+
+            same as levels_for, but for when the UserLanguage
+            of the :param language is already loaded
+
+        :param lang_info: the UserLanguage; None if the user has none
+
+        :return: pair of level_min and level_max for this user
+
+        """
+
         # default values, for when there's no corresponding setting
         declared_level_min = -1
         declared_level_max = 11
 
         # start from user's levels if they exist
-        if lang_info.declared_level_min:
+        if lang_info and lang_info.declared_level_min:
             if lang_info.declared_level_min > 0:
                 declared_level_min = lang_info.declared_level_min
 
-        if lang_info.declared_level_max:
+        if lang_info and lang_info.declared_level_max:
             if lang_info.declared_level_max < 10:
                 declared_level_max = lang_info.declared_level_max
 
@@ -512,7 +526,7 @@ class User(db.Model):
             6: (7, 10)
         }
 
-        if lang_info.cefr_level and lang_info.cefr_level > 0:
+        if lang_info and lang_info.cefr_level and lang_info.cefr_level > 0:
             declared_level_min, declared_level_max = CEFR_TO_DIFFICULTY_MAPPING[lang_info.cefr_level]
 
         # If there's cohort info, consider it
@@ -229,3 +229,66 @@ class UserArticle(zeeguu_core.db.Model):
             returned_info['translations'] = [each.serializable_dictionary() for each in translations]
 
         return returned_info
+
+    @classmethod
+    def user_article_infos(cls, user: User, articles: list, with_content=False, with_translations=True):
+        """
+
+            Batch version of user_article_info: returns exactly the same dicts,
+            in the order of :param articles, but with a constant number of
+            queries instead of several queries for every article.
+
+        """
+        article_infos = Article.article_infos(articles, with_content=with_content)
+
+        return cls.add_user_info(user, article_infos, with_translations)
+
+    @classmethod
+    def add_user_info(cls, user: User, article_infos: list, with_translations=True):
+        """
+
+            Adds the starred, opened, liked, and translations of :param user
+            to the :param article_infos, which are dicts as returned by
+            Article.article_info, whether they come from the DB or from
+            the ES index. Uses a constant number of queries.
+
+        :return: the article_infos
+
+        """
+        from zeeguu_core.model import Bookmark
+
+        article_ids = [each['id'] for each in article_infos]
+
+        user_article_for_article_id = {}
+        url_id_for_article_id = {}
+        for user_article, url_id in (zeeguu_core.db.session.query(cls, Article.url_id)
+                                     .join(cls.article)
+                                     .filter(cls.user_id == user.id)
+                                     .filter(cls.article_id.in_(article_ids))):
+            user_article_for_article_id[user_article.article_id] = user_article
+            url_id_for_article_id[user_article.article_id] = url_id
+
+        translations_for_url_id = {}
+        if with_translations and url_id_for_article_id:
+            for bookmark in Bookmark.find_all_for_user_and_url_ids(user, list(url_id_for_article_id.values())):
+                translations_for_url_id.setdefault(bookmark.text.url_id, []).append(bookmark)
+
+        for returned_info in article_infos:
+            user_article_info = user_article_for_article_id.get(returned_info['id'])
+
+            if not user_article_info:
+                returned_info['starred'] = False
+                returned_info['opened'] = False
+                returned_info['liked'] = False
+                returned_info['translations'] = []
+                continue
+
+            returned_info['starred'] = user_article_info.starred is not None
+            returned_info['opened'] = user_article_info.opened is not None
+            returned_info['liked'] = user_article_info.liked
+
+            if with_translations:
+                translations = translations_for_url_id.get(url_id_for_article_id[returned_info['id']], [])
+                returned_info['translations'] = [each.serializable_dictionary() for each in translations]
+
+        return article_infos
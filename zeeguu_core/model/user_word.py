@@ -2,7 +2,6 @@ from datetime import time
 
 import sqlalchemy.orm
 from sqlalchemy.orm.exc import NoResultFound
-from wordstats import Word
 
 import zeeguu_core
 from zeeguu_core import util
@@ -49,6 +48,7 @@ class UserWord(db.Model, util.JSONSerializable):
 
         :return: number between 0 and 10 as returned by the wordstats module
         """
+        from wordstats import Word
         stats = Word.stats(self.word, self.language.code)
         return int(stats.importance)
 
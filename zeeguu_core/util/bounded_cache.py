@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class BoundedCache:
+    """
+
+        A small in-process cache with a time to live for its entries
+        and an upper bound on their number; when full, the least
+        recently used entry is evicted.
+
+        Keeps count of hits, misses, evictions, and expirations,
+        so one can see whether the cache is worth having.
+
+        Safe to use from several threads.
+
+    """
+
+    def __init__(self, name, ttl_in_seconds, max_entries):
+        self.name = name
+        self.ttl_in_seconds = ttl_in_seconds
+        self.max_entries = max_entries
+
+        # key -> (expiry time, value); ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, compute):
+        """
+
+        :return: the cached value for :param key; if there's none,
+        or it expired, the result of calling :param compute, which
+        is then cached
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            if entry:
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # computed outside of the lock; two threads missing
+        # at the same time will both compute the value
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_in_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_if(self, predicate):
+        """
+
+            drops the entries whose key fulfills :param predicate
+
+        """
+        with self._lock:
+            for key in [each for each in self._entries if predicate(each)]:
+                del self._entries[key]
+
+    def invalidate_all(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(name=self.name,
+                        size=len(self._entries),
+                        hits=self.hits,
+                        misses=self.misses,
+                        evictions=self.evictions,
+                        expirations=self.expirations)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,67 @@
+"""
+
+ For the tools which go through all the articles in batches, in the
+ order of their ids: after every batch, the id of its last article
+ is saved in a checkpoint file, so that a stopped run continues where
+ it stopped. The work can be split over several machines or processes,
+ each with its own shard (of the article ids) and checkpoint.
+
+ A tool called e.g. map_article_words keeps the checkpoint of the
+ second of four shards in map_article_words.1-of-4.checkpoint, in
+ the directory it runs in; to start from scratch, delete the file.
+
+"""
+
+import os
+
+
+def shard_file_name(tool_name, shard, shard_count, extension):
+    return f"{tool_name}.{shard}-of-{shard_count}.{extension}"
+
+
+def write_atomically(file_name, text):
+    # replaced atomically, so that a crash can't leave it half written
+    with open(file_name + ".tmp", "w") as f:
+        f.write(text)
+    os.replace(file_name + ".tmp", file_name)
+
+
+class Checkpoint:
+    def __init__(self, tool_name, shard=0, shard_count=1):
+        self.file_name = shard_file_name(tool_name, shard, shard_count, "checkpoint")
+
+    def last_article_id(self):
+        """
+
+        :return: the id saved by the previous run; 0 if there was none
+
+        """
+        if not os.path.exists(self.file_name):
+            return 0
+        with open(self.file_name) as f:
+            return int(f.read().strip())
+
+    def save(self, article_id):
+        write_atomically(self.file_name, str(article_id))
+
+
+def batches_after(query, id_column, article_id, shard=0, shard_count=1, batch_size=1000):
+    """
+
+        the rows of :param query (with a property named id, e.g. the
+        model objects, or rows of which the first column is Article.id)
+        of the :param shard, after :param article_id, in batches of
+        :param batch_size, in the order of their ids
+
+    """
+    while True:
+        batch_query = query.filter(id_column > article_id)
+        if shard_count > 1:
+            batch_query = batch_query.filter(id_column % shard_count == shard)
+
+        batch = batch_query.order_by(id_column).limit(batch_size).all()
+        if not batch:
+            return
+
+        yield batch
+        article_id = batch[-1].id
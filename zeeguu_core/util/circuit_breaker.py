@@ -0,0 +1,64 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+
+        Remembers whether a backend is healthy, so that when it's
+        down the callers can skip it right away instead of every
+        one of them waiting for it to time out.
+
+        - closed: calls go through; after failure_threshold
+          consecutive failures the breaker opens
+        - open: calls are refused; after reset_timeout_in_seconds
+          the next call is let through as a probe (half open)
+        - half open: only the probe goes through; its success
+          closes the breaker, its failure opens it again
+
+        Safe to use from several threads.
+
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout_in_seconds=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_in_seconds = reset_timeout_in_seconds
+
+        self.state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """
+
+        :return: True if the call should go to the backend
+
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_in_seconds:
+                # this call is the probe; the others are refused until it's done
+                self.state = HALF_OPEN
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self._consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self.state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = time.monotonic()
@@ -0,0 +1,78 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+
+        Finds which of many keywords occur in a text, in a single
+        pass over the text, whatever the number of keywords
+        (an Aho-Corasick automaton).
+
+        Every keyword has a value (e.g. the id of a topic), and
+        matching returns the values of all the keywords which occur
+        in the text, as substrings, like `keyword in text` would.
+
+        Immutable once built, so it can be shared between threads.
+
+    """
+
+    def __init__(self, values_of_keywords):
+        """
+
+        :param values_of_keywords: (keyword, value) pairs; a keyword
+        can have several values, and a value several keywords
+
+        """
+        # the trie: for every state, its transitions and the values
+        # of the keywords which end in it (or in its suffixes)
+        self._transitions = [{}]
+        self._values = [set()]
+        self._fail = [0]
+
+        for keyword, value in values_of_keywords:
+            if keyword:
+                self._values[self._add(keyword)].add(value)
+
+        self._link_failures()
+
+    def _add(self, keyword):
+        state = 0
+        for character in keyword:
+            if character not in self._transitions[state]:
+                self._transitions.append({})
+                self._values.append(set())
+                self._fail.append(0)
+                self._transitions[state][character] = len(self._transitions) - 1
+            state = self._transitions[state][character]
+        return state
+
+    def _link_failures(self):
+        # breadth first, so the failure of a state is linked before its children
+        queue = deque(self._transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, child in self._transitions[state].items():
+                fail = self._fail[state]
+                while fail and character not in self._transitions[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._transitions[fail].get(character, 0)
+
+                # what ends in the longest proper suffix ends here too
+                self._values[child] |= self._values[self._fail[child]]
+                queue.append(child)
+
+    def matches(self, text):
+        """
+
+        :return: the set of values of the keywords in :param text
+
+        """
+        found = set()
+        state = 0
+        for character in text:
+            while state and character not in self._transitions[state]:
+                state = self._fail[state]
+            state = self._transitions[state].get(character, 0)
+            if self._values[state]:
+                found |= self._values[state]
+        return found
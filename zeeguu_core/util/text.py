@@ -1,10 +1,7 @@
 import math
 
-import nltk
-import pyphen
 import regex
 from collections import Counter
-from nltk import SnowballStemmer
 from zeeguu_core.model import Language
 
 AVERAGE_SYLLABLE_LENGTH = 2.5
@@ -19,6 +16,8 @@ def split_words_from_text(text):
     return words
 
 def split_unique_words_from_text(text, language:Language):
+    from nltk import SnowballStemmer
+
     words = split_words_from_text(text)
     stemmer = SnowballStemmer(language.name.lower())
     return set([stemmer.stem(w.lower()) for w in words])
@@ -31,18 +30,22 @@ def unique_length(text, language: Language):
     return len(words_unique)
 
 def number_of_sentences(text):
+    import nltk
     return len(nltk.sent_tokenize(text))
 
 def average_sentence_length(text):
     return length(text)/number_of_sentences(text)
 
 def median_sentence_length(text):
+    import nltk
     sentence_lengths = [length(s) for s in nltk.sent_tokenize(text)]
     sentence_lengths = sorted(sentence_lengths)
 
     return sentence_lengths[int(len(sentence_lengths)/2)]
 
 def number_of_syllables(text, language:Language):
+    import pyphen
+
     words = [w.lower() for w in split_words_from_text(text)]
 
     number_of_syllables = 0
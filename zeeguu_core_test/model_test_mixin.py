@@ -18,6 +18,11 @@ class ModelTestMixIn(TestCase):
         self.faker = Faker()
         self.db.create_all()
 
+        # the in-process caches would outlive the database of the previous test
+        zeeguu_core.model.Language.articles_cache.invalidate_all()
+        zeeguu_core.model.Topic.articles_cache.invalidate_all()
+        zeeguu_core.model.LocalizedTopic.matchers.invalidate_all()
+
     def tearDown(self):
         super(ModelTestMixIn, self).tearDown()
         self.faker = None
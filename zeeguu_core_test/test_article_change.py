@@ -0,0 +1,119 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core.elastic import sync
+from zeeguu_core.model import ArticleChange, Topic
+
+session = zeeguu_core.db.session
+
+
+def _bulk_succeeding(sent):
+    def streaming_bulk(client, actions, **kwargs):
+        sent.extend(actions)
+        return [(True, {each['_op_type']: {'_id': each['_id'], 'status': 200}}) for each in sent]
+
+    return streaming_bulk
+
+
+def _bulk_rejecting(article_id, status):
+    def streaming_bulk(client, actions, **kwargs):
+        return [(each['_id'] != article_id,
+                 {each['_op_type']: {'_id': str(each['_id']), 'status': status if each['_id'] == article_id else 200}})
+                for each in actions]
+
+    return streaming_bulk
+
+
+def _changed_article_ids():
+    return [each.article_id for each in ArticleChange.oldest(100)]
+
+
+class ArticleChangeTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        patcher = patch.dict(zeeguu_core.app.config, {"ELASTIC_SYNC_OUTBOX": True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.articles = [ArticleRule().article for _ in range(2)]
+        session.commit()
+
+        self.article, self.other = self.articles
+
+    def _forget_changes(self):
+        ArticleChange.remove(session, [each.id for each in ArticleChange.oldest(100)])
+        session.commit()
+
+    def test_new_articles_are_recorded(self):
+        assert sorted(_changed_article_ids()) == sorted(each.id for each in self.articles)
+
+    def test_indexed_changes_are_recorded(self):
+        self._forget_changes()
+
+        self.article.vote_broken()
+        self.other.add_topic(Topic("Sport"))
+        session.commit()
+
+        assert sorted(_changed_article_ids()) == sorted(each.id for each in self.articles)
+
+    def test_deleted_article_is_recorded(self):
+        self._forget_changes()
+        article_id = self.article.id
+
+        session.delete(self.article)
+        session.commit()
+
+        assert _changed_article_ids() == [article_id]
+
+    def test_nothing_is_recorded_when_disabled(self):
+        self._forget_changes()
+
+        with patch.dict(zeeguu_core.app.config, {"ELASTIC_SYNC_OUTBOX": False}):
+            self.article.fk_difficulty = 10
+            session.commit()
+
+        assert _changed_article_ids() == []
+
+    def test_sync_indexes_the_changed_and_deletes_the_broken(self):
+        self._forget_changes()
+        self.article.vote_broken()
+        self.other.fk_difficulty = 10
+        session.commit()
+
+        sent = []
+        with patch.object(sync, 'es_client', return_value=MagicMock()), \
+                patch('elasticsearch.helpers.streaming_bulk', _bulk_succeeding(sent)):
+            assert sync.sync_article_changes(session) == 2
+
+        actions = {each['_id']: each for each in sent}
+        assert actions[self.article.id]['_op_type'] == 'delete'
+        assert actions[self.other.id]['_op_type'] == 'index'
+        assert actions[self.other.id]['_source']['fk_difficulty'] == 10
+        assert _changed_article_ids() == []
+
+    def test_changes_stay_in_the_outbox_when_elastic_is_down(self):
+        with patch.object(sync, 'es_client', return_value=MagicMock()), \
+                patch('elasticsearch.helpers.streaming_bulk', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                sync.sync_article_changes(session)
+
+        session.rollback()
+        assert sorted(_changed_article_ids()) == sorted(each.id for each in self.articles)
+
+    def test_rejected_changes_stay_in_the_outbox_only_if_transient(self):
+        with patch.object(sync, 'es_client', return_value=MagicMock()), \
+                patch('elasticsearch.helpers.streaming_bulk', _bulk_rejecting(self.article.id, 429)):
+            assert sync.sync_article_changes(session) == 1
+
+        assert _changed_article_ids() == [self.article.id]
+
+        with patch.object(sync, 'es_client', return_value=MagicMock()), \
+                patch('elasticsearch.helpers.streaming_bulk', _bulk_rejecting(self.article.id, 400)):
+            assert sync.sync_article_changes(session) == 1
+
+        assert _changed_article_ids() == []
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core.model import ArticleContentToken
+
+session = zeeguu_core.db.session
+
+
+class ArticleContentTokenTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.article = ArticleRule().article
+        self.article.title = "Elections in Denmark"
+        self.article.content = "The Social Democrats won the elections, again."
+        self.other_article = ArticleRule().article
+        self.other_article.title = "Football"
+        self.other_article.content = "Denmark won the match."
+        session.commit()
+
+        ArticleContentToken.index_articles(session, [self.article, self.other_article])
+        session.commit()
+
+    def _ids_containing(self, keywords):
+        return set(each for (each,) in ArticleContentToken.article_ids_containing(keywords))
+
+    def test_tokens_are_lowercased_words(self):
+        assert ArticleContentToken.tokenize("Won the elections, again.") == {"won", "the", "elections", "again"}
+
+    def test_article_ids_containing_a_keyword(self):
+        assert self._ids_containing("Denmark") == {self.article.id, self.other_article.id}
+        assert self._ids_containing("elections") == {self.article.id}
+
+    def test_all_the_tokens_of_the_keywords_must_be_in_the_article(self):
+        assert self._ids_containing("social democrats") == {self.article.id}
+        assert self._ids_containing("social match") == set()
+
+    def test_only_whole_tokens_match(self):
+        assert self._ids_containing("election") == set()
+
+    def test_indexing_again_does_not_fail(self):
+        ArticleContentToken.index_articles(session, [self.article])
+        session.commit()
+
+        assert self._ids_containing("elections") == {self.article.id}
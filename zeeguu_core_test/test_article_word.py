@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+from sqlalchemy import event
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core.model import ArticleWord
+
+session = zeeguu_core.db.session
+
+
+class ArticleWordTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.article = ArticleRule().article
+        self.existing = ArticleWord.find_or_create(session, "election")
+        self.existing.add_article(ArticleRule().article)
+        session.commit()
+
+    def test_words_are_mapped_to_the_article(self):
+        ArticleWord.add_words_to_article(session, self.article.id, ["election", "results"])
+        session.commit()
+
+        assert set(each.word for each in self.article.words) == {"election", "results"}
+
+    def test_existing_words_are_reused(self):
+        ArticleWord.add_words_to_article(session, self.article.id, ["election", "results"])
+        session.commit()
+
+        assert ArticleWord.query.filter(ArticleWord.word == "election").count() == 1
+        assert len(self.existing.articles) == 2
+
+    def test_constant_number_of_queries_and_no_postings_loaded(self):
+        words = ["election"] + [f"word{i}" for i in range(20)]
+        article_id = self.article.id
+
+        statements = []
+        engine = zeeguu_core.db.get_engine()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            ArticleWord.add_words_to_article(session, article_id, words)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        # existing words, insert of the missing ones, their ids, and the mappings
+        assert len(statements) == 4
+        assert not [each for each in statements if "FROM article, article_word_map" in each]
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core.model import ArticlesCache
+
+session = zeeguu_core.db.session
+
+A_HASH = "lan: de  top: 1 sear:  filt:  sear-filt: "
+
+
+class ArticlesCacheTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.articles = [ArticleRule().article for _ in range(3)]
+
+    def test_add_articles_for_hash(self):
+        ArticlesCache.add_articles_for_hash(session, A_HASH, self.articles)
+        session.commit()
+
+        assert ArticlesCache.check_if_hash_exists(A_HASH)
+        assert set(ArticlesCache.get_articles_for_hash(A_HASH, 10)) == set(self.articles)
+
+    def test_recomputing_a_hash_does_not_duplicate_articles(self):
+        ArticlesCache.add_articles_for_hash(session, A_HASH, self.articles[:2])
+        session.commit()
+        ArticlesCache.add_articles_for_hash(session, A_HASH, self.articles)
+        session.commit()
+
+        assert len(ArticlesCache.get_articles_for_hash(A_HASH, 10)) == 3
+
+    def test_trim_hash_keeps_the_most_recent_articles(self):
+        ArticlesCache.add_articles_for_hash(session, A_HASH, self.articles)
+        ArticlesCache.trim_hash(session, A_HASH, 2)
+        session.commit()
+
+        most_recent = sorted(self.articles, key=lambda each: each.published_time, reverse=True)[:2]
+        assert set(ArticlesCache.get_articles_for_hash(A_HASH, 10)) == set(most_recent)
+
+    def test_remove_articles_older_than(self):
+        old_article = self.articles[0]
+        old_article.published_time = datetime.now() - timedelta(days=100)
+        broken_article = self.articles[1]
+        broken_article.vote_broken()
+
+        ArticlesCache.add_articles_for_hash(session, A_HASH, self.articles)
+        ArticlesCache.remove_articles_older_than(session, 30)
+        session.commit()
+
+        assert ArticlesCache.get_articles_for_hash(A_HASH, 10) == [self.articles[2]]
@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from zeeguu_core.util.bounded_cache import BoundedCache
+
+
+class BoundedCacheTest(TestCase):
+    def setUp(self):
+        self.cache = BoundedCache("test", ttl_in_seconds=60, max_entries=2)
+
+    def test_value_is_computed_once(self):
+        computed = []
+        compute = lambda: computed.append(1) or len(computed)
+
+        assert self.cache.get("a", compute) == 1
+        assert self.cache.get("a", compute) == 1
+
+        assert self.cache.stats()['hits'] == 1
+        assert self.cache.stats()['misses'] == 1
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.get("a", lambda: 1)
+        self.cache.get("b", lambda: 2)
+        self.cache.get("a", lambda: 1)
+        self.cache.get("c", lambda: 3)
+
+        assert len(self.cache) == 2
+        assert self.cache.get("b", lambda: "recomputed") == "recomputed"
+        assert self.cache.stats()['evictions'] == 2
+
+    def test_expired_entries_are_recomputed(self):
+        cache = BoundedCache("test", ttl_in_seconds=0, max_entries=2)
+        cache.get("a", lambda: 1)
+
+        assert cache.get("a", lambda: 2) == 2
+        assert cache.stats()['expirations'] == 1
+
+    def test_invalidate_if(self):
+        self.cache.get((1, True), lambda: 1)
+        self.cache.get((2, True), lambda: 2)
+
+        self.cache.invalidate_if(lambda key: key[0] == 1)
+
+        assert self.cache.get((1, True), lambda: "recomputed") == "recomputed"
+        assert self.cache.get((2, True), lambda: "recomputed") == 2
@@ -0,0 +1,49 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core.model import Article
+from zeeguu_core.util.checkpoint import Checkpoint, batches_after
+
+session = zeeguu_core.db.session
+
+
+class CheckpointTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = Checkpoint(os.path.join(directory.name, "tool"), 1, 4)
+
+    def test_nothing_saved_means_from_the_beginning(self):
+        assert self.checkpoint.last_article_id() == 0
+
+    def test_the_saved_id_is_read_back(self):
+        self.checkpoint.save(12)
+        self.checkpoint.save(42)
+
+        assert self.checkpoint.file_name.endswith("tool.1-of-4.checkpoint")
+        assert self.checkpoint.last_article_id() == 42
+
+
+class BatchesAfterTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = [ArticleRule().article.id for _ in range(5)]
+
+    def _batches(self, query, article_id=0, shard=0, shard_count=1):
+        return [[each.id for each in batch]
+                for batch in batches_after(query, Article.id, article_id, shard, shard_count, batch_size=2)]
+
+    def test_batches_in_the_order_of_the_ids(self):
+        assert self._batches(Article.query) == [self.ids[0:2], self.ids[2:4], self.ids[4:]]
+        assert self._batches(session.query(Article.id, Article.title), self.ids[2]) == [self.ids[3:]]
+
+    def test_shards_split_the_ids(self):
+        shards = [self._batches(Article.query, shard=each, shard_count=2) for each in range(2)]
+
+        assert sorted(id for shard in shards for batch in shard for id in batch) == self.ids
+        assert all(id % 2 == 1 for batch in shards[1] for id in batch)
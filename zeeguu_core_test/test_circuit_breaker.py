@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from zeeguu_core.util.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+class CircuitBreakerTest(TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout_in_seconds=60)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        assert self.breaker.allow_request()
+
+        self.breaker.record_failure()
+        assert self.breaker.state == OPEN
+        assert not self.breaker.allow_request()
+
+    def test_a_success_resets_the_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+
+        assert self.breaker.state == CLOSED
+
+    def test_only_one_probe_when_half_open(self):
+        self.breaker.reset_timeout_in_seconds = 0
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        assert self.breaker.allow_request()
+        assert self.breaker.state == HALF_OPEN
+        assert not self.breaker.allow_request()
+
+    def test_probe_result_closes_or_reopens(self):
+        self.breaker.reset_timeout_in_seconds = 0
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        self.breaker.allow_request()
+        self.breaker.record_failure()
+        assert self.breaker.state == OPEN
+
+        self.breaker.allow_request()
+        self.breaker.record_success()
+        assert self.breaker.state == CLOSED
@@ -0,0 +1,75 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from zeeguu_core.content_recommender import elastic_first_recommender
+from zeeguu_core.content_recommender.cursor import encode_cursor, MYSQL_BACKEND, ELASTIC_BACKEND
+from zeeguu_core.util.circuit_breaker import CircuitBreaker
+
+
+class ElasticFirstRecommenderTest(TestCase):
+    def setUp(self):
+        self.elastic = MagicMock(return_value=["from elastic"])
+        self.mixed = MagicMock(return_value=["from mysql"])
+        self.elastic_page = MagicMock(return_value=(["from elastic"], None))
+        self.mixed_page = MagicMock(return_value=(["from mysql"], None))
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout_in_seconds=60)
+
+        for name, value in [('elastic_article_recommendations_for_user', self.elastic),
+                            ('mixed_article_recommendations_for_user', self.mixed),
+                            ('elastic_article_recommendations_page', self.elastic_page),
+                            ('mixed_article_recommendations_page', self.mixed_page),
+                            ('elastic_breaker', self.breaker)]:
+            patcher = patch.object(elastic_first_recommender, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        elastic_first_recommender.served_by.clear()
+
+    def _recommend(self):
+        return elastic_first_recommender.article_recommendations_for_user(None, 10)
+
+    def test_only_elastic_serves_when_it_works(self):
+        assert self._recommend() == ["from elastic"]
+        assert not self.mixed.called
+        assert elastic_first_recommender.backend_metrics()['served_by'] == {'elastic': 1}
+
+    def test_falls_back_on_mysql_when_elastic_fails(self):
+        self.elastic.side_effect = ConnectionError()
+
+        assert self._recommend() == ["from mysql"]
+
+    def test_elastic_is_skipped_once_the_breaker_opens(self):
+        self.elastic.side_effect = ConnectionError()
+        for _ in range(3):
+            self._recommend()
+
+        assert self.elastic.call_count == 2
+        assert elastic_first_recommender.backend_metrics() == dict(
+            elastic_breaker="open",
+            served_by={'mysql_after_elastic_failed': 2, 'mysql': 1})
+
+    def test_mysql_cursor_goes_to_mysql(self):
+        cursor = encode_cursor(MYSQL_BACKEND, ["2020-01-01T00:00:00", 1])
+
+        assert elastic_first_recommender.article_recommendations_page(None, 10, cursor)[0] == ["from mysql"]
+        assert not self.elastic_page.called
+        self.mixed_page.assert_called_once_with(None, 10, cursor)
+
+    def test_mysql_starts_over_when_elastic_fails_mid_scroll(self):
+        self.elastic_page.side_effect = ConnectionError()
+        cursor = encode_cursor(ELASTIC_BACKEND, {"de": [1.0, 1]})
+
+        assert elastic_first_recommender.article_recommendations_page(None, 10, cursor)[0] == ["from mysql"]
+        self.elastic_page.assert_called_once_with(None, 10, cursor)
+        self.mixed_page.assert_called_once_with(None, 10, None)
+
+    def test_search_falls_back_on_the_full_text_index_if_the_node_has_one(self):
+        failing_search = MagicMock(side_effect=ConnectionError())
+        full_text_search = MagicMock(return_value=["from the full-text index"])
+
+        with patch.object(elastic_first_recommender, 'elastic_article_search_for_user', failing_search), \
+                patch.object(elastic_first_recommender, 'full_text_article_search_for_user', full_text_search), \
+                patch.object(elastic_first_recommender, 'full_text_index_enabled', return_value=True):
+            assert elastic_first_recommender.article_search_for_user(None, 10, "votes") == ["from the full-text index"]
+
+        assert elastic_first_recommender.backend_metrics()['served_by'] == {'full_text_after_elastic_failed': 1}
@@ -0,0 +1,129 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from sqlalchemy import event
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core_test.rules.user_rule import UserRule
+from zeeguu_core.content_recommender import elastic_recommender
+from zeeguu_core.content_recommender.cursor import InvalidCursor, decode_cursor, encode_cursor, ELASTIC_BACKEND
+from zeeguu_core.elastic.converting_from_mysql import document_from_article, article_info_from_document
+from zeeguu_core.model import UserLanguage, Topic, RelatedArticle
+
+session = zeeguu_core.db.session
+
+
+def _hits(articles):
+    return {'hits': {'hits': [{'_id': str(each.id)} for each in articles]}}
+
+
+def _hits_with_source(articles):
+    return {'hits': {'hits': [{'_id': str(each.id), '_source': document_from_article(each, session)}
+                              for each in articles]}}
+
+
+class ElasticRecommenderTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user = UserRule().user
+        session.add(UserLanguage(self.user, self.user.learned_language))
+        self.articles = [ArticleRule().article for _ in range(3)]
+        session.commit()
+
+        self.es = MagicMock()
+        patcher = patch.object(elastic_recommender, 'es_client', return_value=self.es)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hits_are_hydrated_in_ranking_order(self):
+        ranked = [self.articles[2], self.articles[0], self.articles[1]]
+
+        articles = elastic_recommender._to_articles_from_ES_hits(_hits(ranked)['hits']['hits'])
+
+        assert articles == ranked
+
+    def test_hits_of_deleted_articles_are_skipped(self):
+        hits = _hits(self.articles)['hits']['hits'] + [{'_id': '999999'}]
+
+        assert elastic_recommender._to_articles_from_ES_hits(hits) == self.articles
+
+    def test_search_sends_one_multi_search(self):
+        self.es.msearch.return_value = {'responses': [_hits(self.articles[:2])]}
+
+        found = elastic_recommender.article_search_for_user(self.user, 10, "")
+
+        assert self.es.msearch.call_count == 1
+        assert not self.es.search.called
+        assert [each['id'] for each in found] == [each.id for each in self.articles[:2]]
+
+    def test_failed_multi_search_raises(self):
+        self.es.msearch.return_value = {'responses': [{'error': 'index not found'}]}
+
+        with self.assertRaises(Exception):
+            elastic_recommender.article_search_for_user(self.user, 10, "")
+
+    def test_card_from_the_document_is_the_article_info(self):
+        article = self.articles[0]
+        article.add_topic(Topic("Sport"))
+        session.commit()
+
+        assert article_info_from_document(document_from_article(article, session)) == article.article_info()
+
+    def test_cards_are_built_from_the_source(self):
+        self.es.msearch.return_value = {'responses': [_hits_with_source(self.articles[:2])]}
+
+        statements = []
+        engine = zeeguu_core.db.get_engine()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            found = elastic_recommender.article_search_for_user(self.user, 10, "")
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert [each['id'] for each in found] == [each.id for each in self.articles[:2]]
+        assert not [each for each in statements if each.lstrip().startswith("SELECT article.")]
+
+    def test_search_after_the_last_hit_of_the_previous_page(self):
+        first_page = _hits(self.articles[:2])
+        for score, each in zip([2.0, 1.0], first_page['hits']['hits']):
+            each['sort'] = [score, 1600000000000, each['_id']]
+        self.es.msearch.return_value = {'responses': [first_page]}
+
+        found, cursor = elastic_recommender.article_search_page(self.user, 2, "")
+        assert [each['id'] for each in found] == [each.id for each in self.articles[:2]]
+
+        language_code = self.user.learned_language.code
+        assert decode_cursor(cursor) == ('elastic', {language_code: [1.0, 1600000000000, str(self.articles[1].id)]})
+
+        self.es.msearch.return_value = {'responses': [_hits(self.articles[2:])]}
+        found, cursor = elastic_recommender.article_search_page(self.user, 2, "", cursor)
+
+        query_body = self.es.msearch.call_args[1]['body'][1]
+        assert query_body['search_after'] == [1.0, 1600000000000, str(self.articles[1].id)]
+        # a total order, even for the documents without an id field
+        assert query_body['sort'][-1] == {"_id": "desc"}
+        assert [each['id'] for each in found] == [self.articles[2].id]
+        assert cursor is None
+
+    def test_cursor_of_the_older_sort_is_invalid(self):
+        cursor = encode_cursor(ELASTIC_BACKEND, {self.user.learned_language.code: [1.0, self.articles[1].id]})
+
+        with self.assertRaises(InvalidCursor):
+            elastic_recommender.article_search_page(self.user, 2, "", cursor)
+
+    def test_related_articles_are_computed_once(self):
+        article = self.articles[0]
+        self.es.msearch.return_value = {'responses': [_hits(self.articles)]}
+
+        for _ in range(2):
+            found = elastic_recommender.more_like_this_article(self.user, 10, article.id)
+            assert [each['id'] for each in found] == [each.id for each in self.articles[1:]]
+
+        assert self.es.msearch.call_count == 1
+        assert not self.es.search.called
+        assert RelatedArticle.has_been_computed(article.id)
@@ -0,0 +1,108 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core_test.rules.user_rule import UserRule
+from zeeguu_core.content_recommender import fts_recommender
+from zeeguu_core.full_text import index
+from zeeguu_core.model import Topic, TopicFilter, UserLanguage
+
+session = zeeguu_core.db.session
+
+
+class FullTextIndexTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        index_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        patcher = patch.dict(zeeguu_core.app.config, FTS_INDEX_FILE=index_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(os.remove, index_file)
+        self.addCleanup(self._close_connection)
+
+        self.user = UserRule().user
+        self.language = self.user.learned_language
+        session.add(UserLanguage(self.user, self.language))
+
+        self.sport = Topic("Sport")
+        self.election = self._article("The election", "the votes were counted late into the night")
+        self.match = self._article("The match", "the votes of the fans chose the player of the match")
+        self.match.add_topic(self.sport)
+        session.commit()
+
+        index.index_articles([self.election, self.match])
+
+    def _close_connection(self):
+        index._local.connection.close()
+        index._local.connection = None
+
+    def _article(self, title, content):
+        article = ArticleRule().article
+        article.title = title
+        article.content = content
+        # the random summary of the rule is indexed too
+        article.summary = ""
+        article.language = self.language
+        article.fk_difficulty = 50
+        return article
+
+    def _search(self, search_terms, **filters):
+        return index.search(10, search_terms, self.language.code, 0, 100, **filters)
+
+    def test_search_terms_are_found_in_the_content(self):
+        assert self._search("counted") == [self.election.id]
+        assert set(self._search("vote")) == {self.election.id, self.match.id}
+        assert self._search("votes nothing") == []
+
+    def test_filters_of_the_elastic_query(self):
+        assert self._search("votes", topics_to_include=["Sport"]) == [self.match.id]
+        assert self._search("votes", topics_to_exclude=["Sport"]) == [self.election.id]
+        assert self._search("votes", unwanted_keywords=["the fans"]) == [self.election.id]
+        assert index.search(10, "votes", self.language.code, 60, 100) == []
+
+    def test_search_input_is_not_query_syntax(self):
+        assert self._search('"counted (') == [self.election.id]
+        assert self._search('counted OR match') == []
+
+    def test_reindexing_replaces_the_article(self):
+        self.election.content = "no more polls"
+        index.index_articles([self.election])
+
+        assert self._search("counted") == []
+        assert self._search("polls") == [self.election.id]
+
+    def test_recommender_skips_broken_articles_and_filtered_topics(self):
+        session.add(TopicFilter(self.user, self.sport))
+        session.commit()
+        assert [each['id'] for each in fts_recommender.article_search_for_user(self.user, 10, "votes")] \
+               == [self.election.id]
+
+        self.election.vote_broken()
+        session.commit()
+        assert fts_recommender.article_search_for_user(self.user, 10, "votes") == []
+
+    def test_deleted_and_broken_articles_are_removed(self):
+        self.election.vote_broken()
+        session.delete(self.match)
+        session.commit()
+
+        assert self._search("votes") == []
+
+    def test_changed_articles_are_indexed_again(self):
+        self.election.fk_difficulty = 70
+        self.election.add_topic(self.sport)
+        session.commit()
+
+        assert index.search(10, "votes", self.language.code, 60, 100) == [self.election.id]
+        assert set(self._search("votes", topics_to_include=["Sport"])) == {self.election.id, self.match.id}
+
+    def test_topics_added_without_the_orm(self):
+        index.add_article_topics([("Sport", self.election.id)])
+
+        assert set(self._search("votes", topics_to_include=["Sport"])) == {self.election.id, self.match.id}
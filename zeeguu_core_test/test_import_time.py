@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+from unittest import TestCase
+
+# modules which are expensive to import and are only
+# needed by some of the code paths (crawling, difficulty
+# estimation, elastic search, etc.); they should be
+# imported at first use and not when loading the model
+HEAVY_DEPENDENCIES = ['newspaper', 'nltk', 'pyphen', 'langdetect', 'elasticsearch', 'wordstats', 'numpy']
+
+# generous upper bound for `import zeeguu_core.model`;
+# on a dev machine this takes around half a second
+IMPORT_TIME_BUDGET_IN_SECONDS = 2.0
+
+# the unittest import makes the configuration
+# loader pick up the testing configuration
+IMPORT_SCRIPT = f"""
+import json, sys, time
+import unittest
+
+start = time.perf_counter()
+import zeeguu_core.model
+elapsed = time.perf_counter() - start
+
+print(json.dumps(dict(
+    elapsed=elapsed,
+    loaded=[each for each in {HEAVY_DEPENDENCIES!r} if each in sys.modules]
+)))
+"""
+
+
+def _measure_model_import():
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT], stderr=subprocess.DEVNULL)
+    last_line = output.decode("utf8").strip().split("\n")[-1]
+    return json.loads(last_line)
+
+
+class ImportTimeTest(TestCase):
+
+    def test_heavy_dependencies_are_not_loaded_with_the_model(self):
+        result = _measure_model_import()
+        assert result['loaded'] == [], f"imported at start-up: {result['loaded']}"
+
+    def test_model_import_is_within_budget(self):
+        # best of three, to be less sensitive to a busy machine
+        best = min(_measure_model_import()['elapsed'] for _ in range(3))
+        assert best < IMPORT_TIME_BUDGET_IN_SECONDS, f"import zeeguu_core.model took {best:.2f}s"
@@ -4,6 +4,7 @@ import zeeguu_core
 from sqlalchemy.orm.exc import NoResultFound
 
 from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+from zeeguu_core_test.rules.article_rule import ArticleRule
 from zeeguu_core_test.rules.language_rule import LanguageRule
 from zeeguu_core_test.rules.user_rule import UserRule
 from zeeguu_core.model.language import Language
@@ -44,3 +45,20 @@ class LanguageTest(ModelTestMixIn, TestCase):
 
         self.user.set_native_language(language_should_be.code)
         assert self.user.native_language.id == language_should_be.id
+
+    def test_article_ids_are_cached_until_invalidated(self):
+        article = ArticleRule().article
+        language = article.language
+        article.word_count = 1000
+        session.commit()
+
+        assert language.article_ids() == (article.id,)
+
+        newer_article = ArticleRule().article
+        newer_article.language = language
+        newer_article.word_count = 1000
+        session.commit()
+        assert language.article_ids() == (article.id,)
+
+        language.clear_articles_cache()
+        assert set(language.article_ids()) == {article.id, newer_article.id}
@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core.model import Topic, LocalizedTopic, Language
+from zeeguu_core.util.keyword_matcher import KeywordMatcher
+
+session = zeeguu_core.db.session
+
+
+class KeywordMatcherTest(TestCase):
+    def test_overlapping_keywords_all_match(self):
+        matcher = KeywordMatcher([("he", 1), ("she", 2), ("hers", 3), ("sport", 4), ("sports", 5)])
+
+        assert matcher.matches("ushers") == {1, 2, 3}
+        assert matcher.matches("sports") == {4, 5}
+        assert matcher.matches("nothing") == set()
+
+    def test_same_as_the_substring_check(self):
+        keywords = ["an", "nan", "banana", "ana", "x"]
+        matcher = KeywordMatcher((each, each) for each in keywords)
+
+        for text in ["bananas", "nanny", "xanax", "b"]:
+            assert matcher.matches(text) == {each for each in keywords if each in text}
+
+
+class LocalizedTopicTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.article = ArticleRule().article
+        self.article.title = "Der Fussball am Wochenende"
+        self.sport = Topic("Sport")
+        self.politics = Topic("Politics")
+        session.add(LocalizedTopic(self.sport, self.article.language, "Sport", "fussball tennis"))
+        session.add(LocalizedTopic(self.politics, self.article.language, "Politik", "wahl"))
+        session.commit()
+
+    def _matching_topics(self):
+        return LocalizedTopic.topic_ids_matching(self.article)
+
+    def test_same_topics_as_matches_article(self):
+        self.article.title = "fussball und wahl"
+        expected = {each.topic_id for each in LocalizedTopic.query.all() if each.matches_article(self.article)}
+
+        assert self._matching_topics() == expected == {self.sport.id, self.politics.id}
+
+    def test_keywords_are_matched_in_the_url(self):
+        self.article.title = "Nothing"
+        self.article.url.path = "/politik/wahl-2021"
+
+        assert self._matching_topics() == {self.politics.id}
+
+    def test_only_the_topics_of_the_language_of_the_article(self):
+        other_language = [each for each in Language.available_languages() if each.id != self.article.language.id][0]
+        session.add(LocalizedTopic(self.sport, other_language, "Sport", "wahl"))
+        session.commit()
+        self.article.title = "die wahl"
+
+        assert self._matching_topics() == {self.politics.id}
+
+    def test_changed_keywords_invalidate_the_matcher(self):
+        self.article.title = "fussball"
+        assert self._matching_topics() == {self.sport.id}
+
+        localized = LocalizedTopic.query.filter(LocalizedTopic.topic_id == self.sport.id).one()
+        localized.keywords = "tennis"
+        session.commit()
+
+        assert self._matching_topics() == set()
@@ -0,0 +1,243 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core_test.rules.user_rule import UserRule
+from zeeguu_core.content_recommender.mixed_recommender import _article_fits_reading_preferences, \
+    _reading_preferences_hash, _reading_preferences_hashes, article_search_for_user, _find_articles_for_user, \
+    article_recommendations_for_user, article_recommendations_page, article_search_page
+from zeeguu_core.content_recommender import mixed_recommender, word_prefix_index
+from zeeguu_core.content_recommender.cursor import InvalidCursor, encode_cursor, ELASTIC_BACKEND
+from zeeguu_core.content_recommender.reading_preferences import ReadingPreferences
+from zeeguu_core.model import Topic, TopicFilter, TopicSubscription, UserLanguage, Search, SearchFilter, ArticleWord, \
+    ArticleContentToken, RecommendationFeed, ArticlesCache
+
+session = zeeguu_core.db.session
+
+
+class MixedRecommenderTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user = UserRule().user
+        self.language = self.user.learned_language
+        session.add(UserLanguage(self.user, self.language))
+
+        self.article = ArticleRule().article
+        self.article.language = self.language
+        # estimated for a random language; pinned so that it fits the default levels
+        self.article.fk_difficulty = 50
+        self.topic = Topic("Sport")
+        session.add(self.topic)
+        session.commit()
+
+    def _article_fits(self):
+        return _article_fits_reading_preferences(self.article, ReadingPreferences.for_user(self.user))
+
+    def test_article_in_reading_language_fits(self):
+        assert self._article_fits()
+
+    def test_broken_article_does_not_fit(self):
+        self.article.vote_broken()
+        assert not self._article_fits()
+
+    def test_article_with_filtered_topic_does_not_fit(self):
+        self.article.add_topic(self.topic)
+        TopicFilter.find_or_create(session, self.user, self.topic)
+        assert not self._article_fits()
+
+    def test_article_with_filtered_keyword_does_not_fit(self):
+        keyword = self.article.title.split()[0]
+        SearchFilter.find_or_create(session, self.user, Search.find_or_create(session, keyword))
+        assert not self._article_fits()
+
+    def test_filtered_keyword_excludes_the_indexed_articles(self):
+        ArticleContentToken.index_articles(session, [self.article])
+        session.commit()
+        assert self.article in _find_articles_for_user(self.user)
+
+        keyword = self.article.title.split()[0]
+        SearchFilter.find_or_create(session, self.user, Search.find_or_create(session, keyword))
+        assert self.article not in _find_articles_for_user(self.user)
+
+    def test_topic_subscription_requires_the_topic(self):
+        TopicSubscription.find_or_create(session, self.user, self.topic)
+        assert not self._article_fits()
+
+        self.article.add_topic(self.topic)
+        assert self._article_fits()
+
+    def test_batch_hashes_are_the_same_as_the_individual_ones(self):
+        other_user = UserRule().user
+        politics = Topic("Politics")
+        session.add(politics)
+        session.commit()
+        TopicSubscription.find_or_create(session, self.user, self.topic)
+        TopicFilter.find_or_create(session, other_user, politics)
+        SearchFilter.find_or_create(session, other_user, Search.find_or_create(session, "election"))
+
+        hashes = _reading_preferences_hashes([self.user.id, other_user.id])
+
+        assert hashes[self.user.id] == _reading_preferences_hash(self.user)
+        assert hashes[other_user.id] == _reading_preferences_hash(other_user)
+        assert hashes[self.user.id] != hashes[other_user.id]
+
+    def _searchable_article(self, *words):
+        article = ArticleRule().article
+        article.language = self.language
+        article.fk_difficulty = 50
+        article.word_count = 1000
+        for each in words:
+            ArticleWord.find_or_create(session, each).add_article(article)
+        session.commit()
+        return article
+
+    def test_search_matches_word_prefixes_of_all_the_terms(self):
+        both = self._searchable_article("election", "results")
+        only_one = self._searchable_article("election")
+
+        found = article_search_for_user(self.user, 10, "Elect res")
+
+        assert [each['id'] for each in found] == [both.id]
+
+    def test_search_returns_the_most_recent_first_and_at_most_count(self):
+        articles = [self._searchable_article("election") for _ in range(3)]
+        most_recent = sorted(articles, key=lambda each: each.published_time, reverse=True)
+
+        found = article_search_for_user(self.user, 2, "election")
+
+        assert [each['id'] for each in found] == [each.id for each in most_recent[:2]]
+
+    def test_search_with_the_in_process_word_index(self):
+        both = self._searchable_article("election", "results")
+        only_one = self._searchable_article("election")
+
+        with patch.dict(zeeguu_core.app.config, IN_PROCESS_WORD_INDEX=True), \
+                patch.object(word_prefix_index, '_index', None):
+            assert [each['id'] for each in article_search_for_user(self.user, 10, "elect res")] == [both.id]
+            assert article_search_for_user(self.user, 10, "nothing") == []
+
+    def test_too_many_ids_from_the_word_index_fall_back_to_the_subqueries(self):
+        articles = [self._searchable_article("election") for _ in range(3)]
+
+        with patch.dict(zeeguu_core.app.config, IN_PROCESS_WORD_INDEX=True), \
+                patch.object(word_prefix_index, '_index', None), \
+                patch.object(mixed_recommender, 'MAX_ARTICLE_IDS_FROM_INDEX', 2):
+            found = article_search_for_user(self.user, 10, "elect")
+
+        assert sorted(each['id'] for each in found) == sorted(each.id for each in articles)
+
+    def test_search_skips_broken_articles(self):
+        article = self._searchable_article("election")
+        article.vote_broken()
+        session.commit()
+
+        assert article_search_for_user(self.user, 10, "election") == []
+
+    def test_recommendations_are_materialized_in_the_feed(self):
+        recommended = article_recommendations_for_user(self.user, 10)
+        assert [each['id'] for each in recommended] == [self.article.id]
+
+        feed = RecommendationFeed.query.get(self.user.id)
+        assert feed.content_hash == _reading_preferences_hash(self.user)
+
+        # served from the feed, even if the cache is gone
+        ArticlesCache.query.delete()
+        session.commit()
+        assert [each['id'] for each in article_recommendations_for_user(self.user, 10)] == [self.article.id]
+
+    def test_feed_is_refreshed_when_the_preferences_change(self):
+        article_recommendations_for_user(self.user, 10)
+
+        TopicSubscription.find_or_create(session, self.user, self.topic)
+        assert article_recommendations_for_user(self.user, 10) == []
+
+        feed = RecommendationFeed.query.get(self.user.id)
+        assert feed.content_hash == _reading_preferences_hash(self.user)
+
+    def test_feed_has_only_articles_for_the_levels_of_the_user(self):
+        ArticlesCache.add_articles_for_hash(session, _reading_preferences_hash(self.user), [self.article])
+        self.article.fk_difficulty = 99
+        user_language = UserLanguage.with_language_id(self.language.id, self.user)
+        user_language.cefr_level = 1
+        session.commit()
+
+        assert article_recommendations_for_user(self.user, 10) == []
+
+    def test_feed_is_refreshed_when_the_levels_change(self):
+        self.article.fk_difficulty = 90
+        session.commit()
+        assert [each['id'] for each in article_recommendations_for_user(self.user, 10)] == [self.article.id]
+
+        user_language = UserLanguage.with_language_id(self.language.id, self.user)
+        user_language.cefr_level = 1
+        session.commit()
+
+        assert article_recommendations_for_user(self.user, 10) == []
+
+    def test_broken_and_deleted_articles_are_not_served_from_the_feed(self):
+        other = ArticleRule().article
+        other.language = self.language
+        other.fk_difficulty = 50
+        session.commit()
+        assert len(article_recommendations_for_user(self.user, 10)) == 2
+
+        self.article.vote_broken()
+        session.delete(other)
+        session.commit()
+
+        assert article_recommendations_for_user(self.user, 10) == []
+
+    def test_preferences_are_loaded_once_per_request(self):
+        with patch.object(ReadingPreferences, 'for_users', wraps=ReadingPreferences.for_users) as for_users:
+            article_recommendations_page(self.user, 10)
+
+        assert for_users.call_count == 1
+
+    def test_storing_the_feed_again_replaces_it(self):
+        RecommendationFeed.store(session, self.user.id, "hash", "levels", [{'id': 1}])
+        RecommendationFeed.store(session, self.user.id, "hash", "levels", [{'id': 2}])
+        session.commit()
+
+        assert RecommendationFeed.find_fresh(self.user.id, "hash", "levels", 1).all_article_infos() == [{'id': 2}]
+
+    def _all_pages(self, next_page):
+        pages = []
+        cursor = None
+        while True:
+            page, cursor = next_page(cursor)
+            pages.append([each['id'] for each in page])
+            if not cursor:
+                return pages
+
+    def test_search_pages_cover_all_the_results_once(self):
+        articles = [self._searchable_article("election") for _ in range(5)]
+        most_recent = sorted(articles, key=lambda each: (each.published_time, each.id), reverse=True)
+
+        pages = self._all_pages(lambda cursor: article_search_page(self.user, 2, "election", cursor))
+
+        assert [len(each) for each in pages] == [2, 2, 1]
+        assert sum(pages, []) == [each.id for each in most_recent]
+
+    def test_recommendation_pages_cover_all_the_recommendations_once(self):
+        for _ in range(4):
+            article = ArticleRule().article
+            article.language = self.language
+            article.fk_difficulty = 50
+        session.commit()
+
+        all_at_once = [each['id'] for each in article_recommendations_for_user(self.user, 10)]
+        pages = self._all_pages(lambda cursor: article_recommendations_page(self.user, 2, cursor))
+
+        assert len(all_at_once) == 5
+        assert sum(pages, []) == all_at_once
+
+    def test_cursor_of_another_backend_is_invalid(self):
+        with self.assertRaises(InvalidCursor):
+            article_search_page(self.user, 2, "election", encode_cursor(ELASTIC_BACKEND, {}))
+
+        with self.assertRaises(InvalidCursor):
+            article_recommendations_page(self.user, 2, "not a cursor")
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.user_rule import UserRule
+from zeeguu_core.content_recommender.reading_preferences import ReadingPreferences
+from zeeguu_core.model import Topic, TopicFilter, TopicSubscription, UserLanguage, Search, SearchSubscription
+
+session = zeeguu_core.db.session
+
+
+class ReadingPreferencesTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user = UserRule().user
+        self.language = self.user.learned_language
+        user_language = UserLanguage(self.user, self.language)
+        user_language.cefr_level = 3
+        session.add(user_language)
+
+        self.topic = Topic("Sport")
+        session.add(self.topic)
+        session.commit()
+
+    def test_snapshot_has_the_levels_of_the_user(self):
+        preferences = ReadingPreferences.for_user(self.user)
+
+        language = preferences.language_with_id(self.language.id)
+        assert (language.level_min, language.level_max) == self.user.levels_for(self.language)
+
+    def test_subscription_changes_are_in_the_next_snapshot(self):
+        before = ReadingPreferences.for_user(self.user)
+
+        TopicSubscription.find_or_create(session, self.user, self.topic)
+        subscribed = ReadingPreferences.for_user(self.user)
+        assert subscribed.subscribed_topics == ((self.topic.id, "Sport"),)
+        assert subscribed.hash != before.hash
+
+        session.delete(TopicSubscription.with_topic_id(self.topic.id, self.user))
+        session.commit()
+        assert ReadingPreferences.for_user(self.user).hash == before.hash
+
+    def test_filters_and_searches_are_in_the_snapshot(self):
+        TopicFilter.find_or_create(session, self.user, self.topic)
+        SearchSubscription.find_or_create(session, self.user, Search.find_or_create(session, "election"))
+
+        preferences = ReadingPreferences.for_user(self.user)
+
+        assert [each.title for each in preferences.filtered_topics] == ["Sport"]
+        assert [each.keywords for each in preferences.subscribed_searches] == ["election"]
@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core.model import RelatedArticle
+
+session = zeeguu_core.db.session
+
+
+class RelatedArticleTest(ModelTestMixIn, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.articles = [ArticleRule().article for _ in range(4)]
+        session.commit()
+
+        self.article, self.first, self.second, self.other = self.articles
+        RelatedArticle.store(session, self.article.id, [self.first.id, self.second.id])
+        RelatedArticle.store(session, self.other.id, [self.second.id])
+        session.commit()
+
+    def test_most_similar_first(self):
+        assert RelatedArticle.related_articles(self.article.id, 10) == [self.first, self.second]
+        assert RelatedArticle.related_articles(self.article.id, 1) == [self.first]
+
+    def test_store_replaces_the_related_articles(self):
+        RelatedArticle.store(session, self.article.id, [self.other.id])
+        session.commit()
+
+        assert RelatedArticle.related_articles(self.article.id, 10) == [self.other]
+
+    def test_broken_article_is_forgotten(self):
+        self.second.vote_broken()
+        session.commit()
+
+        # both the article it was related to and the other one need recomputing
+        assert not RelatedArticle.has_been_computed(self.article.id)
+        assert not RelatedArticle.has_been_computed(self.other.id)
+
+    def test_deleted_article_is_forgotten(self):
+        session.delete(self.article)
+        session.commit()
+
+        assert not RelatedArticle.has_been_computed(self.article.id)
+        assert RelatedArticle.has_been_computed(self.other.id)
+
+    def test_article_without_related_articles_is_computed(self):
+        RelatedArticle.store(session, self.first.id, [])
+        session.commit()
+
+        assert RelatedArticle.has_been_computed(self.first.id)
+        assert RelatedArticle.related_articles(self.first.id, 10) == []
@@ -1,9 +1,11 @@
+from datetime import datetime
 from unittest import TestCase
 
 from zeeguu_core_test.model_test_mixin import ModelTestMixIn
 
 import zeeguu_core
 from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core_test.rules.bookmark_rule import BookmarkRule
 from zeeguu_core_test.rules.language_rule import LanguageRule
 from zeeguu_core_test.rules.user_article_rule import UserArticleRule
 from zeeguu_core_test.rules.user_rule import UserRule
@@ -31,3 +33,14 @@ class UserArticleTest(ModelTestMixIn, TestCase):
     def test_all_starred_or_liked_articles(self):
         self.article.star_for_user(session, self.user)
         assert 1 == len(UserArticle.all_starred_or_liked_articles_of_user(self.user))
+
+    def test_user_article_infos_are_the_same_as_the_individual_ones(self):
+        bookmark = BookmarkRule(self.user).bookmark
+        article_with_translations = bookmark.text.article
+        UserArticle.find_or_create(session, self.user, article_with_translations, opened=datetime.now())
+
+        articles = [self.article, article_with_translations, ArticleRule().article]
+
+        individual_infos = [UserArticle.user_article_info(self.user, each) for each in articles]
+        assert UserArticle.user_article_infos(self.user, articles) == individual_infos
+        assert len(individual_infos[1]['translations']) == 1
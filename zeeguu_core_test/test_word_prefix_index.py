@@ -0,0 +1,80 @@
+import random
+from array import array
+from unittest import TestCase
+from unittest.mock import patch
+
+from zeeguu_core_test.model_test_mixin import ModelTestMixIn
+
+import zeeguu_core
+from zeeguu_core_test.rules.article_rule import ArticleRule
+from zeeguu_core.content_recommender import word_prefix_index
+from zeeguu_core.content_recommender.word_prefix_index import WordPrefixIndex, _intersect
+from zeeguu_core.model import ArticleWord
+
+session = zeeguu_core.db.session
+
+
+class WordPrefixIndexTest(TestCase):
+    def setUp(self):
+        self.index = WordPrefixIndex()
+        self.index.add_article(1, ["election", "results"])
+        self.index.add_article(2, ["elections", "sport"])
+        self.index.add_article(3, ["sport", "results"])
+
+    def test_prefix_matches_all_the_words_starting_with_it(self):
+        assert list(self.index.article_ids_for_prefix("elect")) == [1, 2]
+        assert list(self.index.article_ids_for_prefix("elections")) == [2]
+        assert list(self.index.article_ids_for_prefix("x")) == []
+
+    def test_all_the_prefixes_must_match(self):
+        assert list(self.index.article_ids_for_all_prefixes(["elect", "res"])) == [1]
+        assert list(self.index.article_ids_for_all_prefixes(["sport", "x"])) == []
+
+    def test_words_added_out_of_order_keep_the_postings_sorted(self):
+        self.index.add("sport", [0, 2, 4])
+
+        assert list(self.index.article_ids_for_prefix("sport")) == [0, 2, 3, 4]
+
+    def test_words_added_at_once_are_merged_in_order(self):
+        self.index._add_all({"apple": array('I', [4]), "sports": array('I', [5]), "results": array('I', [4])})
+
+        assert self.index._words == sorted(self.index._words)
+        assert list(self.index.article_ids_for_prefix("res")) == [1, 3, 4]
+        assert list(self.index.article_ids_for_prefix("sport")) == [2, 3, 5]
+        assert list(self.index.article_ids_for_prefix("apple")) == [4]
+
+    def test_galloping_intersection_is_the_set_intersection(self):
+        for _ in range(20):
+            shorter = sorted(random.sample(range(10000), 50))
+            longer = sorted(random.sample(range(10000), 2000))
+
+            assert list(_intersect(shorter, longer)) == sorted(set(shorter) & set(longer))
+
+
+class WordPrefixIndexRefreshTest(ModelTestMixIn, TestCase):
+    def _article_with_words(self, *words):
+        article = ArticleRule().article
+        for each in words:
+            ArticleWord.find_or_create(session, each).add_article(article)
+        session.commit()
+        return article
+
+    def test_refresh_loads_only_the_new_articles(self):
+        first = self._article_with_words("election")
+        index = WordPrefixIndex()
+        index.refresh(force=True)
+
+        second = self._article_with_words("election", "results")
+        index.refresh(force=True)
+
+        assert list(index.article_ids_for_prefix("elect")) == [first.id, second.id]
+        assert list(index.article_ids_for_prefix("res")) == [second.id]
+
+    def test_refresh_loads_in_batches(self):
+        articles = [self._article_with_words("election", "results") for _ in range(3)]
+
+        index = WordPrefixIndex()
+        with patch.object(word_prefix_index, 'LOAD_BATCH_SIZE', 3):
+            index.refresh(force=True)
+
+        assert list(index.article_ids_for_all_prefixes(["elect", "res"])) == [each.id for each in articles]